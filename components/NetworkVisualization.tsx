@@ -8,18 +8,24 @@ interface NetworkData {
     id: string
     name: string
     degree: number
+    x?: number
+    y?: number
   }>
   edges: Array<{
     source: string
     target: string
     weight: number
-    tracks: Array<{
+    // Omitted in the level-of-detail tier files (scripts/network_tiers.py)
+    tracks?: Array<{
       track_name: string
       track_id: string
       popularity: number
       genre: string
     }>
   }>
+  // CSR adjacency index (scripts/network_adjacency.py): the neighbors / edges of
+  // nodes[i] are at offsets[i]..offsets[i + 1], as indices into nodes / edges
+  adjacency?: Adjacency
   metadata: {
     total_nodes: number
     total_edges: number
@@ -28,6 +34,12 @@ interface NetworkData {
   }
 }
 
+interface Adjacency {
+  offsets: number[]
+  neighbors: number[]
+  edges: number[]
+}
+
 interface NetworkVisualizationProps {
   networkData: NetworkData | null
   params?: {
@@ -45,6 +57,28 @@ interface NetworkVisualizationProps {
   onNodeHover?: (artistId: string | null) => void
 }
 
+// Build the adjacency index in the browser for data exported without one
+function buildAdjacency(nodes: NetworkData['nodes'], edges: NetworkData['edges']): Adjacency {
+  const index = new Map(nodes.map((n, i) => [n.id, i] as [string, number]))
+  const lists: Array<Array<[number, number]>> = nodes.map(() => [])
+  edges.forEach((e, i) => {
+    const source = index.get(e.source)
+    const target = index.get(e.target)
+    if (source === undefined || target === undefined || source === target) return
+    lists[source].push([target, i])
+    lists[target].push([source, i])
+  })
+  const adjacency: Adjacency = { offsets: [0], neighbors: [], edges: [] }
+  lists.forEach((list) => {
+    list.forEach(([neighbor, edge]) => {
+      adjacency.neighbors.push(neighbor)
+      adjacency.edges.push(edge)
+    })
+    adjacency.offsets.push(adjacency.neighbors.length)
+  })
+  return adjacency
+}
+
 interface ProcessedNode {
   id: string
   val: number
@@ -59,7 +93,7 @@ interface ProcessedLink {
   source: ProcessedNode | string
   target: ProcessedNode | string
   value: number
-  tracks: Array<{
+  tracks?: Array<{
     track_name: string
     track_id: string
     popularity: number
@@ -140,13 +174,18 @@ export default function NetworkVisualization({
 
     // Process data for D3 (limit nodes and edges based on params)
     const limitedNodes = networkData.nodes.slice(0, params.maxNodes)
-    const limitedEdges = networkData.edges
-      .filter(
-        (e) =>
-          limitedNodes.some((n) => n.id === e.source) &&
-          limitedNodes.some((n) => n.id === e.target)
-      )
-      .slice(0, params.maxEdges)
+    const limitedNodeIds = new Set(limitedNodes.map((n) => n.id))
+    const limitedEdgeIndices: number[] = []
+    networkData.edges.forEach((e, i) => {
+      if (
+        limitedEdgeIndices.length < params.maxEdges &&
+        limitedNodeIds.has(e.source) &&
+        limitedNodeIds.has(e.target)
+      ) {
+        limitedEdgeIndices.push(i)
+      }
+    })
+    const limitedEdges = limitedEdgeIndices.map((i) => networkData.edges[i])
 
     const processedNodes: ProcessedNode[] = limitedNodes.map((n) => ({
       id: n.id,
@@ -161,6 +200,35 @@ export default function NetworkVisualization({
       tracks: e.tracks,
     }))
 
+    // Neighbor lookups slice the adjacency index instead of scanning every link
+    const adjacency = networkData.adjacency ?? buildAdjacency(networkData.nodes, networkData.edges)
+    const nodeIndexById = new Map(networkData.nodes.map((n, i) => [n.id, i] as [string, number]))
+    // networkData.edges index -> displayed link (undefined when the edge is not displayed)
+    const linkByEdgeIndex: Array<ProcessedLink | undefined> = new Array(networkData.edges.length)
+    limitedEdgeIndices.forEach((edgeIndex, i) => {
+      linkByEdgeIndex[edgeIndex] = processedLinks[i]
+    })
+    const linkEndId = (end: ProcessedNode | string) => (typeof end === 'string' ? end : end.id)
+    const connectedLinksOf = (nodeId: string | null | undefined): ProcessedLink[] => {
+      const index = nodeId ? nodeIndexById.get(nodeId) : undefined
+      if (index === undefined) return []
+      const links: ProcessedLink[] = []
+      for (let k = adjacency.offsets[index]; k < adjacency.offsets[index + 1]; k++) {
+        const link = linkByEdgeIndex[adjacency.edges[k]]
+        if (link) links.push(link)
+      }
+      return links
+    }
+    const neighborIdsOf = (nodeId: string | null | undefined): Set<string> => {
+      const ids = new Set<string>()
+      connectedLinksOf(nodeId).forEach((l) => {
+        const src = linkEndId(l.source)
+        const tgt = linkEndId(l.target)
+        ids.add(src === nodeId ? tgt : src)
+      })
+      return ids
+    }
+
     console.log('NetworkVisualization: Processed data', {
       nodes: processedNodes.length,
       links: processedLinks.length,
@@ -241,13 +309,32 @@ export default function NetworkVisualization({
       // Initialize nodes with positions centered in viewport
       const centerX = width / 2
       const centerY = height / 2
-      processedNodes.forEach((node, i) => {
-        // Distribute initial positions in a circle around center
-        const angle = (i / processedNodes.length) * Math.PI * 2
-        const radius = Math.min(width, height) * 0.2
-        node.x = centerX + Math.cos(angle) * radius
-        node.y = centerY + Math.sin(angle) * radius
-      })
+      // Use the precomputed layout (scripts/network_layout.py) when every node has coordinates
+      const hasLayout = processedNodes.length > 0 && processedNodes.every(
+        (node) => typeof node.original.x === 'number' && typeof node.original.y === 'number'
+      )
+      if (hasLayout) {
+        // Fit the layout's bounding box into the viewport
+        const xs = processedNodes.map((node) => node.original.x as number)
+        const ys = processedNodes.map((node) => node.original.y as number)
+        const minX = Math.min(...xs)
+        const maxX = Math.max(...xs)
+        const minY = Math.min(...ys)
+        const maxY = Math.max(...ys)
+        const scale = Math.min(width, height) * 0.8 / Math.max(maxX - minX, maxY - minY, 1)
+        processedNodes.forEach((node) => {
+          node.x = centerX + ((node.original.x as number) - (minX + maxX) / 2) * scale
+          node.y = centerY + ((node.original.y as number) - (minY + maxY) / 2) * scale
+        })
+      } else {
+        processedNodes.forEach((node, i) => {
+          // Distribute initial positions in a circle around center
+          const angle = (i / processedNodes.length) * Math.PI * 2
+          const radius = Math.min(width, height) * 0.2
+          node.x = centerX + Math.cos(angle) * radius
+          node.y = centerY + Math.sin(angle) * radius
+        })
+      }
 
       // Initialize simulation with configurable parameters
       const simulation = d3
@@ -274,6 +361,11 @@ export default function NetworkVisualization({
               )
           )
 
+      // With a precomputed layout, only run a short warm simulation instead of a cold start
+      if (hasLayout) {
+        simulation.alpha(0.1)
+      }
+
       simulationRef.current = simulation
 
       // Create subtle oscillation in center strength to keep simulation active
@@ -544,6 +636,10 @@ export default function NetworkVisualization({
         console.log('NetworkVisualization: Links drawn', { drawnLinks, totalLinks: processedLinks.length })
       }
 
+      // Neighbors of the hovered / highlighted node (once per frame)
+      const hoveredNeighborIds = neighborIdsOf(hoveredNodeRef.current?.id)
+      const highlightedNeighborIds = neighborIdsOf(highlightedArtistRef.current)
+
       // Draw nodes
       ctx.textAlign = 'center'
       ctx.textBaseline = 'middle'
@@ -565,30 +661,8 @@ export default function NetworkVisualization({
         const isHighlighted = highlightedArtistRef.current === node.id
         // 検索結果に一致するノードかどうかをチェック
         const isSearchMatch = searchQueryRef.current.trim() && searchResultsRef.current.includes(node.id)
-        const isNeighbor =
-          hoveredNodeRef.current &&
-          processedLinks.some(
-            (l) => {
-              const src = typeof l.source === 'string' ? l.source : l.source.id
-              const tgt = typeof l.target === 'string' ? l.target : l.target.id
-              return (
-                (src === hoveredNodeRef.current!.id && tgt === node.id) ||
-                (tgt === hoveredNodeRef.current!.id && src === node.id)
-              )
-            }
-          )
-        const isHighlightedNeighbor =
-          highlightedArtistRef.current &&
-          processedLinks.some(
-            (l) => {
-              const src = typeof l.source === 'string' ? l.source : l.source.id
-              const tgt = typeof l.target === 'string' ? l.target : l.target.id
-              return (
-                (src === highlightedArtistRef.current && tgt === node.id) ||
-                (tgt === highlightedArtistRef.current && src === node.id)
-              )
-            }
-          )
+        const isNeighbor = hoveredNodeRef.current && hoveredNeighborIds.has(node.id)
+        const isHighlightedNeighbor = highlightedArtistRef.current && highlightedNeighborIds.has(node.id)
 
         if (isHovered || isNeighbor) {
           state.hoverProgress = Math.min(state.hoverProgress + 0.1, 1)
@@ -666,14 +740,7 @@ export default function NetworkVisualization({
 
       // Draw tracks info for connected neighbors
       if (hoveredNodeRef.current) {
-        const connectedLinks = processedLinks.filter((l) => {
-          const src = typeof l.source === 'string' ? l.source : l.source.id
-          const tgt = typeof l.target === 'string' ? l.target : l.target.id
-          return (
-            src === hoveredNodeRef.current!.id ||
-            tgt === hoveredNodeRef.current!.id
-          )
-        })
+        const connectedLinks = connectedLinksOf(hoveredNodeRef.current.id)
 
         connectedLinks
           .sort((a, b) => b.value - a.value)
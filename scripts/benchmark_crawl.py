@@ -0,0 +1,209 @@
+"""
+取得処理のベンチマーク
+
+モックサーバー（mock_spotify_server.py）を別プロセスで起動し、
+fetch_japanese_artists_from_charts.py の以下の処理を実APIなしで実行して、
+発行したリクエスト数・実行時間・レイテンシ・ピークメモリを規模ごとに計測する:
+- get_artists_from_playlist
+- get_artists_from_new_releases
+- search_japanese_artists_by_popularity
+- build_network_data
+
+本番の取得前にスループットの劣化を検出するためのもの。
+各処理はレートリミッタ・キャッシュを含む本番と同じクライアント構成で実行する
+（キャッシュは処理ごとに空の状態から始める）
+
+使い方:
+    python benchmark_crawl.py                              # 100 / 1k / 10k アーティスト
+    python benchmark_crawl.py --scales 100,1000 --output benchmark.json
+    python benchmark_crawl.py --latency 0.02 --rate-limit-probability 0.01
+
+ピークメモリは tracemalloc で計測する。tracemalloc は処理を大幅に遅くするため、
+実行時間を計測する実行とは別に、各処理をもう一度実行して計測する。
+実行時間だけを比較する場合は --no-memory を指定する
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+# ベンチマークでは認証しないため、未設定ならダミーの認証情報で読み込む
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'benchmark')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'benchmark')
+_work_dir = tempfile.mkdtemp(prefix='spotify_benchmark_')
+os.environ.setdefault('SPOTIFY_CACHE_PATH', os.path.join(_work_dir, 'import.sqlite3'))
+
+import spotipy  # noqa: E402
+
+import fetch_japanese_artists_from_charts as crawler  # noqa: E402
+from mock_spotify_server import MockSpotifyProcess, SyntheticCatalog  # noqa: E402
+from spotify_cache import CachedSpotify, ResponseCache  # noqa: E402
+from spotify_harvest import HarvestStats  # noqa: E402
+from spotify_metrics import ApiMetrics, InstrumentedSpotify  # noqa: E402
+from spotify_rate_limit import RateLimitedSpotify, RateLimiter, make_session  # noqa: E402
+
+DEFAULT_SCALES = [100, 1000, 10000]
+
+
+def install_client(prefix: str, cache_path: str, rate: float) -> None:
+    """crawler のクライアントをモックサーバー向けに差し替える"""
+    metrics = ApiMetrics()
+    client = spotipy.Spotify(auth='benchmark', requests_session=metrics.attach_session(make_session()))
+    client.prefix = prefix
+    limiter = RateLimiter(rate=rate, max_rate=rate, burst=max(2.0, rate / 10))
+    crawler.rate_limiter = limiter
+    crawler.api_metrics = metrics
+    crawler.harvest_stats = HarvestStats()
+    crawler.sp = CachedSpotify(
+        RateLimitedSpotify(InstrumentedSpotify(client, metrics), limiter, metrics=metrics),
+        ResponseCache(cache_path)
+    )
+
+
+def _quiet(verbose: bool):
+    return contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+
+def run_phase(
+    name: str,
+    run: Callable[[], Any],
+    server: MockSpotifyProcess,
+    cache_dir: str,
+    rate: float,
+    measure_memory: bool,
+    verbose: bool
+) -> Dict[str, Any]:
+    """1つの処理を実行して計測（キャッシュは空の状態から）"""
+    install_client(server.prefix, os.path.join(cache_dir, f'{name}.sqlite3'), rate)
+    server.reset()
+    start = time.perf_counter()
+    with _quiet(verbose):
+        result = run()
+    wall = time.perf_counter() - start
+    stats = server.stats()
+    limiter = crawler.rate_limiter
+    latency = crawler.api_metrics.snapshot()['total']['latency_ms']
+
+    peak = None
+    if measure_memory:
+        install_client(server.prefix, os.path.join(cache_dir, f'{name}.memory.sqlite3'), rate)
+        tracemalloc.start()
+        with _quiet(verbose):
+            run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    if isinstance(result, dict):
+        size = {'nodes': len(result.get('nodes', [])), 'edges': len(result.get('edges', []))}
+    else:
+        size = {'artists': len(result)}
+    return {
+        'phase': name,
+        'requests': stats['total_requests'],
+        'requests_by_endpoint': stats['requests'],
+        'rate_limited': sum(stats['rate_limited'].values()),
+        'rate_limited_seen_by_limiter': limiter.rate_limited_count,
+        'throttled_seconds': round(limiter.throttled_seconds, 3),
+        'bytes_received': stats['total_bytes_sent'],
+        'latency_ms': latency,
+        'wall_seconds': round(wall, 3),
+        'requests_per_second': round(stats['total_requests'] / wall, 1) if wall else None,
+        'peak_memory_mb': round(peak / (1024 * 1024), 2) if peak is not None else None,
+        'result': size,
+    }
+
+
+def run_scale(scale: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """1つの規模で全処理を計測"""
+    catalog = SyntheticCatalog(scale, seed=args.seed, collab_rate=args.collab_rate)
+    seeds = [catalog.artist(i) for i in range(scale)]
+    phases = [
+        ('get_artists_from_playlist', lambda: crawler.get_artists_from_playlist(
+            crawler.JAPAN_TOP_50_PLAYLIST_ID, 'Japan Top 50', scale, set()
+        )),
+        ('get_artists_from_new_releases', lambda: crawler.get_artists_from_new_releases(scale, set())),
+        ('search_japanese_artists_by_popularity', lambda: crawler.search_japanese_artists_by_popularity(
+            scale, set()
+        )),
+        ('build_network_data', lambda: crawler.build_network_data(
+            seeds,
+            max_artists=scale,
+            min_tracks_per_artist=args.min_tracks,
+            concurrency=args.concurrency
+        )),
+    ]
+
+    print(f"\n{scale} アーティスト: モックサーバーを起動中...")
+    results = []
+    with MockSpotifyProcess(
+        scale,
+        seed=args.seed,
+        collab_rate=args.collab_rate,
+        latency=args.latency,
+        rate_limit_probability=args.rate_limit_probability,
+        retry_after=args.retry_after
+    ) as server:
+        for name, run in phases:
+            cache_dir = os.path.join(_work_dir, str(scale))
+            os.makedirs(cache_dir, exist_ok=True)
+            result = run_phase(name, run, server, cache_dir, args.rate, not args.no_memory, args.verbose)
+            result['scale'] = scale
+            results.append(result)
+            memory = f"{result['peak_memory_mb']:.1f}MB" if result['peak_memory_mb'] is not None else '-'
+            p95 = result['latency_ms']['p95']
+            print(f"  {name:<40} {result['requests']:>7} リクエスト "
+                  f"{result['wall_seconds']:>8.2f}秒  p95 {p95 or 0:>6.1f}ms  ピークメモリ {memory}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='モックサーバーに対する取得処理のベンチマーク')
+    parser.add_argument('--scales', default=','.join(str(s) for s in DEFAULT_SCALES),
+                        help='アーティスト数（カンマ区切り）')
+    parser.add_argument('--seed', type=int, default=0, help='カタログ生成のシード')
+    parser.add_argument('--collab-rate', type=float, default=0.2, help='楽曲に他のアーティストが参加する確率')
+    parser.add_argument('--latency', type=float, default=0.0, help='モックサーバーの平均レイテンシ（秒）')
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0, help='429エラーを返す確率')
+    parser.add_argument('--retry-after', type=int, default=1, help='429エラー時の Retry-After（秒）')
+    parser.add_argument('--rate', type=float, default=1000.0, help='レートリミッタのレート（リクエスト/秒）')
+    parser.add_argument('--concurrency', type=int, default=4, help='build_network_data の並列数')
+    parser.add_argument('--min-tracks', type=int, default=100, help='各アーティストから取得する楽曲数')
+    parser.add_argument('--no-memory', action='store_true', help='ピークメモリを計測しない')
+    parser.add_argument('--verbose', action='store_true', help='各処理の出力を表示')
+    parser.add_argument('--output', help='結果を書き出すJSONファイル')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # 注入した429エラーごとにspotipyが出すエラーログを抑制
+        logging.getLogger('spotipy').setLevel(logging.CRITICAL)
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    results = []
+    for scale in scales:
+        results.extend(run_scale(scale, args))
+
+    if args.output:
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'params': {key: value for key, value in vars(args).items() if key not in ('output', 'verbose')},
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果を保存しました: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+ネットワーク構築のチェックポイント
+
+長時間の取得処理が中断（例外、Ctrl-C、長い429ロックアウト）しても
+それまでの結果を失わないよう、以下をJSONファイルに定期的に保存する:
+- シードアーティストのリスト
+- 処理済みアーティストのID
+- 途中までのグラフ（CollaborationGraph、アーティストIDで保存）と集計値
+- スノーボール取得ではフロンティア（CrawlFrontier.to_state() の形式）
+- 差分更新用のマニフェスト（処理済みのアーティストの分を含む。マニフェストの
+  ファイルは取得完了時にだけ保存するため、再開時はここから戻す）
+
+--resume で再開すると、保存済みのシードアーティストを使い、
+処理済みのアーティストをスキップして続きから取得する
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from crawl_frontier import CrawlFrontier
+from incremental_refresh import NetworkManifest
+from network_graph import CollaborationGraph
+
+CHECKPOINT_VERSION = 2
+DEFAULT_CHECKPOINT_PATH = '.spotify_cache/crawl_checkpoint.json'
+
+
+class CrawlCheckpoint:
+    """
+    ネットワーク構築の途中経過を保存・復元する
+
+    Args:
+        path: チェックポイントファイルのパス
+        interval: 何アーティスト処理するごとに保存するか
+    """
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH, interval: int = 25):
+        self.path = path
+        self.interval = interval
+        self.params: Dict[str, Any] = {}
+        self.seed_artists: List[Dict] = []
+        self.processed_ids: Set[str] = set()
+        self.processed_order: List[str] = []
+        self.graph: Dict[str, Any] = {}  # CollaborationGraph.to_state() の形式
+        self.counters: Dict[str, int] = {}
+        self.frontier: Dict[str, Any] = {}  # CrawlFrontier.to_state() の形式
+        self.manifest: Optional[Dict[str, Dict]] = None  # NetworkManifest.artists
+        self._since_save = 0
+
+    def start(self, seed_artists: List[Dict], params: Dict[str, Any]) -> None:
+        """新しい取得を開始し、シードアーティストを保存"""
+        self.params = dict(params)
+        self.seed_artists = list(seed_artists)
+        self.processed_ids = set()
+        self.processed_order = []
+        self.graph = {}
+        self.counters = {}
+        self.frontier = {}
+        self.manifest = None
+        self._write()
+
+    def load(self) -> bool:
+        """
+        チェックポイントを読み込む
+
+        Returns:
+            読み込めた場合True（ファイルがない・形式が違う場合False）
+        """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  警告: チェックポイントを読み込めませんでした ({self.path}): {e}")
+            return False
+        if data.get('version') != CHECKPOINT_VERSION:
+            print(f"  警告: チェックポイントの形式が異なります ({self.path})")
+            return False
+
+        self.params = data.get('params', {})
+        self.seed_artists = data.get('seed_artists', [])
+        self.processed_order = data.get('processed', [])
+        self.processed_ids = set(self.processed_order)
+        self.graph = data.get('graph', {})
+        self.counters = data.get('counters', {})
+        self.frontier = data.get('frontier', {})
+        self.manifest = data.get('manifest')
+        return True
+
+    def check_params(self, params: Dict[str, Any]) -> None:
+        """保存時とパラメータが異なる場合は警告を表示"""
+        for name, value in params.items():
+            saved = self.params.get(name)
+            if saved is not None and saved != value:
+                print(f"  警告: {name} がチェックポイント作成時と異なります "
+                      f"(保存時: {saved}, 現在: {value})")
+
+    def restore_graph(self) -> Tuple[CollaborationGraph, Dict[str, int]]:
+        """
+        保存済みのグラフを復元
+
+        Returns:
+            (graph, counters)
+        """
+        return CollaborationGraph.from_state(self.graph), dict(self.counters)
+
+    def mark_processed(
+        self,
+        artist_id: str,
+        graph: CollaborationGraph,
+        counters: Dict[str, int],
+        frontier: Optional[CrawlFrontier] = None,
+        manifest: Optional[NetworkManifest] = None
+    ) -> None:
+        """アーティストを処理済みとして記録し、interval ごとに保存"""
+        if artist_id not in self.processed_ids:
+            self.processed_ids.add(artist_id)
+            self.processed_order.append(artist_id)
+        self._since_save += 1
+        if self._since_save >= self.interval:
+            self.save(graph, counters, frontier, manifest)
+
+    def save(
+        self,
+        graph: CollaborationGraph,
+        counters: Dict[str, int],
+        frontier: Optional[CrawlFrontier] = None,
+        manifest: Optional[NetworkManifest] = None
+    ) -> None:
+        """途中までのグラフ（スノーボール取得ではフロンティア、差分更新用のマニフェストも）を保存"""
+        self.graph = graph.to_state()
+        self.counters = dict(counters)
+        if frontier is not None:
+            self.frontier = frontier.to_state()
+        if manifest is not None:
+            self.manifest = manifest.artists
+        self._write()
+        self._since_save = 0
+
+    def clear(self) -> None:
+        """取得完了後にチェックポイントを削除"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _write(self) -> None:
+        """一時ファイルに書き出してから置き換える（書き込み中の中断で壊れないように）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            'version': CHECKPOINT_VERSION,
+            'params': self.params,
+            'seed_artists': self.seed_artists,
+            'processed': self.processed_order,
+            'graph': self.graph,
+            'counters': self.counters,
+            'frontier': self.frontier,
+            'manifest': self.manifest,
+        }
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,155 @@
+"""
+スノーボール取得のフロンティア（優先度付きキュー）
+
+シードアーティストだけを人気順に処理する代わりに、処理したアーティストの
+楽曲で見つかった共演アーティストもキューに入れ、コラボが多く見つかりそうな
+順に取得する。優先度は次の合計:
+
+    NEIGHBOR_WEIGHT   × 共演した処理済みアーティストの人数（複数のシーンをつなぐアーティストほど高い）
+    SEEN_WEIGHT       × log(1 + 見つかった共演曲の数)
+    POPULARITY_WEIGHT × 共演曲の popularity の最大値 / 100
+
+シードアーティストは SEED_PRIORITY（+ popularity / 100）から始まるため、
+複数の処理済みアーティストと共演しているアーティストは、まだ処理していない
+シードより先に取得される。シードからのホップ数が max_depth を超える
+アーティストは取得しない。同じ優先度は追加順（同じ入力なら同じ順序）
+
+キューの要素は優先度が変わるたびに追加し、取り出すときに古い要素を読み飛ばす
+（heapq の遅延削除）
+"""
+
+import heapq
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+NEIGHBOR_WEIGHT = 2.0
+SEEN_WEIGHT = 1.0
+POPULARITY_WEIGHT = 1.0
+SEED_PRIORITY = 2.0
+
+DEFAULT_MAX_DEPTH = 2
+
+
+class CrawlFrontier:
+    """
+    取得するアーティストの優先度付きキュー
+
+    Args:
+        max_depth: シードからの最大ホップ数（シードは0）
+    """
+
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH):
+        self.max_depth = max_depth
+        # アーティストID -> {'name', 'depth', 'seed', 'seen', 'popularity', 'neighbors'}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.done: set = set()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._order = 0
+
+    def __len__(self) -> int:
+        """取得待ちのアーティスト数"""
+        return sum(1 for artist_id in self.entries if self._schedulable(artist_id))
+
+    def priority(self, artist_id: str) -> float:
+        entry = self.entries[artist_id]
+        score = (
+            NEIGHBOR_WEIGHT * len(entry['neighbors'])
+            + SEEN_WEIGHT * math.log1p(entry['seen'])
+            + POPULARITY_WEIGHT * entry['popularity'] / 100
+        )
+        if entry['seed']:
+            score += SEED_PRIORITY
+        return score
+
+    def _schedulable(self, artist_id: str) -> bool:
+        return artist_id not in self.done and self.entries[artist_id]['depth'] <= self.max_depth
+
+    def _push(self, artist_id: str) -> None:
+        if not self._schedulable(artist_id):
+            return
+        heapq.heappush(self._heap, (-self.priority(artist_id), self._order, artist_id))
+        self._order += 1
+
+    def _entry(self, artist_id: str, name: str, depth: int) -> Dict[str, Any]:
+        entry = self.entries.get(artist_id)
+        if entry is None:
+            entry = self.entries[artist_id] = {
+                'name': name, 'depth': depth, 'seed': False, 'seen': 0, 'popularity': 0, 'neighbors': set(),
+            }
+        else:
+            entry['depth'] = min(entry['depth'], depth)
+        return entry
+
+    def add_seeds(self, artists: Iterable[Dict]) -> None:
+        """シードアーティスト（ホップ数0）を追加"""
+        for artist in artists:
+            entry = self._entry(artist['id'], artist['name'], 0)
+            entry['seed'] = True
+            entry['popularity'] = max(entry['popularity'], artist.get('popularity', 0) or 0)
+            self._push(artist['id'])
+
+    def observe(self, artist: Dict, tracks: Iterable[Dict]) -> None:
+        """
+        処理したアーティストの楽曲から共演アーティストを記録し、優先度を更新
+
+        artist はこの取得で処理済みになったアーティスト（pop() の戻り値またはシード）
+        """
+        source_id = artist['id']
+        depth = self.entries[source_id]['depth'] + 1 if source_id in self.entries else 1
+        updated = set()
+        for track in tracks:
+            for featured in track.get('artists', []):
+                featured_id = featured.get('id')
+                if not featured_id or featured_id == source_id:
+                    continue
+                entry = self._entry(featured_id, featured.get('name', featured_id), depth)
+                entry['seen'] += 1
+                entry['popularity'] = max(entry['popularity'], track.get('popularity', 0) or 0)
+                entry['neighbors'].add(source_id)
+                updated.add(featured_id)
+        for featured_id in sorted(updated):
+            self._push(featured_id)
+
+    def pop(self) -> Optional[Dict[str, Any]]:
+        """
+        優先度が最も高いアーティストを取り出して処理済みにする
+
+        Returns:
+            {'id', 'name', 'depth', 'priority'}（キューが空ならNone）
+        """
+        while self._heap:
+            negative, _, artist_id = heapq.heappop(self._heap)
+            if artist_id in self.done:
+                continue
+            if -negative != self.priority(artist_id):
+                continue  # 優先度が更新された古い要素
+            self.done.add(artist_id)
+            entry = self.entries[artist_id]
+            return {'id': artist_id, 'name': entry['name'], 'depth': entry['depth'], 'priority': -negative}
+        return None
+
+    def mark_done(self, artist_ids: Iterable[str]) -> None:
+        """処理済みのアーティストを取得対象から外す（再開時）"""
+        self.done.update(artist_ids)
+
+    def to_state(self) -> Dict[str, Any]:
+        """チェックポイントに保存する形式"""
+        return {
+            'max_depth': self.max_depth,
+            'entries': {
+                artist_id: dict(entry, neighbors=sorted(entry['neighbors']))
+                for artist_id, entry in self.entries.items()
+            },
+            'done': sorted(self.done),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'CrawlFrontier':
+        """to_state() の形式から復元"""
+        frontier = cls(max_depth=state.get('max_depth', DEFAULT_MAX_DEPTH))
+        for artist_id, entry in state.get('entries', {}).items():
+            frontier.entries[artist_id] = dict(entry, neighbors=set(entry.get('neighbors', [])))
+        frontier.done = set(state.get('done', []))
+        for artist_id in frontier.entries:
+            frontier._push(artist_id)
+        return frontier
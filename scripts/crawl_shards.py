@@ -0,0 +1,189 @@
+"""
+シード分割（シャード）による複数プロセスでの取得と、部分グラフのマージ
+
+シードアーティストをアーティストIDの安定したハッシュ（SHA-1）で N 個のシャードに分け、
+シャードごとに別のプロセス（別のマシン・別の認証情報でもよい）で取得する。
+各プロセスは後処理をせずに部分グラフ（通常のネットワークJSONに metadata.shard を
+加えたもの）を書き出し、このスクリプトでまとめる。取得中のプロセス間の連携は不要
+
+- アーティストがどのシャードに入るかはIDだけで決まるため、プロセスごとに
+  シードの収集結果が多少ずれても、同じアーティストを2つのシャードで取得しない
+- コラボ曲は参加アーティストそれぞれのシャードで取得されるため、マージでは
+  楽曲ID × アーティストのペアで重複を除く（1プロセスでの取得と同じ数え方）
+- マージ後のノイズ除外・中心性・コミュニティ・レイアウト・書き出しは
+  fetch_japanese_artists_from_charts.py と同じ（network_pipeline.py）
+
+使い方:
+    # シャードごとに取得（マシンごとに別の .env / 認証情報でもよい）
+    python scripts/fetch_japanese_artists_from_charts.py --shard 0/4
+    python scripts/fetch_japanese_artists_from_charts.py --shard 1/4
+    ...
+    # 部分グラフをまとめて public/japanese_featuring_network.json に書き出す
+    python scripts/crawl_shards.py shards/*.json
+    python scripts/crawl_shards.py shards/*.json --output merged.json --no-layout
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, List, Tuple
+
+from network_export import write_network_json
+from network_graph import CollaborationGraph, pack_pair
+from network_pipeline import add_pipeline_arguments, process_network
+
+DEFAULT_SHARD_DIR = 'shards'
+DEFAULT_OUTPUT_FILE = 'public/japanese_featuring_network.json'
+
+MERGED_DESCRIPTION = 'Japanese Music Featuring Network - Generated from Spotify Charts and API'
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """'I/N'（0 <= I < N）を (I, N) にする（argparse の type に使う）"""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"シャードは I/N の形式で指定してください: {text}")
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"シャード番号は 0 以上 {count} 未満です: {text}")
+    return index, count
+
+
+def shard_of(artist_id: str, count: int) -> int:
+    """アーティストIDのシャード番号（プロセス・マシンによらず同じ値）"""
+    digest = hashlib.sha1(artist_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+def shard_artists(artists: Iterable[Dict], index: int, count: int) -> List[Dict]:
+    """シャード index に入るアーティストだけを元の順序で返す"""
+    return [artist for artist in artists if shard_of(artist['id'], count) == index]
+
+
+def partial_path(index: int, count: int, directory: str = DEFAULT_SHARD_DIR) -> str:
+    """部分グラフのデフォルトの書き出し先"""
+    return os.path.join(directory, f'shard{index}-of-{count}.json')
+
+
+def shard_suffix(path: str, index: int, count: int) -> str:
+    """シャードごとに分けるファイル（チェックポイントなど）のパス"""
+    base, ext = os.path.splitext(path)
+    return f'{base}.shard{index}-of-{count}{ext}'
+
+
+def write_partial(
+    path: str,
+    network_data: Dict[str, Any],
+    index: int,
+    count: int,
+    seed_artists: int,
+    compact: bool = False
+) -> List[str]:
+    """
+    build_network_data の結果を部分グラフとして書き出す（後処理はマージ時に行う）
+
+    Returns:
+        書き出したファイルのパス
+    """
+    network_data.setdefault('metadata', {})['shard'] = {
+        'index': index,
+        'count': count,
+        'seed_artists': seed_artists,
+    }
+    return write_network_json(path, network_data, compact=compact)
+
+
+def load_partials(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    部分グラフを読み込み、シャード番号順に並べる
+
+    シャード数が揃わない・同じシャードが重複する場合は ValueError。
+    足りないシャードは警告を表示してそのままマージする
+    """
+    partials = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        shard = data.get('metadata', {}).get('shard')
+        if shard is None:
+            raise ValueError(f"{path} は部分グラフではありません（metadata.shard がありません）")
+        partials.append((shard['index'], shard['count'], path, data))
+
+    counts = {count for _, count, _, _ in partials}
+    if len(counts) > 1:
+        raise ValueError(f"シャード数が異なる部分グラフが含まれています: {sorted(counts)}")
+    indices = [index for index, _, _, _ in partials]
+    duplicates = sorted({index for index in indices if indices.count(index) > 1})
+    if duplicates:
+        raise ValueError(f"同じシャードの部分グラフが複数あります: {duplicates}")
+    if counts:
+        missing = sorted(set(range(counts.pop())) - set(indices))
+        if missing:
+            print(f"  警告: シャード {', '.join(map(str, missing))} の部分グラフがありません")
+
+    partials.sort(key=lambda partial: partial[0])
+    return [data for _, _, _, data in partials]
+
+
+def merge_partials(partials: Iterable[Dict[str, Any]]) -> Tuple[CollaborationGraph, Dict[str, int]]:
+    """
+    部分グラフのノード・エッジを1つのグラフにまとめる
+
+    ノードはアーティストIDで、エッジはアーティストのペアでまとめる。
+    同じ楽曲が同じペアで複数のシャードにある場合は最初のものだけを数える
+
+    Returns:
+        (graph, counters)
+    """
+    merged = CollaborationGraph()
+    counters = {'partials': 0, 'collaborations': 0, 'duplicate_collaborations': 0}
+    # 楽曲ID -> 反映済みのペア（build_network_data の seen_tracks と同じ）
+    seen_tracks: Dict[str, set] = {}
+    for data in partials:
+        graph = CollaborationGraph.from_network_data(data)
+        if graph is None:
+            raise ValueError("部分グラフにアーティストID（spotify_id）がありません")
+        remap = [merged.intern(artist_id, name) for artist_id, name in zip(graph.artist_ids, graph.names)]
+        for idx, attrs in graph.nodes.items():
+            merged.add_node(graph.artist_ids[idx], graph.names[idx], **attrs)
+        for edge in graph.edges.values():
+            source, target = remap[edge['source']], remap[edge['target']]
+            edge_key = pack_pair(source, target)
+            for track in edge['tracks']:
+                track_pairs = seen_tracks.setdefault(track['track_id'], set())
+                if edge_key in track_pairs:
+                    counters['duplicate_collaborations'] += 1
+                    continue
+                track_pairs.add(edge_key)
+                merged.add_track(source, target, track)
+                counters['collaborations'] += 1
+        counters['partials'] += 1
+    return merged, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description='シャードごとの部分グラフをまとめてネットワークデータを生成')
+    parser.add_argument('partials', nargs='+', help='部分グラフのJSONファイル（--shard で書き出したもの）')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE,
+                        help=f'書き出すJSONファイル（デフォルト: {DEFAULT_OUTPUT_FILE}）')
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+
+    graph, counters = merge_partials(load_partials(args.partials))
+    network_data = graph.export(MERGED_DESCRIPTION)
+    print(f"{counters['partials']} 個の部分グラフをまとめました")
+    print(f"  コラボレーション: {counters['collaborations']}"
+          f"（シャード間の重複 {counters['duplicate_collaborations']} をスキップ）")
+
+    network_data, written_files = process_network(network_data, args.output, args)
+    print(f"\n✓ ネットワークデータを {args.output} に保存しました")
+    for path in written_files[1:]:
+        print(f"  {path} ({os.path.getsize(path) / 1024:.0f}KB)")
+    print(f"  ノード数: {network_data['metadata']['total_nodes']}")
+    print(f"  エッジ数: {network_data['metadata']['total_edges']}")
+    print(f"  コラボレーション数: {network_data['metadata']['total_collaborations']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,8 +10,6 @@
 """
 
 import os
-import json
-import time
 from collections import defaultdict
 from typing import Dict, List, Set, Optional
 import spotipy
@@ -19,6 +17,21 @@ from spotipy.oauth2 import SpotifyClientCredentials
 from spotipy.exceptions import SpotifyException
 from dotenv import load_dotenv
 
+from network_export import write_network_json
+from network_filter import NoiseFilter, filter_network, report as report_noise_filter
+from network_graph import CollaborationGraph, pack_pair
+from spotify_cache import DEFAULT_CACHE_PATH, CachedSpotify, ResponseCache
+from spotify_harvest import (
+    DISCOGRAPHY_GROUPS,
+    HarvestRegistry,
+    HarvestStats,
+    fetch_discography,
+    harvest_album_tracks,
+    harvest_in_order,
+)
+from spotify_metrics import DEFAULT_METRICS_PATH, ApiMetrics, InstrumentedSpotify
+from spotify_rate_limit import RateLimitedSpotify, RateLimiter, make_session
+
 # .envファイルから環境変数を読み込む
 load_dotenv()
 
@@ -31,16 +44,56 @@ if not CLIENT_ID or not CLIENT_SECRET:
         "SPOTIFY_CLIENT_ID と SPOTIFY_CLIENT_SECRET を環境変数または.envファイルに設定してください"
     )
 
+# APIレートリミット対策: 共有のレートリミッタ（トークンバケット）
+# 429エラーが発生しない間はレートを少しずつ上げ、429エラー時は半分に下げて
+# Retry-Afterヘッダーの間はすべてのリクエストを停止します
+# これにより、レート制限に達していない場合は高速に処理できます
+INITIAL_REQUEST_RATE = 10.0  # 初期レート（リクエスト/秒）
+MAX_REQUEST_RATE = 30.0  # レートの上限（リクエスト/秒）
+
+# APIレスポンスのディスクキャッシュ
+# 同じアーティスト・アルバム・楽曲の再取得を避け、再実行時のネットワークI/Oを削減します
+CACHE_PATH = os.getenv('SPOTIFY_CACHE_PATH', DEFAULT_CACHE_PATH)
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # キャッシュの最大サイズ（超えると古いものから削除）
+
 # Spotify APIクライアントの初期化
-sp = spotipy.Spotify(client_credentials_manager=SpotifyClientCredentials(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET
-))
+# 並列取得時も含めてすべてのリクエストを共有のレートリミッタに通し、
+# その外側をキャッシュでラップ（キャッシュヒット時は待機しない）
+# 429エラーはレートリミッタで処理するため、spotipy（urllib3）のリトライ対象から外す
+# レートリミッタの内側で、実際に送信したリクエストのレイテンシ・受信バイト数を計測
+rate_limiter = RateLimiter(rate=INITIAL_REQUEST_RATE, max_rate=MAX_REQUEST_RATE)
+api_metrics = ApiMetrics()
+sp = CachedSpotify(
+    RateLimitedSpotify(
+        InstrumentedSpotify(
+            spotipy.Spotify(
+                client_credentials_manager=SpotifyClientCredentials(
+                    client_id=CLIENT_ID,
+                    client_secret=CLIENT_SECRET
+                ),
+                requests_session=api_metrics.attach_session(
+                    make_session(status_forcelist=(500, 502, 503, 504))
+                )
+            ),
+            api_metrics
+        ),
+        rate_limiter,
+        metrics=api_metrics
+    ),
+    ResponseCache(CACHE_PATH, max_bytes=CACHE_MAX_BYTES)
+)
 
-# APIレートリミット対策: リクエスト間の待機時間（秒）
-# 0に設定すると、429エラーが発生した場合にのみRetry-Afterヘッダーに従って待機します
-# これにより、レート制限に達していない場合は高速に処理できます
-REQUEST_DELAY = 0.0  # 429エラー発生時のみ待機（より効率的）
+# APIリクエストの計測結果（実行終了時に書き出す）
+METRICS_PATH = os.getenv('SPOTIFY_METRICS_PATH', DEFAULT_METRICS_PATH)
+
+# 楽曲取得リクエスト数の集計（実行終了時に削減数を表示）
+harvest_stats = HarvestStats()
+
+# ディスコグラフィーの取得
+# アルバム一覧をページングし、コラボが含まれやすい種別（シングル→参加作品→アルバム）から
+# 新しい順に展開します。アーティストごとのリクエスト数（一覧のページ＋アルバム展開）は
+# DISCOGRAPHY_REQUEST_BUDGET までに制限します（Noneで無制限）
+DISCOGRAPHY_REQUEST_BUDGET = 8
 
 
 def search_japanese_artists(genres: List[str] = None, limit_per_genre: int = 50, max_pages: int = 3) -> List[Dict]:
@@ -109,23 +162,10 @@ def search_japanese_artists(genres: List[str] = None, limit_per_genre: int = 50,
                 # 次のページがあるかチェック
                 if len(artists_in_page) < page_limit or total_fetched >= limit_per_genre:
                     break
-                
-                if REQUEST_DELAY > 0:
-                    time.sleep(REQUEST_DELAY)
-                elif REQUEST_DELAY == 0:
-                    # 429エラーを避けるため、最小限の待機（0.05秒）
-                    time.sleep(0.05)
             
             print(f"  {genre}: {total_fetched} アーティストを取得")
-            if REQUEST_DELAY > 0:
-                time.sleep(REQUEST_DELAY)
             
         except SpotifyException as e:
-            if e.http_status == 429:  # Rate limit exceeded
-                retry_after = int(e.headers.get('Retry-After', 60))
-                print(f"  レート制限に達しました。{retry_after}秒待機します...")
-                time.sleep(retry_after)
-                continue
             print(f"  エラー ({genre}): {e}")
             continue
         except Exception as e:
@@ -136,70 +176,44 @@ def search_japanese_artists(genres: List[str] = None, limit_per_genre: int = 50,
     return all_artists
 
 
-def get_artist_tracks(artist_id: str, limit: int = 50) -> List[Dict]:
+def get_artist_tracks(artist_id: str, limit: int = 50, registry: Optional[HarvestRegistry] = None) -> List[Dict]:
     """
     アーティストの楽曲を取得
     
     Args:
         artist_id: SpotifyアーティストID
         limit: 取得する楽曲数
+        registry: 展開済みのアルバム・取得済みの楽曲詳細の共有先
     
     Returns:
         楽曲情報のリスト
     """
     try:
-        albums = sp.artist_albums(artist_id, album_type='album,single', limit=50)
-        track_ids = []
-        
-        for album in albums['items']:
-            try:
-                album_tracks = sp.album_tracks(album['id'])
-                for track in album_tracks['items']:
-                    if track['id']:
-                        track_ids.append(track['id'])
-                    if len(track_ids) >= limit:
-                        break
-                if len(track_ids) >= limit:
-                    break
-                if REQUEST_DELAY > 0:
-                    time.sleep(REQUEST_DELAY * 0.5)  # アルバム取得時の待機（オプション）
-            except SpotifyException as e:
-                if e.http_status == 429:
-                    retry_after = int(e.headers.get('Retry-After', 60))
-                    print(f"    レート制限: {retry_after}秒待機...")
-                    time.sleep(retry_after)
-                    continue
-                continue
-        
-        if not track_ids:
-            return []
-        
-        # 楽曲の詳細情報を取得（バッチ処理）
-        tracks = []
-        batch_size = 50  # Spotify APIの最大バッチサイズ
-        for i in range(0, len(track_ids), batch_size):
-            batch = track_ids[i:i + batch_size]
-            try:
-                batch_tracks = sp.tracks(batch)
-                tracks.extend(batch_tracks['tracks'])
-                if REQUEST_DELAY > 0:
-                    time.sleep(REQUEST_DELAY)
-            except SpotifyException as e:
-                if e.http_status == 429:
-                    retry_after = int(e.headers.get('Retry-After', 60))
-                    print(f"    レート制限: {retry_after}秒待機...")
-                    time.sleep(retry_after)
-                    continue
-                continue
+        albums, album_total, used = fetch_discography(
+            sp,
+            artist_id,
+            groups=DISCOGRAPHY_GROUPS,
+            max_requests=DISCOGRAPHY_REQUEST_BUDGET,
+            stats=harvest_stats
+        )
+        album_ids = [album['id'] for album in albums]
         
-        return tracks[:limit]
+        # アルバムを20件ずつまとめて展開し、コラボ曲のみ詳細情報を取得
+        # 参加作品（appears_on）からは対象アーティストが参加している楽曲のみを使う
+        return harvest_album_tracks(
+            sp,
+            artist_id,
+            album_ids,
+            limit=limit,
+            stats=harvest_stats,
+            registry=registry,
+            max_album_requests=(
+                None if DISCOGRAPHY_REQUEST_BUDGET is None else DISCOGRAPHY_REQUEST_BUDGET - used
+            ),
+            featured_album_ids={album['id'] for album in albums if album['album_group'] == 'appears_on'}
+        )
         
     except SpotifyException as e:
-        if e.http_status == 429:
-            retry_after = int(e.headers.get('Retry-After', 60))
-            print(f"  レート制限 (アーティスト {artist_id}): {retry_after}秒待機...")
-            time.sleep(retry_after)
-            return []
         print(f"  エラー (アーティスト {artist_id}): {e}")
         return []
     except Exception as e:
@@ -234,8 +248,6 @@ def find_artists_with_featurings(artists: List[Dict], min_tracks: int = 5, max_a
         
         try:
             tracks = get_artist_tracks(artist_id, limit=30)
-            if REQUEST_DELAY > 0:
-                time.sleep(REQUEST_DELAY)
             
             # フィーチャリングがある楽曲をカウント
             featuring_count = 0
@@ -261,7 +273,8 @@ def build_network_data(
     artists: List[Dict], 
     max_artists: int = 200,
     include_featured_artists: bool = True,
-    min_tracks_per_artist: int = 30
+    min_tracks_per_artist: int = 30,
+    concurrency: int = 1
 ) -> Dict:
     """
     ネットワークデータを構築
@@ -271,6 +284,7 @@ def build_network_data(
         max_artists: 処理する最大アーティスト数
         include_featured_artists: フィーチャリングアーティストもノードに追加するか
         min_tracks_per_artist: 各アーティストから取得する最小楽曲数
+        concurrency: 同時に楽曲を取得するアーティスト数（結果はアーティスト順にマージ）
     
     Returns:
         ネットワークデータ（JSON形式）
@@ -278,93 +292,83 @@ def build_network_data(
     print(f"\nネットワークデータを構築中... (最大 {max_artists} アーティスト)")
     print(f"  フィーチャリングアーティストも含める: {include_featured_artists}")
     
-    # ノードとエッジの準備
-    nodes_dict: Dict[str, Dict] = {}
-    edges_dict: Dict[tuple, Dict] = {}
-    artist_name_to_id: Dict[str, str] = {}
-    featured_artists_to_fetch: Set[str] = set()  # 後で検索するフィーチャリングアーティスト
+    # ノードとエッジの準備（アーティストIDで識別し、出力では名前を使う）
+    graph = CollaborationGraph()
+    featured_artists_to_fetch: Set[str] = set()  # 後で検索するフィーチャリングアーティストのID
     
-    # アーティスト名からIDへのマッピングを作成
+    # シードアーティストをノードに追加
     for artist in artists[:max_artists]:
-        artist_name = artist['name']
-        artist_id = artist['id']
-        artist_name_to_id[artist_name] = artist_id
-        
-        # ノードを追加
-        if artist_name not in nodes_dict:
-            nodes_dict[artist_name] = {
-                'id': artist_name,
-                'name': artist_name,
-                'degree': 0
-            }
+        graph.add_node(artist['id'], artist['name'])
     
     # 各アーティストの楽曲を処理
     processed = 0
     total_tracks_processed = 0
     total_collaborations_found = 0
+    duplicate_collaborations = 0
+    # 楽曲ID -> 反映済みのペア（コラボ曲は参加アーティストそれぞれから取得されるため、
+    # 同じ楽曲を同じペアに二重に数えない）
+    seen_tracks: Dict[str, Set[int]] = defaultdict(set)
+    # 展開済みのアルバム・取得済みの楽曲詳細（コンピレーションやスプリットシングルを
+    # 参加アーティストごとに再取得しない）
+    registry = HarvestRegistry()
+    
+    def fetch_tracks(artist: Dict) -> List[Dict]:
+        try:
+            return get_artist_tracks(artist['id'], limit=min_tracks_per_artist, registry=registry)
+        except Exception as e:
+            print(f"    エラー ({artist['name']}): {e}")
+            return []
     
-    for artist in artists[:max_artists]:
+    # 楽曲の取得は並列、マージはアーティスト順に逐次
+    for artist, tracks in harvest_in_order(fetch_tracks, artists[:max_artists], concurrency):
         artist_name = artist['name']
         artist_id = artist['id']
         processed += 1
         
         if processed % 10 == 0:
             print(f"  処理中: {processed}/{min(len(artists), max_artists)} "
-                  f"(エッジ: {len(edges_dict)}, ノード: {len(nodes_dict)})")
+                  f"(エッジ: {len(graph.edges)}, ノード: {len(graph.nodes)})")
         
         try:
-            tracks = get_artist_tracks(artist_id, limit=min_tracks_per_artist)
-            if REQUEST_DELAY > 0:
-                time.sleep(REQUEST_DELAY)
             total_tracks_processed += len(tracks)
+            source = graph.intern(artist_id, artist_name)
             
             for track in tracks:
                 track_name = track['name']
                 track_id = track['id']
                 
-                # 楽曲のアーティスト情報を取得
-                track_artists = [a['name'] for a in track['artists']]
-                
                 # メインアーティスト以外をフィーチャリングアーティストとして扱う
-                for featured_artist in track_artists:
-                    if featured_artist == artist_name:
+                for featured_artist in track['artists']:
+                    featured_id = featured_artist.get('id')
+                    if not featured_id or featured_id == artist_id:
                         continue
                     
-                    # フィーチャリングアーティストがノードに存在しない場合
-                    if featured_artist not in nodes_dict:
-                        if include_featured_artists:
-                            # ノードに追加
-                            nodes_dict[featured_artist] = {
-                                'id': featured_artist,
-                                'name': featured_artist,
-                                'degree': 0
-                            }
-                            # 後でアーティスト情報を取得するために記録
-                            featured_artists_to_fetch.add(featured_artist)
-                    
-                    # エッジのキー（順序を正規化）
-                    edge_key = tuple(sorted([artist_name, featured_artist]))
+                    if include_featured_artists:
+                        # フィーチャリングアーティストがノードに存在しない場合は
+                        # 後でアーティスト情報を取得するために記録
+                        if graph.index.get(featured_id) not in graph.nodes:
+                            featured_artists_to_fetch.add(featured_id)
+                        target = graph.add_node(featured_id, featured_artist['name'])
+                    else:
+                        target = graph.intern(featured_id, featured_artist['name'])
                     
-                    if edge_key not in edges_dict:
-                        edges_dict[edge_key] = {
-                            'source': artist_name,
-                            'target': featured_artist,
-                            'weight': 0,
-                            'tracks': []
-                        }
+                    # エッジのキー（順序を正規化した整数）
+                    edge_key = pack_pair(source, target)
                     
-                    # エッジの重みを増加
-                    edges_dict[edge_key]['weight'] += 1
-                    total_collaborations_found += 1
+                    if edge_key in seen_tracks[track_id]:
+                        duplicate_collaborations += 1
+                        continue
+                    seen_tracks[track_id].add(edge_key)
                     
-                    # 楽曲情報を追加
+                    # 楽曲情報を追加し、エッジの重みを増加
                     track_info = {
                         'track_name': track_name,
                         'track_id': track_id,
                         'popularity': track.get('popularity', 0),
                         'genre': 'J-Pop'  # デフォルト値、後で改善可能
                     }
-                    edges_dict[edge_key]['tracks'].append(track_info)
+                    graph.add_track(source, target, track_info)
+                    total_collaborations_found += 1
         
         except Exception as e:
             print(f"    エラー ({artist_name}): {e}")
@@ -373,40 +377,11 @@ def build_network_data(
     print(f"\n  処理完了:")
     print(f"    処理した楽曲数: {total_tracks_processed}")
     print(f"    見つかったコラボレーション: {total_collaborations_found}")
+    print(f"    重複のためスキップしたコラボレーション: {duplicate_collaborations}")
     print(f"    追加されたフィーチャリングアーティスト: {len(featured_artists_to_fetch)}")
     
-    # ノードの次数を計算
-    for edge in edges_dict.values():
-        source = edge['source']
-        target = edge['target']
-        if source in nodes_dict:
-            nodes_dict[source]['degree'] += edge['weight']
-        if target in nodes_dict:
-            nodes_dict[target]['degree'] += edge['weight']
-    
-    # エッジをリストに変換（重みでソート）
-    edges = list(edges_dict.values())
-    edges.sort(key=lambda x: x['weight'], reverse=True)
-    
-    # ノードをリストに変換（次数でソート）
-    nodes = list(nodes_dict.values())
-    nodes.sort(key=lambda x: x['degree'], reverse=True)
-    
-    # メタデータを計算
-    total_collaborations = sum(edge['weight'] for edge in edges)
-    
-    network_data = {
-        'nodes': nodes,
-        'edges': edges,
-        'metadata': {
-            'total_nodes': len(nodes),
-            'total_edges': len(edges),
-            'total_collaborations': total_collaborations,
-            'description': 'Japanese Music Featuring Network - Generated from Spotify API'
-        }
-    }
-    
-    return network_data
+    # 次数を計算し、ノード（次数順）・エッジ（重み順）をまとめる
+    return graph.export('Japanese Music Featuring Network - Generated from Spotify API')
 
 
 def main():
@@ -414,10 +389,8 @@ def main():
     print("=" * 60)
     print("日本のアーティスト フィーチャリングネットワーク生成")
     print("=" * 60)
-    if REQUEST_DELAY > 0:
-        print(f"APIレートリミット対策: {REQUEST_DELAY}秒/リクエスト")
-    else:
-        print("APIレートリミット対策: 429エラー発生時のみ待機（Retry-Afterヘッダーを使用）")
+    print(f"APIレートリミット対策: 初期 {INITIAL_REQUEST_RATE} リクエスト/秒（429エラーが出るまで最大 "
+          f"{MAX_REQUEST_RATE} リクエスト/秒まで自動調整、429エラー時はRetry-Afterの間すべて停止）")
     
     # パラメータ設定（チャート上位1000人を目指す）
     # 目標: ノード1000以上、エッジ500以上、コラボレーション3000以上
@@ -426,6 +399,7 @@ def main():
     SEARCH_LIMIT_PER_GENRE = 50  # 各ジャンルから取得するアーティスト数（APIの最大値、ページネーションで増やす）
     MAX_ARTISTS_TO_PROCESS = 1000  # 処理する最大アーティスト数（チャート上位1000人を目指す）
     MIN_TRACKS_PER_ARTIST = 100  # 各アーティストから取得する楽曲数（より多くのコラボレーションを発見）
+    CRAWL_CONCURRENCY = 4  # 同時に楽曲を取得するアーティスト数（1で逐次処理）
     FILTER_BY_FEATURINGS = False  # フィルタリングを無効化して、より多くのアーティストを処理
     
     # 1. 日本のアーティストを検索（より多くのジャンルから取得）
@@ -456,13 +430,17 @@ def main():
         artists, 
         max_artists=MAX_ARTISTS_TO_PROCESS,
         include_featured_artists=True,  # フィーチャリングアーティストもノードに追加
-        min_tracks_per_artist=MIN_TRACKS_PER_ARTIST
+        min_tracks_per_artist=MIN_TRACKS_PER_ARTIST,
+        concurrency=CRAWL_CONCURRENCY
     )
     
-    # 4. 結果を保存
+    # 4. ノイズノードと孤立ノードを除外
+    network_data = filter_network(network_data, NoiseFilter.load())
+    report_noise_filter(network_data)
+    
+    # 5. 結果を保存
     output_file = 'public/japanese_featuring_network.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(network_data, f, ensure_ascii=False, indent=2)
+    write_network_json(output_file, network_data)
     
     print(f"\n{'=' * 60}")
     print(f"✓ ネットワークデータを {output_file} に保存しました")
@@ -470,6 +448,12 @@ def main():
     print(f"  ノード数: {network_data['metadata']['total_nodes']}")
     print(f"  エッジ数: {network_data['metadata']['total_edges']}")
     print(f"  コラボレーション数: {network_data['metadata']['total_collaborations']}")
+    harvest_stats.report()
+    sp.cache_report()
+    rate_limiter.report()
+    api_metrics.report()
+    api_metrics.write_json(METRICS_PATH)
+    print(f"\n  APIリクエストの計測結果を {METRICS_PATH} に保存しました")
     # 処理時間の見積もり
     # デフォルトのジャンル数を計算
     default_genres_count = 15  # j-pop, j-rock, j-idol, anime, japanese, japanese pop, japanese rock, j-rap, japanese hip hop, japanese indie, japanese alternative, japanese electronic, japanese r&b, japanese metal, japanese punk
@@ -485,11 +469,8 @@ def main():
             search_requests +  # 検索
             (MAX_ARTISTS_TO_PROCESS * 6)  # ネットワーク構築（各アーティスト6リクエスト）
         )
-    if REQUEST_DELAY > 0:
-        estimated_time_minutes = (estimated_requests * REQUEST_DELAY) / 60
-        print(f"\n  処理時間の目安: 約 {estimated_time_minutes:.1f} 分（REQUEST_DELAY考慮）")
-    else:
-        print(f"\n  処理時間の目安: 429エラーが発生しない場合、数分〜十数分程度")
+    estimated_time_minutes = (estimated_requests / INITIAL_REQUEST_RATE) / 60
+    print(f"\n  処理時間の目安: 最大 約 {estimated_time_minutes:.1f} 分（初期レートのまま、キャッシュなしの場合）")
     print(f"  見積もりリクエスト数: 約 {estimated_requests:,} リクエスト")
 
 
@@ -14,16 +14,36 @@
 4. python scripts/fetch_japanese_artists_from_charts.py を実行
 """
 
+import argparse
+import atexit
 import os
-import json
-import time
 from collections import defaultdict
-from typing import Dict, List, Set, Optional
+from typing import Callable, Dict, Iterator, List, Set, Optional, Tuple
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
 from spotipy.exceptions import SpotifyException
 from dotenv import load_dotenv
 
+from crawl_checkpoint import DEFAULT_CHECKPOINT_PATH, CrawlCheckpoint
+from crawl_frontier import DEFAULT_MAX_DEPTH, CrawlFrontier
+from crawl_shards import parse_shard, partial_path, shard_artists, shard_suffix, write_partial
+from incremental_refresh import DEFAULT_MANIFEST_PATH, NetworkManifest
+from network_graph import CollaborationGraph, pack_pair
+from network_pipeline import add_pipeline_arguments, process_network
+from spotify_cache import DEFAULT_CACHE_PATH, CachedSpotify, ResponseCache
+from spotify_fixtures import FixtureArchive, RecordingSpotify, ReplaySpotify
+from spotify_harvest import (
+    DISCOGRAPHY_GROUPS,
+    HarvestRegistry,
+    HarvestStats,
+    fetch_discography,
+    harvest_album_tracks,
+    harvest_in_order,
+    index_edge_tracks,
+)
+from spotify_metrics import DEFAULT_METRICS_PATH, ApiMetrics, InstrumentedSpotify
+from spotify_rate_limit import RateLimitedSpotify, RateLimiter, make_session
+
 # .envファイルから環境変数を読み込む
 load_dotenv()
 
@@ -36,17 +56,68 @@ if not CLIENT_ID or not CLIENT_SECRET:
         "SPOTIFY_CLIENT_ID と SPOTIFY_CLIENT_SECRET を環境変数または.envファイルに設定してください"
     )
 
+# APIレートリミット対策
+# すべてのAPI呼び出しは共有のレートリミッタ（トークンバケット）を通ります
+# 429エラーが発生しない間はレートを少しずつ上げ、429エラー時は半分に下げて
+# Retry-Afterの間はすべてのリクエストを停止します
+# 注意: IPアドレスベースのレート制限がある場合、初期レート・上限を下げてください
+INITIAL_REQUEST_RATE = 5.0  # 初期レート（1秒あたり約5リクエスト）
+MAX_REQUEST_RATE = 20.0  # レートの上限（リクエスト/秒）
+
+# APIレスポンスのディスクキャッシュ
+# 同じアーティスト・アルバム・楽曲の再取得を避け、再実行時のネットワークI/Oを削減します
+CACHE_PATH = os.getenv('SPOTIFY_CACHE_PATH', DEFAULT_CACHE_PATH)
+CACHE_MAX_BYTES = 512 * 1024 * 1024  # キャッシュの最大サイズ（超えると古いものから削除）
+
 # Spotify APIクライアントの初期化
-sp = spotipy.Spotify(client_credentials_manager=SpotifyClientCredentials(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET
-))
+# 並列取得時も含めてすべてのリクエストを共有のレートリミッタに通し、
+# その外側をキャッシュでラップ（キャッシュヒット時は待機しない）
+# 429エラーはレートリミッタで処理するため、spotipy（urllib3）のリトライ対象から外す
+# レートリミッタの内側で、実際に送信したリクエストのレイテンシ・受信バイト数を計測
+rate_limiter = RateLimiter(rate=INITIAL_REQUEST_RATE, max_rate=MAX_REQUEST_RATE)
+api_metrics = ApiMetrics()
+sp = CachedSpotify(
+    RateLimitedSpotify(
+        InstrumentedSpotify(
+            spotipy.Spotify(
+                client_credentials_manager=SpotifyClientCredentials(
+                    client_id=CLIENT_ID,
+                    client_secret=CLIENT_SECRET
+                ),
+                requests_session=api_metrics.attach_session(
+                    make_session(status_forcelist=(500, 502, 503, 504))
+                )
+            ),
+            api_metrics
+        ),
+        rate_limiter,
+        metrics=api_metrics
+    ),
+    ResponseCache(CACHE_PATH, max_bytes=CACHE_MAX_BYTES)
+)
 
-# APIレートリミット対策
-# レート制限を避けるため、リクエスト間に最小限の待機時間を設定
-# 注意: IPアドレスベースのレート制限がある場合、さらに長くする必要があります
-REQUEST_DELAY = 0.2  # 0.2秒/リクエスト（1秒あたり約5リクエスト、より安全な値）
-# もしレート制限に達した場合は、0.5秒以上に増やすことを推奨します
+# APIリクエストの計測結果（実行終了時に書き出す）
+METRICS_PATH = os.getenv('SPOTIFY_METRICS_PATH', DEFAULT_METRICS_PATH)
+
+# ネットワーク構築のチェックポイント（中断時は --resume で再開）
+CHECKPOINT_PATH = os.getenv('CRAWL_CHECKPOINT_PATH', DEFAULT_CHECKPOINT_PATH)
+CHECKPOINT_INTERVAL = 25  # 何アーティスト処理するごとに保存するか
+
+# 出力先と差分更新用のアルバム記録（マニフェスト）
+OUTPUT_FILE = 'public/japanese_featuring_network.json'
+MANIFEST_PATH = os.getenv('NETWORK_MANIFEST_PATH', DEFAULT_MANIFEST_PATH)
+
+# 楽曲取得リクエスト数の集計（実行終了時に削減数を表示）
+harvest_stats = HarvestStats()
+
+# ディスコグラフィーの取得
+# アルバム一覧をページングし、コラボが含まれやすい種別（シングル→参加作品→アルバム）から
+# 新しい順に展開します。アーティストごとのリクエスト数（一覧のページ＋アルバム展開）は
+# DISCOGRAPHY_REQUEST_BUDGET までに制限します（Noneで無制限）
+DISCOGRAPHY_REQUEST_BUDGET = 8
+
+# Get Several Artists の最大ID数
+ARTISTS_BATCH_SIZE = 50
 
 # 日本のチャートプレイリストID
 # 注意: プレイリストIDは地域や時間によって変わる可能性があります
@@ -61,6 +132,59 @@ ALTERNATIVE_PLAYLISTS = [
 ]
 
 
+class ArtistCollector:
+    """
+    未取得のアーティストIDを蓄積し、Get Several Artists で50件ずつまとめて詳細を取得する
+    
+    目標数（既存のアーティストを含む）に達した時点で収集を打ち切る。
+    取得に失敗したIDは既存の処理と同様にスキップする
+    """
+    
+    def __init__(self, target_count: int, existing_artists: Set[str]):
+        self.needed = target_count - len(existing_artists)
+        self.seen_ids = existing_artists.copy()
+        self.pending: List[str] = []
+        self.artists: List[Dict] = []
+        self.requests = 0
+    
+    @property
+    def is_done(self) -> bool:
+        """目標数のアーティスト詳細を取得済みか"""
+        return len(self.artists) >= self.needed
+    
+    @property
+    def is_full(self) -> bool:
+        """取得待ちを含めて目標数に達しているか"""
+        return len(self.artists) + len(self.pending) >= self.needed
+    
+    def add(self, artist_id: str) -> None:
+        """未取得のアーティストIDを追加（50件たまったら取得）"""
+        if self.is_full or artist_id in self.seen_ids:
+            return
+        self.seen_ids.add(artist_id)
+        self.pending.append(artist_id)
+        if len(self.pending) >= ARTISTS_BATCH_SIZE:
+            self.flush()
+    
+    def flush(self) -> None:
+        """取得待ちのアーティストIDを50件ずつまとめて解決"""
+        while self.pending:
+            batch = self.pending[:ARTISTS_BATCH_SIZE]
+            del self.pending[:ARTISTS_BATCH_SIZE]
+            try:
+                results = sp.artists(batch)
+                self.requests += 1
+            except SpotifyException:
+                # 取得できないアーティストはスキップ
+                continue
+            except Exception:
+                continue
+            
+            for artist_info in results.get('artists') or []:
+                if artist_info and not self.is_done:
+                    self.artists.append(artist_info)
+
+
 def get_artists_from_playlist(playlist_id: str, playlist_name: str, target_count: int, existing_artists: Set[str]) -> List[Dict]:
     """
     プレイリストからアーティストを取得
@@ -99,25 +223,19 @@ def get_artists_from_playlist(playlist_id: str, playlist_name: str, target_count
         print(f"  予期しないエラー: {e}")
         return []
     
-    artists = []
-    seen_ids = existing_artists.copy()
+    collector = ArtistCollector(target_count, existing_artists)
     offset = 0
     limit = 100  # プレイリスト取得の最大値
     
     try:
-        while len(artists) + len(existing_artists) < target_count:
+        while not collector.is_done:
             # プレイリストのトラックを取得
             # marketパラメータを削除して試す（地域制限がある場合）
             try:
                 # まずmarketパラメータなしで試す
                 results = sp.playlist_tracks(playlist_id, limit=limit, offset=offset)
             except SpotifyException as e:
-                if e.http_status == 429:
-                    retry_after = int(e.headers.get('Retry-After', 60))
-                    print(f"  レート制限: {retry_after}秒待機...")
-                    time.sleep(retry_after)
-                    continue
-                elif e.http_status == 404:
+                if e.http_status == 404:
                     print(f"  警告: トラックが見つかりません（404エラー）")
                     break
                 elif e.http_status == 403:
@@ -132,7 +250,7 @@ def get_artists_from_playlist(playlist_id: str, playlist_name: str, target_count
             if not results['items']:
                 break  # これ以上取得できない
             
-            # トラックからアーティストを抽出
+            # トラックからアーティストIDを収集（詳細は50件ずつまとめて取得）
             for item in results['items']:
                 if not item or not item.get('track'):
                     continue
@@ -144,52 +262,28 @@ def get_artists_from_playlist(playlist_id: str, playlist_name: str, target_count
                 for artist in track['artists']:
                     if not artist or not artist.get('id'):
                         continue
-                    
-                    artist_id = artist['id']
-                    
-                    if artist_id not in seen_ids:
-                        try:
-                            # アーティストの詳細情報を取得
-                            artist_info = sp.artist(artist_id)
-                            seen_ids.add(artist_id)
-                            artists.append(artist_info)
-                            
-                            # 目標数に達したら停止
-                            if len(artists) + len(existing_artists) >= target_count:
-                                break
-                            
-                            time.sleep(REQUEST_DELAY)  # レート制限対策
-                        
-                        except SpotifyException as e:
-                            if e.http_status == 429:
-                                retry_after = int(e.headers.get('Retry-After', 60))
-                                print(f"    レート制限: {retry_after}秒待機...")
-                                time.sleep(retry_after)
-                                continue
-                            elif e.http_status == 404:
-                                # アーティストが見つからない場合はスキップ
-                                continue
-                            continue
-                        except Exception as e:
-                            continue
+                    collector.add(artist['id'])
                 
-                if len(artists) + len(existing_artists) >= target_count:
+                if collector.is_full:
                     break
             
+            # 目標数に届いた場合のみここで解決（それ以外は次のページと合わせて50件ずつ）
+            if collector.is_full:
+                collector.flush()
             offset += len(results['items'])
             
             # 次のページがあるかチェック
             if len(results['items']) < limit:
                 break
-            
-            time.sleep(REQUEST_DELAY)  # レート制限対策
         
-        print(f"  ✓ {len(artists)} アーティストを取得しました")
-        return artists
+        collector.flush()
+        print(f"  ✓ {len(collector.artists)} アーティストを取得しました "
+              f"(アーティスト詳細: {collector.requests} リクエスト)")
+        return collector.artists
     
     except Exception as e:
         print(f"  エラー ({playlist_name}): {e}")
-        return artists
+        return collector.artists
 
 
 def get_artists_from_new_releases(target_count: int, existing_artists: Set[str], market: str = 'JP', max_pages: int = 10) -> List[Dict]:
@@ -207,29 +301,24 @@ def get_artists_from_new_releases(target_count: int, existing_artists: Set[str],
     """
     print(f"\n最新リリースからアーティストを取得中... (market: {market})")
     
-    artists = []
-    seen_ids = existing_artists.copy()
+    collector = ArtistCollector(target_count, existing_artists)
     limit = 50  # 新規リリース取得の最大値
     offset = 0
     page_count = 0
     
     try:
-        while len(artists) + len(existing_artists) < target_count and page_count < max_pages:
+        while not collector.is_done and page_count < max_pages:
             try:
                 # 最新リリースを取得
                 results = sp.new_releases(limit=limit, offset=offset, country=market)
             except SpotifyException as e:
-                if e.http_status == 429:
-                    retry_after = int(e.headers.get('Retry-After', 60))
-                    print(f"  レート制限: {retry_after}秒待機...")
-                    time.sleep(retry_after)
-                    continue
                 print(f"  エラー: {e}")
                 break
             
             if not results.get('albums') or not results['albums'].get('items'):
                 break
             
+            # アルバムからアーティストIDを収集（詳細は50件ずつまとめて取得）
             for album in results['albums']['items']:
                 if not album or not album.get('artists'):
                     continue
@@ -237,52 +326,30 @@ def get_artists_from_new_releases(target_count: int, existing_artists: Set[str],
                 for artist in album['artists']:
                     if not artist or not artist.get('id'):
                         continue
-                    
-                    artist_id = artist['id']
-                    
-                    if artist_id not in seen_ids:
-                        try:
-                            # アーティストの詳細情報を取得
-                            artist_info = sp.artist(artist_id)
-                            seen_ids.add(artist_id)
-                            artists.append(artist_info)
-                            
-                            if len(artists) + len(existing_artists) >= target_count:
-                                break
-                            
-                            if REQUEST_DELAY > 0:
-                                time.sleep(REQUEST_DELAY)
-                            elif REQUEST_DELAY == 0:
-                                time.sleep(REQUEST_DELAY)  # レート制限対策
-                        
-                        except SpotifyException as e:
-                            if e.http_status == 429:
-                                retry_after = int(e.headers.get('Retry-After', 60))
-                                print(f"    レート制限: {retry_after}秒待機...")
-                                time.sleep(retry_after)
-                                continue
-                            continue
-                        except Exception as e:
-                            continue
+                    collector.add(artist['id'])
                 
-                if len(artists) + len(existing_artists) >= target_count:
+                if collector.is_full:
                     break
             
+            # 目標数に届いた場合のみここで解決（それ以外は次のページと合わせて50件ずつ）
+            if collector.is_full:
+                collector.flush()
             offset += len(results['albums']['items'])
             
             if len(results['albums']['items']) < limit:
                 break
-            
-            time.sleep(REQUEST_DELAY)  # レート制限対策
         
+        collector.flush()
+        artists = collector.artists
         # popularity順にソート
         artists.sort(key=lambda x: x.get('popularity', 0), reverse=True)
-        print(f"  ✓ {len(artists)} アーティストを取得しました（最新リリース、popularity順）")
+        print(f"  ✓ {len(artists)} アーティストを取得しました（最新リリース、popularity順） "
+              f"(アーティスト詳細: {collector.requests} リクエスト)")
         return artists
     
     except Exception as e:
         print(f"  エラー: {e}")
-        return artists
+        return collector.artists
 
 
 def search_japanese_artists_by_popularity(target_count: int, existing_artists: Set[str], genres: List[str] = None, max_pages_per_genre: int = 5) -> List[Dict]:
@@ -330,11 +397,6 @@ def search_japanese_artists_by_popularity(target_count: int, existing_artists: S
                         market='JP'
                     )
                 except SpotifyException as e:
-                    if e.http_status == 429:
-                        retry_after = int(e.headers.get('Retry-After', 60))
-                        print(f"  レート制限 ({genre}): {retry_after}秒待機...")
-                        time.sleep(retry_after)
-                        continue
                     print(f"  エラー ({genre}): {e}")
                     break
                 
@@ -355,8 +417,6 @@ def search_japanese_artists_by_popularity(target_count: int, existing_artists: S
                 
                 offset += len(artists_in_page)
                 page_count += 1
-                
-                time.sleep(REQUEST_DELAY)  # レート制限対策
             
             if len(all_artists) + len(existing_artists) >= target_count:
                 break
@@ -372,61 +432,53 @@ def search_japanese_artists_by_popularity(target_count: int, existing_artists: S
     return all_artists
 
 
-def get_artist_tracks(artist_id: str, limit: int = 50) -> List[Dict]:
+def get_artist_tracks(
+    artist_id: str,
+    limit: int = 50,
+    select_albums: Optional[Callable[[List[str], Optional[int]], List[str]]] = None,
+    registry: Optional[HarvestRegistry] = None,
+    harvested_album_ids: Optional[List[str]] = None
+) -> List[Dict]:
     """
     アーティストの楽曲を取得（既存の関数を再利用）
+    
+    select_albums を渡すと、アルバム一覧（IDのリストと総数）を受け取り、
+    楽曲を取得するアルバムIDを返す関数として使う（差分更新用）
+    
+    registry を渡すと、展開済みのアルバム・取得済みの楽曲詳細を再利用する
+    
+    harvested_album_ids を渡すと、収録曲をすべて取得したアルバムのIDを追加する
+    （エラー時は追加しない）
     """
     try:
-        albums = sp.artist_albums(artist_id, album_type='album,single', limit=50)
-        track_ids = []
-        
-        for album in albums['items']:
-            try:
-                album_tracks = sp.album_tracks(album['id'])
-                for track in album_tracks['items']:
-                    if track['id']:
-                        track_ids.append(track['id'])
-                    if len(track_ids) >= limit:
-                        break
-                if len(track_ids) >= limit:
-                    break
-                time.sleep(REQUEST_DELAY * 0.5)  # レート制限対策
-            except SpotifyException as e:
-                if e.http_status == 429:
-                    retry_after = int(e.headers.get('Retry-After', 60))
-                    print(f"    レート制限: {retry_after}秒待機...")
-                    time.sleep(retry_after)
-                    continue
-                continue
-        
-        if not track_ids:
-            return []
-        
-        # 楽曲の詳細情報を取得（バッチ処理）
-        tracks = []
-        batch_size = 50
-        for i in range(0, len(track_ids), batch_size):
-            batch = track_ids[i:i + batch_size]
-            try:
-                batch_tracks = sp.tracks(batch)
-                tracks.extend(batch_tracks['tracks'])
-                time.sleep(REQUEST_DELAY)  # レート制限対策
-            except SpotifyException as e:
-                if e.http_status == 429:
-                    retry_after = int(e.headers.get('Retry-After', 60))
-                    print(f"    レート制限: {retry_after}秒待機...")
-                    time.sleep(retry_after)
-                    continue
-                continue
+        albums, album_total, used = fetch_discography(
+            sp,
+            artist_id,
+            groups=DISCOGRAPHY_GROUPS,
+            max_requests=DISCOGRAPHY_REQUEST_BUDGET,
+            stats=harvest_stats
+        )
+        album_ids = [album['id'] for album in albums]
+        if select_albums is not None:
+            album_ids = select_albums(album_ids, album_total)
         
-        return tracks[:limit]
+        # アルバムを20件ずつまとめて展開し、コラボ曲のみ詳細情報を取得
+        # 参加作品（appears_on）からは対象アーティストが参加している楽曲のみを使う
+        return harvest_album_tracks(
+            sp,
+            artist_id,
+            album_ids,
+            limit=limit,
+            stats=harvest_stats,
+            registry=registry,
+            max_album_requests=(
+                None if DISCOGRAPHY_REQUEST_BUDGET is None else DISCOGRAPHY_REQUEST_BUDGET - used
+            ),
+            featured_album_ids={album['id'] for album in albums if album['album_group'] == 'appears_on'},
+            harvested_album_ids=harvested_album_ids
+        )
         
     except SpotifyException as e:
-        if e.http_status == 429:
-            retry_after = int(e.headers.get('Retry-After', 60))
-            print(f"  レート制限 (アーティスト {artist_id}): {retry_after}秒待機...")
-            time.sleep(retry_after)
-            return []
         print(f"  エラー (アーティスト {artist_id}): {e}")
         return []
     except Exception as e:
@@ -438,149 +490,270 @@ def build_network_data(
     artists: List[Dict], 
     max_artists: int = 1000,
     include_featured_artists: bool = True,
-    min_tracks_per_artist: int = 100
+    min_tracks_per_artist: int = 100,
+    concurrency: int = 1,
+    checkpoint: Optional[CrawlCheckpoint] = None,
+    manifest: Optional[NetworkManifest] = None,
+    base_network: Optional[CollaborationGraph] = None,
+    snowball: bool = False,
+    max_depth: int = DEFAULT_MAX_DEPTH,
+    request_budget: Optional[int] = None
 ) -> Dict:
     """
     ネットワークデータを構築（既存の関数を再利用）
+    
+    ノード・エッジはアーティストIDで識別する（CollaborationGraph）。
+    出力ではこれまでどおりノードのIDとエッジの両端に名前を使う
+    
+    concurrency > 1 の場合は複数アーティストの楽曲を並列に取得する。
+    結果はアーティストの順にマージするため、出力は逐次処理と同一
+    
+    checkpoint を渡すと途中経過を定期的に保存し、読み込み済みの
+    チェックポイントからは処理済みのアーティストをスキップして再開する
+    
+    manifest を渡すと各アーティストの取得したアルバムを（マージした時点で）記録し、
+    最後にグラフ（export の前のもの）を記録する。
+    base_network（前回のネットワーク）も渡すと差分更新となり、
+    マニフェストにないアルバムの楽曲のみを取得して前回のネットワークにマージする
+    
+    snowball=True の場合はスノーボール取得となり、シードアーティストに加えて
+    見つかった共演アーティスト（シードから max_depth ホップまで）も取得する。
+    取得順は CrawlFrontier の優先度順で、max_artists 人を処理するまで続ける
+    
+    request_budget を渡すと、楽曲取得の全リクエスト数（HarvestStats.crawl_requests）が
+    予算に達した時点で新しいアーティストの取得を止める（並列取得では取得中の
+    アーティストの分だけ予算を超えることがある）
+    
     """
     print(f"\nネットワークデータを構築中... (最大 {max_artists} アーティスト)")
     print(f"  フィーチャリングアーティストも含める: {include_featured_artists}")
+    if snowball:
+        print(f"  スノーボール取得: シードから最大 {max_depth} ホップ")
+    if request_budget is not None:
+        print(f"  リクエスト予算: {request_budget}")
+    
+    graph = CollaborationGraph()
+    counters = {'tracks': 0, 'collaborations': 0, 'duplicate_collaborations': 0}
+    processed_ids: Set[str] = set()
+    incremental = base_network is not None
+    
+    # チェックポイントから途中までのグラフを復元
+    if checkpoint is not None and checkpoint.processed_ids:
+        graph, saved_counters = checkpoint.restore_graph()
+        counters.update(saved_counters)
+        processed_ids = set(checkpoint.processed_ids)
+        if manifest is not None and checkpoint.manifest is not None:
+            # 処理済みのアーティストは取得し直さないため、記録したアルバムもチェックポイントから戻す
+            manifest.artists = checkpoint.manifest
+        print(f"  チェックポイントから再開: 処理済み {len(processed_ids)} アーティスト "
+              f"(エッジ: {len(graph.edges)}, ノード: {len(graph.nodes)})")
+    elif incremental:
+        graph = base_network
+        print(f"  前回のネットワークに差分をマージ: "
+              f"(エッジ: {len(graph.edges)}, ノード: {len(graph.nodes)})")
     
-    nodes_dict: Dict[str, Dict] = {}
-    edges_dict: Dict[tuple, Dict] = {}
+    # 楽曲ID -> 反映済みのペア（コラボ曲は参加アーティストそれぞれから取得されるため、
+    # 同じ楽曲を同じペアに二重に数えない。再開・差分更新では既存のエッジから作る）
+    seen_tracks = index_edge_tracks(graph.edges)
+    # 展開済みのアルバム・取得済みの楽曲詳細（コンピレーションやスプリットシングルを
+    # 参加アーティストごとに再取得しない）
+    registry = HarvestRegistry()
     
-    # アーティスト名からIDへのマッピングを作成
-    for artist in artists[:max_artists]:
-        artist_name = artist['name']
-        artist_id = artist['id']
+    frontier = None
+    if snowball:
+        # 取得するアーティストはフロンティアの優先度順に決まるため、ノードは処理時に追加
+        if checkpoint is not None and checkpoint.frontier:
+            # 取り出し済みでもマージ前だったアーティストは取り直す
+            frontier = CrawlFrontier.from_state(dict(checkpoint.frontier, done=sorted(processed_ids)))
+            frontier.max_depth = max_depth
+        else:
+            frontier = CrawlFrontier(max_depth=max_depth)
+            frontier.add_seeds(artists)
+            frontier.mark_done(processed_ids)
+        targets = artists
+        processed = len(processed_ids)
+    else:
+        # シードアーティストをノードに追加
+        for artist in artists[:max_artists]:
+            graph.add_node(artist['id'], artist['name'])
         
-        if artist_name not in nodes_dict:
-            nodes_dict[artist_name] = {
-                'id': artist_name,
-                'name': artist_name,
-                'degree': 0
-            }
-    
-    # 各アーティストの楽曲を処理
-    processed = 0
-    total_tracks_processed = 0
-    total_collaborations_found = 0
-    
-    for artist in artists[:max_artists]:
-        artist_name = artist['name']
-        artist_id = artist['id']
-        processed += 1
+        # 各アーティストの楽曲を処理
+        targets = artists[:max_artists]
+        processed = sum(1 for artist in targets if artist['id'] in processed_ids)
+    start_requests = harvest_stats.crawl_requests
+    
+    def within_budget() -> bool:
+        return request_budget is None or harvest_stats.crawl_requests - start_requests < request_budget
+    
+    def fetch_tracks(artist: Dict) -> Tuple[List[Dict], Dict]:
+        """(楽曲, {'albums': 収録曲をすべて取得したアルバムID, 'album_total': アルバム総数})"""
+        harvest = {'albums': [], 'album_total': None}
         
-        if processed % 10 == 0:
-            print(f"  処理中: {processed}/{min(len(artists), max_artists)} "
-                  f"(エッジ: {len(edges_dict)}, ノード: {len(nodes_dict)})")
+        def select_albums(album_ids: List[str], album_total: Optional[int]) -> List[str]:
+            harvest['album_total'] = album_total
+            if manifest is not None and incremental:
+                return manifest.new_albums_of(artist['id'], album_ids)
+            return album_ids
         
         try:
-            tracks = get_artist_tracks(artist_id, limit=min_tracks_per_artist)
-            time.sleep(REQUEST_DELAY)  # レート制限対策
-            total_tracks_processed += len(tracks)
-            
-            for track in tracks:
-                track_name = track['name']
-                track_id = track['id']
-                
-                track_artists = [a['name'] for a in track['artists']]
-                
-                for featured_artist in track_artists:
-                    if featured_artist == artist_name:
-                        continue
-                    
-                    if featured_artist not in nodes_dict:
-                        if include_featured_artists:
-                            nodes_dict[featured_artist] = {
-                                'id': featured_artist,
-                                'name': featured_artist,
-                                'degree': 0
-                            }
-                    
-                    edge_key = tuple(sorted([artist_name, featured_artist]))
-                    
-                    if edge_key not in edges_dict:
-                        edges_dict[edge_key] = {
-                            'source': artist_name,
-                            'target': featured_artist,
-                            'weight': 0,
-                            'tracks': []
-                        }
-                    
-                    edges_dict[edge_key]['weight'] += 1
-                    total_collaborations_found += 1
-                    
-                    track_info = {
-                        'track_name': track_name,
-                        'track_id': track_id,
-                        'popularity': track.get('popularity', 0),
-                        'genre': 'J-Pop'
-                    }
-                    edges_dict[edge_key]['tracks'].append(track_info)
-        
+            tracks = get_artist_tracks(
+                artist['id'],
+                limit=min_tracks_per_artist,
+                select_albums=select_albums,
+                registry=registry,
+                harvested_album_ids=harvest['albums']
+            )
         except Exception as e:
-            print(f"    エラー ({artist_name}): {e}")
-            continue
+            print(f"    エラー ({artist['name']}): {e}")
+            return [], {'albums': [], 'album_total': None}
+        return tracks, harvest
+    
+    def pending() -> Iterator[Dict]:
+        # harvest_in_order は先読みの分だけ取り出すため、予算・人数は取り出す時点で確認する
+        # （スノーボール取得では先読み中のアーティストの共演者はまだ優先度に反映されない）
+        started = processed
+        if frontier is None:
+            for artist in targets:
+                if artist['id'] in processed_ids:
+                    continue
+                if not within_budget():
+                    return
+                yield artist
+            return
+        while started < max_artists and within_budget():
+            artist = frontier.pop()
+            if artist is None:
+                return
+            started += 1
+            yield artist
+    
+    try:
+        # 楽曲の取得は並列、マージはアーティスト順に逐次
+        for artist, (tracks, harvest) in harvest_in_order(fetch_tracks, pending(), concurrency):
+            if frontier is not None:
+                graph.add_node(artist['id'], artist['name'])
+            _merge_artist_tracks(artist, tracks, graph, counters, include_featured_artists, seen_tracks)
+            if manifest is not None:
+                # マージした楽曲のアルバムだけを記録（取得しなかったアルバムは次回の差分更新で取得する）
+                manifest.record(artist['id'], artist['name'], harvest['albums'], harvest['album_total'])
+            if frontier is not None:
+                frontier.observe(artist, tracks)
+            processed += 1
+            
+            if processed % 10 == 0:
+                if frontier is not None:
+                    print(f"  処理中: {processed}/{max_artists} "
+                          f"(エッジ: {len(graph.edges)}, ノード: {len(graph.nodes)}, "
+                          f"取得待ち: {len(frontier)}, リクエスト: {harvest_stats.crawl_requests - start_requests})")
+                else:
+                    print(f"  処理中: {processed}/{len(targets)} "
+                          f"(エッジ: {len(graph.edges)}, ノード: {len(graph.nodes)})")
+            
+            if checkpoint is not None:
+                checkpoint.mark_processed(artist['id'], graph, counters, frontier, manifest)
+    except BaseException:
+        # 中断時（Ctrl-Cを含む）もそこまでの結果を保存してから終了
+        if checkpoint is not None:
+            checkpoint.save(graph, counters, frontier, manifest)
+            print(f"\n  中断しました。チェックポイントを保存しました: {checkpoint.path}")
+            print(f"  --resume で続きから再開できます")
+        raise
+    
+    if checkpoint is not None:
+        checkpoint.save(graph, counters, frontier, manifest)
+    if manifest is not None:
+        # 次回の差分更新の基準（後処理で除かれるノード・エッジも残しておく）
+        manifest.set_graph(graph)
     
     print(f"\n  処理完了:")
-    print(f"    処理した楽曲数: {total_tracks_processed}")
-    print(f"    見つかったコラボレーション: {total_collaborations_found}")
-    
-    # ノードの次数を計算
-    for edge in edges_dict.values():
-        source = edge['source']
-        target = edge['target']
-        if source in nodes_dict:
-            nodes_dict[source]['degree'] += edge['weight']
-        if target in nodes_dict:
-            nodes_dict[target]['degree'] += edge['weight']
-    
-    # エッジをリストに変換（重みでソート）
-    edges = list(edges_dict.values())
-    edges.sort(key=lambda x: x['weight'], reverse=True)
-    
-    # ノードをリストに変換（次数でソート）
-    nodes = list(nodes_dict.values())
-    nodes.sort(key=lambda x: x['degree'], reverse=True)
-    
-    # メタデータを計算
-    total_collaborations = sum(edge['weight'] for edge in edges)
-    
-    network_data = {
-        'nodes': nodes,
-        'edges': edges,
-        'metadata': {
-            'total_nodes': len(nodes),
-            'total_edges': len(edges),
-            'total_collaborations': total_collaborations,
-            'description': 'Japanese Music Featuring Network - Generated from Spotify Charts and API'
-        }
-    }
+    print(f"    処理したアーティスト数: {processed}")
+    if frontier is not None:
+        depths = defaultdict(int)
+        for artist_id in frontier.done:
+            depths[frontier.entries[artist_id]['depth']] += 1
+        print(f"    ホップ数ごとのアーティスト数: "
+              f"{', '.join(f'{depth}: {count}' for depth, count in sorted(depths.items()))}")
+        print(f"    取得しなかった候補: {len(frontier)}")
+    if request_budget is not None:
+        print(f"    リクエスト: {harvest_stats.crawl_requests - start_requests}/{request_budget}")
+    print(f"    処理した楽曲数: {counters['tracks']}")
+    print(f"    見つかったコラボレーション: {counters['collaborations']}")
+    print(f"    重複のためスキップしたコラボレーション: {counters['duplicate_collaborations']}")
     
-    return network_data
+    return graph.export('Japanese Music Featuring Network - Generated from Spotify Charts and API')
 
 
-def main():
-    """メイン処理"""
-    print("=" * 60)
-    print("日本のアーティスト フィーチャリングネットワーク生成（チャート優先）")
-    print("=" * 60)
-    if REQUEST_DELAY > 0:
-        print(f"APIレートリミット対策: {REQUEST_DELAY}秒/リクエスト")
-    else:
-        print("APIレートリミット対策: 429エラー発生時のみ待機（Retry-Afterヘッダーを使用）")
+def _merge_artist_tracks(
+    artist: Dict,
+    tracks: List[Dict],
+    graph: CollaborationGraph,
+    counters: Dict[str, int],
+    include_featured_artists: bool,
+    seen_tracks: Dict[str, Set[int]]
+) -> None:
+    """
+    1アーティスト分の楽曲をグラフに反映し、counters を更新
     
-    # パラメータ設定
-    TARGET_ARTIST_COUNT = 700  # 目標アーティスト数（ノード数を700に制限）
-    MAX_ARTISTS_TO_PROCESS = 700  # 処理する最大アーティスト数
-    MIN_TRACKS_PER_ARTIST = 100  # 各アーティストから取得する楽曲数
+    seen_tracks（楽曲ID -> エッジキーの集合）に反映済みのペアはスキップし、
+    反映したペアを追加する
+    """
+    artist_name = artist['name']
+    artist_id = artist['id']
     
+    try:
+        counters['tracks'] += len(tracks)
+        source = graph.intern(artist_id, artist_name)
+        
+        for track in tracks:
+            track_name = track['name']
+            track_id = track['id']
+            
+            for featured_artist in track['artists']:
+                featured_id = featured_artist.get('id')
+                if not featured_id or featured_id == artist_id:
+                    continue
+                
+                if include_featured_artists:
+                    target = graph.add_node(featured_id, featured_artist['name'])
+                else:
+                    target = graph.intern(featured_id, featured_artist['name'])
+                
+                edge_key = pack_pair(source, target)
+                
+                track_pairs = seen_tracks.setdefault(track_id, set())
+                if edge_key in track_pairs:
+                    counters['duplicate_collaborations'] += 1
+                    continue
+                track_pairs.add(edge_key)
+                
+                track_info = {
+                    'track_name': track_name,
+                    'track_id': track_id,
+                    'popularity': track.get('popularity', 0),
+                    'genre': 'J-Pop'
+                }
+                graph.add_track(source, target, track_info)
+                counters['collaborations'] += 1
+    
+    except Exception as e:
+        print(f"    エラー ({artist_name}): {e}")
+
+
+def collect_seed_artists(target_artist_count: int) -> List[Dict]:
+    """
+    シードアーティストを取得（最新リリース → チャート → ジャンル検索の優先順）
+    
+    Args:
+        target_artist_count: 目標アーティスト数
+    
+    Returns:
+        アーティスト情報のリスト（popularity順）
+    """
     # 最新リリースとpopularity順のアーティストを優先的に取得
     # 最新リリースから取得する目標数（全体の60%）
-    NEW_RELEASES_TARGET = int(TARGET_ARTIST_COUNT * 0.6)  # 420アーティスト
+    NEW_RELEASES_TARGET = int(target_artist_count * 0.6)  # 420アーティスト
     # popularity順検索から取得する目標数（全体の40%）
-    POPULARITY_SEARCH_TARGET = TARGET_ARTIST_COUNT - NEW_RELEASES_TARGET  # 280アーティスト
+    POPULARITY_SEARCH_TARGET = target_artist_count - NEW_RELEASES_TARGET  # 280アーティスト
     
     all_artists = []
     seen_ids = set()
@@ -605,12 +778,12 @@ def main():
     print(f"  累計: {len(all_artists)} アーティスト")
     
     # 優先順位2: 週間チャート（Japan Top 50）
-    if len(all_artists) < TARGET_ARTIST_COUNT:
+    if len(all_artists) < target_artist_count:
         print(f"\n[優先順位2] 週間チャートから取得を試みます...")
         top50_artists = get_artists_from_playlist(
             JAPAN_TOP_50_PLAYLIST_ID,
             "週間チャート (Japan Top 50)",
-            TARGET_ARTIST_COUNT,
+            target_artist_count,
             seen_ids
         )
         if top50_artists:
@@ -622,12 +795,12 @@ def main():
         print(f"  累計: {len(all_artists)} アーティスト")
     
     # 優先順位3: バイラルチャート（Japan Viral 50）
-    if len(all_artists) < TARGET_ARTIST_COUNT:
+    if len(all_artists) < target_artist_count:
         print(f"\n[優先順位3] バイラルチャートから取得を試みます...")
         viral_artists = get_artists_from_playlist(
             JAPAN_VIRAL_50_PLAYLIST_ID,
             "バイラルチャート (Japan Viral 50)",
-            TARGET_ARTIST_COUNT,
+            target_artist_count,
             seen_ids
         )
         if viral_artists:
@@ -640,13 +813,13 @@ def main():
     
     # 優先順位4: ジャンル検索 + popularity順（人気度で厳密にソート）- 目標40%
     genre_artists_selected = []
-    if len(all_artists) < TARGET_ARTIST_COUNT:
-        remaining = TARGET_ARTIST_COUNT - len(all_artists)
+    if len(all_artists) < target_artist_count:
+        remaining = target_artist_count - len(all_artists)
         # 最新リリースで目標に達していない場合、popularity順検索で補完
         popularity_target = max(remaining, POPULARITY_SEARCH_TARGET - len(all_artists) + NEW_RELEASES_TARGET)
         print(f"\n[優先順位4] ジャンル検索 (popularity順)から取得を試みます... (目標: {popularity_target}アーティスト)")
         genre_artists = search_japanese_artists_by_popularity(
-            target_count=TARGET_ARTIST_COUNT,
+            target_count=target_artist_count,
             existing_artists=seen_ids,
             max_pages_per_genre=5  # 各ジャンルからより多くのページを取得
         )
@@ -657,8 +830,7 @@ def main():
         print(f"  累計: {len(all_artists)} アーティスト")
     
     if not all_artists:
-        print("アーティストが見つかりませんでした。")
-        return
+        return all_artists
     
     # 統計情報を計算
     genre_count = len(genre_artists_selected)
@@ -677,25 +849,180 @@ def main():
         print(f"\n  最高人気度: {all_artists[0].get('popularity', 0)} ({all_artists[0].get('name', 'Unknown')})")
         print(f"  平均人気度: {sum(a.get('popularity', 0) for a in all_artists) / len(all_artists):.1f}")
     
+    return all_artists
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='日本のアーティスト フィーチャリングネットワーク生成（チャート優先）')
+    parser.add_argument('--resume', action='store_true',
+                        help=f'チェックポイント ({CHECKPOINT_PATH}) から処理済みのアーティストをスキップして再開')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f'マニフェスト ({MANIFEST_PATH}) から前回のアルバム記録とグラフを読み込み、'
+                             f'新しいアルバムの楽曲のみ取得してマージ')
+    parser.add_argument('--snowball', action='store_true',
+                        help='シードに加えて見つかった共演アーティストも、コラボが多く見つかりそうな順に取得')
+    parser.add_argument('--max-depth', type=int, default=DEFAULT_MAX_DEPTH,
+                        help=f'スノーボール取得で辿るシードからの最大ホップ数（デフォルト: {DEFAULT_MAX_DEPTH}）')
+    parser.add_argument('--request-budget', type=int, metavar='N',
+                        help='楽曲取得のリクエスト数（ディスコグラフィー・アルバム・楽曲詳細の合計）の上限')
+    parser.add_argument('--shard', type=parse_shard, metavar='I/N',
+                        help='シードアーティストをアーティストIDのハッシュで N 個に分け、I 番目（0から）だけを取得して'
+                             '部分グラフを書き出す（crawl_shards.py でまとめる）')
+    parser.add_argument('--partial-output', metavar='PATH',
+                        help='--shard の部分グラフの書き出し先（デフォルト: shards/shardI-of-N.json）')
+    parser.add_argument('--record', metavar='ARCHIVE',
+                        help='呼び出したAPIのリクエストとレスポンスをアーカイブ（.jsonl.gz）に記録')
+    parser.add_argument('--replay', metavar='ARCHIVE',
+                        help='記録したアーカイブだけから再実行（ネットワークにアクセスしない）')
+    parser.add_argument('--metrics-report', metavar='PATH', default=METRICS_PATH,
+                        help=f'APIリクエストの計測結果を書き出すJSONファイル（デフォルト: {METRICS_PATH}）')
+    parser.add_argument('--live-metrics', metavar='SECONDS', type=float,
+                        help='指定した秒数ごとにAPIリクエストの計測結果を表示')
+    add_pipeline_arguments(parser)
+    args = parser.parse_args()
+    if args.shard is not None and args.incremental:
+        parser.error('--shard と --incremental は同時に指定できません')
+    if args.shard is not None and args.snowball:
+        # シャード間でフロンティアを共有しないため、他のシャードの範囲の共演アーティストを誰も取得しない
+        parser.error('--shard と --snowball は同時に指定できません')
+    
+    # パラメータ設定
+    TARGET_ARTIST_COUNT = 700  # 目標アーティスト数（ノード数を700に制限）
+    MAX_ARTISTS_TO_PROCESS = 700  # 処理する最大アーティスト数
+    MIN_TRACKS_PER_ARTIST = 100  # 各アーティストから取得する楽曲数
+    CRAWL_CONCURRENCY = 4  # 同時に楽曲を取得するアーティスト数（1で逐次処理）
+    
+    # リクエストの記録・再生: モジュールのクライアントを差し替える
+    global sp
+    if args.replay:
+        sp = ReplaySpotify(FixtureArchive(args.replay).load())
+        print(f"記録から再生します: {args.replay}")
+    elif args.record:
+        # 再生（replay_network_build.py）は記録時と同じパラメータをデフォルトにする
+        archive = FixtureArchive(args.record).open_for_write({
+            'target_artist_count': TARGET_ARTIST_COUNT,
+            'max_artists': MAX_ARTISTS_TO_PROCESS,
+            'min_tracks_per_artist': MIN_TRACKS_PER_ARTIST,
+            'concurrency': CRAWL_CONCURRENCY,
+        })
+        atexit.register(archive.close)  # 中断時もそこまでの記録を読める状態で閉じる
+        sp = RecordingSpotify(sp, archive)
+    if args.live_metrics and not args.replay:
+        api_metrics.start_live(args.live_metrics)
+    
+    print("=" * 60)
+    print("日本のアーティスト フィーチャリングネットワーク生成（チャート優先）")
+    print("=" * 60)
+    print(f"APIレートリミット対策: 初期 {INITIAL_REQUEST_RATE} リクエスト/秒（429エラーが出るまで最大 "
+          f"{MAX_REQUEST_RATE} リクエスト/秒まで自動調整、429エラー時はRetry-Afterの間すべて停止）")
+    
+    # 差分更新: マニフェストと前回のグラフ（ノイズ除外などの後処理の前のもの）を読み込む
+    manifest = NetworkManifest(MANIFEST_PATH)
+    base_network = None
+    if args.incremental:
+        if manifest.load():
+            base_network = manifest.base_graph()
+        if base_network is None:
+            print(f"\n差分更新に必要な前回のネットワークまたはマニフェストがありません。フル取得します")
+            manifest = NetworkManifest(MANIFEST_PATH)
+        else:
+            print(f"\n差分更新モード: {len(manifest.artists)} アーティストのアルバム記録を読み込みました")
+    
+    crawl_params = {
+        'target_artist_count': TARGET_ARTIST_COUNT,
+        'max_artists': MAX_ARTISTS_TO_PROCESS,
+        'min_tracks_per_artist': MIN_TRACKS_PER_ARTIST,
+        'discography_request_budget': DISCOGRAPHY_REQUEST_BUDGET,
+        'incremental': base_network is not None,
+        'snowball': args.snowball,
+        'max_depth': args.max_depth if args.snowball else None,
+        'request_budget': args.request_budget,
+        'shard': '/'.join(map(str, args.shard)) if args.shard is not None else None,
+    }
+    # シャードごとの取得では、同じマシンの他のシャードとチェックポイントを分ける
+    checkpoint_path = CHECKPOINT_PATH if args.shard is None else shard_suffix(CHECKPOINT_PATH, *args.shard)
+    checkpoint = CrawlCheckpoint(checkpoint_path, interval=CHECKPOINT_INTERVAL)
+    
+    if args.resume and checkpoint.load() and checkpoint.seed_artists:
+        # 保存済みのシードアーティストを使い、処理済みのアーティストをスキップ
+        checkpoint.check_params(crawl_params)
+        all_artists = checkpoint.seed_artists
+        print(f"\nチェックポイントから再開します: {checkpoint_path}")
+        print(f"  シードアーティスト: {len(all_artists)} (処理済み: {len(checkpoint.processed_ids)})")
+    else:
+        if args.resume:
+            print(f"\n再開できるチェックポイントがありません。最初から取得します")
+        all_artists = collect_seed_artists(TARGET_ARTIST_COUNT)
+        if base_network is not None:
+            # 前回のシードアーティストも引き続き更新対象にする
+            seed_ids = {a['id'] for a in all_artists}
+            previous_artists = [
+                {'id': artist_id, 'name': entry.get('name', artist_id)}
+                for artist_id, entry in manifest.artists.items()
+                if artist_id not in seed_ids
+            ]
+            all_artists = all_artists + previous_artists
+            print(f"  前回のアーティスト: {len(previous_artists)} を追加（合計 {len(all_artists)}）")
+        if args.shard is not None:
+            # 処理対象のうち、このシャードに入るアーティストだけを取得
+            all_artists = shard_artists(all_artists[:MAX_ARTISTS_TO_PROCESS], *args.shard)
+            print(f"  シャード {crawl_params['shard']}: {len(all_artists)} アーティスト")
+        if not all_artists:
+            print("アーティストが見つかりませんでした。")
+            return
+        checkpoint.start(all_artists, crawl_params)
+    
     # ネットワークデータを構築
+    # 差分更新では前回のアーティストを含めてすべて更新
+    # シャードごとの取得ではシャードに入ったアーティストをすべて処理
     network_data = build_network_data(
         all_artists,
-        max_artists=MAX_ARTISTS_TO_PROCESS,
+        max_artists=len(all_artists) if base_network is not None or args.shard is not None else MAX_ARTISTS_TO_PROCESS,
         include_featured_artists=True,
-        min_tracks_per_artist=MIN_TRACKS_PER_ARTIST
+        min_tracks_per_artist=MIN_TRACKS_PER_ARTIST,
+        concurrency=CRAWL_CONCURRENCY,
+        checkpoint=checkpoint,
+        manifest=manifest,
+        base_network=base_network,
+        snowball=args.snowball,
+        max_depth=args.max_depth,
+        request_budget=args.request_budget
     )
     
-    # 結果を保存
-    output_file = 'public/japanese_featuring_network.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(network_data, f, ensure_ascii=False, indent=2)
+    if args.shard is not None:
+        # 部分グラフをそのまま書き出す（後処理は crawl_shards.py でまとめた後に行う）
+        output_file = args.partial_output or partial_path(*args.shard)
+        written_files = write_partial(output_file, network_data, *args.shard,
+                                      seed_artists=len(all_artists), compact=args.compact)
+    else:
+        # ノイズ除外・中心性・コミュニティ・レイアウト・隣接インデックスを追加して保存
+        output_file = OUTPUT_FILE
+        network_data, written_files = process_network(network_data, output_file, args)
+        # 次回の差分更新用にアルバム記録を保存
+        manifest.save()
+    checkpoint.clear()
     
     print(f"\n{'=' * 60}")
     print(f"✓ ネットワークデータを {output_file} に保存しました")
     print(f"{'=' * 60}")
+    for path in written_files[1:]:
+        print(f"  {path} ({os.path.getsize(path) / 1024:.0f}KB)")
     print(f"  ノード数: {network_data['metadata']['total_nodes']}")
     print(f"  エッジ数: {network_data['metadata']['total_edges']}")
     print(f"  コラボレーション数: {network_data['metadata']['total_collaborations']}")
+    harvest_stats.report()
+    if base_network is not None:
+        manifest.report()
+    if args.record or args.replay:
+        sp.fixture_report()
+    if not args.replay:
+        sp.cache_report()
+        rate_limiter.report()
+        api_metrics.stop_live()
+        api_metrics.report()
+        api_metrics.write_json(args.metrics_report)
+        print(f"\n  APIリクエストの計測結果を {args.metrics_report} に保存しました")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,135 @@
+"""
+ネットワークの差分更新
+
+フル取得のたびに、各アーティストについて楽曲を取得したアルバムIDと
+アルバム総数、ノイズ除外などの後処理の前のグラフをマニフェストに保存しておく。
+--incremental で実行すると、マニフェストを読み込み、各アーティストの
+アルバム一覧だけを取得して、前回以降に増えたアルバムの楽曲のみを取得し、
+前回のグラフにマージする
+
+前回のグラフは公開用のネットワークJSONではなくマニフェストから戻す。
+公開用のJSONではノイズノードとそのエッジが除かれているため、
+除外ルールを変えても取得済みのアルバムの楽曲が戻らなくなる
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from network_graph import CollaborationGraph
+
+MANIFEST_VERSION = 2
+DEFAULT_MANIFEST_PATH = '.spotify_cache/network_manifest.json'
+
+
+class NetworkManifest:
+    """
+    アーティストごとに取得済みのアルバムIDと、後処理の前のグラフ（差分更新の基準）を記録する
+
+    Args:
+        path: マニフェストファイルのパス
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.artists: Dict[str, Dict] = {}
+        self.graph: Optional[Dict] = None  # CollaborationGraph.to_state() の形式
+        self.known_albums_skipped = 0
+        self.new_albums = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """
+        マニフェストを読み込む
+
+        Returns:
+            読み込めた場合True
+        """
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  警告: マニフェストを読み込めませんでした ({self.path}): {e}")
+            return False
+        if data.get('version') != MANIFEST_VERSION:
+            print(f"  警告: マニフェストの形式が異なります ({self.path})")
+            return False
+        self.artists = data.get('artists', {})
+        self.graph = data.get('graph')
+        return True
+
+    def new_albums_of(self, artist_id: str, album_ids: List[str]) -> List[str]:
+        """
+        アルバム一覧のうち、まだ記録されていないアルバムIDを返す（元の順序）
+
+        記録はしない。楽曲をマージした後に record() で記録する
+        """
+        with self._lock:
+            known = set(self.artists.get(artist_id, {}).get('albums', []))
+            new_ids = [album_id for album_id in album_ids if album_id not in known]
+            self.known_albums_skipped += len(album_ids) - len(new_ids)
+            self.new_albums += len(new_ids)
+        return new_ids
+
+    def record(
+        self,
+        artist_id: str,
+        artist_name: str,
+        album_ids: List[str],
+        album_total: Optional[int] = None
+    ) -> None:
+        """
+        楽曲をネットワークにマージしたアルバムを記録
+
+        取得しなかった（楽曲数の上限・リクエスト予算・エラーで展開しなかった）
+        アルバムは記録しないこと。次回の差分更新で取得済みとして扱われる
+
+        Args:
+            artist_id: SpotifyアーティストID
+            artist_name: アーティスト名（次回の差分更新でシードに加えるため）
+            album_ids: 楽曲をマージしたアルバムIDのリスト
+            album_total: APIが返したアルバム総数
+        """
+        with self._lock:
+            entry = self.artists.setdefault(artist_id, {'name': artist_name, 'albums': [], 'album_total': 0})
+            entry['name'] = artist_name
+            known = set(entry['albums'])
+            entry['albums'].extend(album_id for album_id in album_ids if album_id not in known)
+            if album_total is not None:
+                entry['album_total'] = album_total
+
+    def save(self) -> None:
+        """一時ファイルに書き出してから置き換える"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'artists': self.artists, 'graph': self.graph}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def set_graph(self, graph: CollaborationGraph) -> None:
+        """後処理の前のグラフを次回の差分更新の基準として記録"""
+        self.graph = graph.to_state()
+
+    def base_graph(self) -> Optional[CollaborationGraph]:
+        """
+        記録したグラフを復元
+
+        Returns:
+            CollaborationGraph。グラフを記録していない場合None
+        """
+        if self.graph is None:
+            return None
+        return CollaborationGraph.from_state(self.graph)
+
+    def report(self) -> None:
+        """差分取得の集計を表示"""
+        print(f"\n  差分更新:")
+        print(f"    記録済みアーティスト: {len(self.artists)}")
+        print(f"    新しいアルバム: {self.new_albums}")
+        print(f"    取得を省略した既知のアルバム: {self.known_albums_skipped}")
+
@@ -0,0 +1,582 @@
+"""
+オフラインで使えるSpotify Web APIのモックサーバー
+
+実APIはレート制限があり結果も変動するため、取得スクリプトのスループットを
+測定するためのローカルの代替サーバー。
+シード値から決定的に生成した架空のアーティスト・アルバム・楽曲・プレイリストを
+Spotify Web APIと同じパス・形式で返す。
+
+- 対応エンドポイント: artists, artists/{id}/albums, albums, albums/{id}/tracks,
+  tracks, playlists/{id}, playlists/{id}/tracks（items）, browse/new-releases, search
+- レイテンシと429エラー（Retry-After付き）を指定した確率で注入
+- エンドポイントごとのリクエスト数・送信バイト数を集計（/_mock/stats）
+
+単体で起動する場合:
+    python mock_spotify_server.py --artists 1000 --port 8900 --latency 0.05
+
+spotipy からは prefix を差し替えて接続する:
+    client = spotipy.Spotify(auth='mock', requests_session=make_session())
+    client.prefix = 'http://127.0.0.1:8900/v1/'
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# search_japanese_artists_by_popularity が検索するジャンル
+GENRES = [
+    "j-pop", "j-rock", "j-idol", "anime",
+    "japanese", "japanese pop", "japanese rock",
+    "j-rap", "japanese hip hop", "japanese indie",
+    "japanese alternative", "japanese electronic",
+    "japanese r&b", "japanese metal", "japanese punk"
+]
+
+PAGE_LIMIT = 50  # ページングするエンドポイントの最大件数
+ALBUM_TRACKS_LIMIT = 50  # アルバムオブジェクトに含める収録曲数
+NEW_RELEASES_SIZE = 1000  # browse/new-releases で返すアルバム数
+PLAYLIST_SIZE = 50  # プレイリストの楽曲数
+
+
+class SyntheticCatalog:
+    """
+    シード値から決定的に生成する架空のカタログ
+
+    アーティスト i のディスコグラフィーは (seed, i) から毎回同じ内容で生成するため、
+    全楽曲をメモリに保持しない（直近のものだけキャッシュ）。
+    アーティストの人気度はIDの番号が小さいほど高く、コラボ相手も人気のある
+    アーティストに偏る
+
+    Args:
+        n_artists: アーティスト数
+        seed: 乱数のシード
+        collab_rate: 楽曲に他のアーティストが参加する確率
+    """
+
+    def __init__(self, n_artists: int, seed: int = 0, collab_rate: float = 0.2):
+        self.n_artists = n_artists
+        self.seed = seed
+        self.collab_rate = collab_rate
+        self._appears_on: Optional[Dict[int, List[str]]] = None
+        self._new_releases: List[str] = []
+        self._index_lock = threading.Lock()
+        self._discography = lru_cache(maxsize=4096)(self._generate_discography)
+
+    # --- ID ---
+
+    @staticmethod
+    def artist_id(i: int) -> str:
+        return f'ar{i:07d}'
+
+    @staticmethod
+    def album_id(i: int, k: int) -> str:
+        return f'al{i:07d}x{k:03d}'
+
+    @staticmethod
+    def track_id(i: int, k: int, n: int) -> str:
+        return f'tr{i:07d}x{k:03d}x{n:02d}'
+
+    @staticmethod
+    def parse_id(spotify_id: str) -> Optional[Tuple[int, ...]]:
+        """ar/al/tr のIDを番号のタプルに戻す（不正なIDはNone）"""
+        match = re.fullmatch(r'(ar|al|tr)(\d{7})(?:x(\d{3}))?(?:x(\d{2}))?', spotify_id or '')
+        if not match:
+            return None
+        return tuple(int(part) for part in match.groups()[1:] if part is not None)
+
+    def _rng(self, *parts: Any) -> random.Random:
+        return random.Random(':'.join(str(p) for p in (self.seed,) + parts))
+
+    # --- オブジェクト生成 ---
+
+    def _artist_ref(self, i: int) -> Dict:
+        return {'id': self.artist_id(i), 'name': f'Artist {i}', 'type': 'artist'}
+
+    def artist(self, i: int) -> Optional[Dict]:
+        if not 0 <= i < self.n_artists:
+            return None
+        rnd = self._rng('artist', i)
+        popularity = int(100 * (1 - i / self.n_artists) ** 2 * rnd.uniform(0.8, 1.0))
+        return dict(
+            self._artist_ref(i),
+            popularity=popularity,
+            genres=[GENRES[rnd.randrange(len(GENRES))]],
+            followers={'total': popularity * 1000 + rnd.randrange(1000)},
+        )
+
+    def _collaborator(self, rnd: random.Random, i: int) -> int:
+        j = int(self.n_artists * rnd.random() ** 2)
+        return j if j != i else (i + 1) % self.n_artists
+
+    def _generate_discography(self, i: int) -> List[Dict]:
+        """アーティスト i の全アルバム（新しい順、収録曲付き）"""
+        rnd = self._rng('discography', i)
+        n_albums = min(200, int(rnd.paretovariate(1.0) * 3))
+        year = 2025
+        albums = []
+        for k in range(n_albums):
+            year -= rnd.randrange(0, 2)
+            is_single = rnd.random() < 0.6
+            n_tracks = rnd.randint(1, 3) if is_single else rnd.randint(8, 14)
+            album_type = 'single' if is_single else 'album'
+            album = {
+                'id': self.album_id(i, k),
+                'name': f'Album {i}-{k}',
+                'type': 'album',
+                'album_type': album_type,
+                'release_date': f'{max(year, 1990)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}',
+                'release_date_precision': 'day',
+                'total_tracks': n_tracks,
+                'artists': [self._artist_ref(i)],
+            }
+            items = []
+            for n in range(n_tracks):
+                artists = [self._artist_ref(i)]
+                if rnd.random() < self.collab_rate:
+                    for _ in range(rnd.choice((1, 1, 1, 2))):
+                        j = self._collaborator(rnd, i)
+                        if all(a['id'] != self.artist_id(j) for a in artists):
+                            artists.append(self._artist_ref(j))
+                items.append({
+                    'id': self.track_id(i, k, n),
+                    'name': f'Track {i}-{k}-{n}',
+                    'type': 'track',
+                    'track_number': n + 1,
+                    'duration_ms': 180000 + rnd.randrange(120000),
+                    'artists': artists,
+                    '_popularity': rnd.randrange(101),
+                })
+            album['tracks'] = items
+            albums.append(album)
+        return albums
+
+    def _simple_album(self, album: Dict, album_group: Optional[str] = None) -> Dict:
+        simple = {key: value for key, value in album.items() if key != 'tracks'}
+        if album_group is not None:
+            simple['album_group'] = album_group
+        return simple
+
+    def _simple_track(self, track: Dict) -> Dict:
+        return {key: value for key, value in track.items() if key != '_popularity'}
+
+    def _get_album(self, album_id: str) -> Optional[Dict]:
+        parts = self.parse_id(album_id)
+        if not parts or len(parts) != 2 or not album_id.startswith('al'):
+            return None
+        i, k = parts
+        if not 0 <= i < self.n_artists:
+            return None
+        discography = self._discography(i)
+        return discography[k] if k < len(discography) else None
+
+    def album(self, album_id: str) -> Optional[Dict]:
+        """GET /albums 形式のアルバム（収録曲は最初の50曲）"""
+        album = self._get_album(album_id)
+        if album is None:
+            return None
+        items = [self._simple_track(t) for t in album['tracks']]
+        return dict(
+            self._simple_album(album),
+            tracks=page(items[:ALBUM_TRACKS_LIMIT], len(items), ALBUM_TRACKS_LIMIT, 0)
+        )
+
+    def album_tracks(self, album_id: str) -> Optional[List[Dict]]:
+        album = self._get_album(album_id)
+        if album is None:
+            return None
+        return [self._simple_track(t) for t in album['tracks']]
+
+    def track(self, track_id: str) -> Optional[Dict]:
+        """GET /tracks 形式の楽曲（popularity・アルバム付き）"""
+        parts = self.parse_id(track_id)
+        if not parts or len(parts) != 3 or not track_id.startswith('tr'):
+            return None
+        i, k, n = parts
+        album = self._get_album(self.album_id(i, k))
+        if album is None or n >= len(album['tracks']):
+            return None
+        track = album['tracks'][n]
+        return dict(self._simple_track(track), popularity=track['_popularity'], album=self._simple_album(album))
+
+    # --- 索引 ---
+
+    def build_index(self) -> None:
+        """参加作品（appears_on）と新譜の索引を作成（初回のみ全アーティストを走査）"""
+        with self._index_lock:
+            if self._appears_on is not None:
+                return
+            appears_on: Dict[int, List[str]] = defaultdict(list)
+            releases: List[Tuple[str, str]] = []
+            for i in range(self.n_artists):
+                for album in self._generate_discography(i):
+                    releases.append((album['release_date'], album['id']))
+                    featured = set()
+                    for track in album['tracks']:
+                        for artist in track['artists'][1:]:
+                            featured.add(self.parse_id(artist['id'])[0])
+                    for j in featured:
+                        appears_on[j].append(album['id'])
+            releases.sort(reverse=True)
+            self._new_releases = [album_id for _, album_id in releases[:NEW_RELEASES_SIZE]]
+            self._appears_on = appears_on
+
+    def artist_albums(self, i: int, groups: List[str]) -> List[Dict]:
+        """artists/{id}/albums の全件（種別ごとに新しい順）"""
+        self.build_index()
+        own = self._discography(i)
+        albums = []
+        for group in ('album', 'single', 'appears_on', 'compilation'):
+            if group not in groups:
+                continue
+            if group == 'appears_on':
+                entries = [self._get_album(album_id) for album_id in self._appears_on.get(i, [])]
+            else:
+                entries = [album for album in own if album['album_type'] == group]
+            entries.sort(key=lambda album: album['release_date'], reverse=True)
+            albums.extend(self._simple_album(album, group) for album in entries)
+        return albums
+
+    def new_releases(self) -> List[Dict]:
+        self.build_index()
+        return [self._simple_album(self._get_album(album_id)) for album_id in self._new_releases]
+
+    def search_artists(self, genre: str) -> List[Dict]:
+        """ジャンルが一致するアーティスト（人気順）"""
+        artists = [self.artist(i) for i in range(self.n_artists)]
+        matched = [a for a in artists if genre in a['genres']]
+        matched.sort(key=lambda a: a['popularity'], reverse=True)
+        return matched
+
+    def playlist_tracks(self, playlist_id: str) -> List[Dict]:
+        """人気アーティストに偏った楽曲で構成したプレイリスト"""
+        rnd = self._rng('playlist', playlist_id)
+        tracks = []
+        for _ in range(PLAYLIST_SIZE):
+            i = int(self.n_artists * rnd.random() ** 3)
+            discography = self._discography(i)
+            if not discography:
+                continue
+            k = rnd.randrange(min(3, len(discography)))
+            n = rnd.randrange(len(discography[k]['tracks']))
+            tracks.append(self.track(self.track_id(i, k, n)))
+        return tracks
+
+
+def page(items: List[Any], total: int, limit: int, offset: int, next_url: Optional[str] = None) -> Dict:
+    """Spotifyのページングオブジェクト"""
+    if next_url is None and offset + limit < total:
+        next_url = f'offset={offset + limit}'
+    return {'items': items, 'total': total, 'limit': limit, 'offset': offset, 'next': next_url}
+
+
+class MockSpotifyServer:
+    """
+    SyntheticCatalog を Spotify Web API と同じパスで返すHTTPサーバー
+
+    Args:
+        catalog: 返すデータ
+        host: 待ち受けアドレス
+        port: 待ち受けポート（0で空いているポート）
+        latency: 1リクエストあたりの平均遅延（秒、±50%のゆらぎ）
+        rate_limit_probability: 429エラーを返す確率
+        retry_after: 429エラー時の Retry-After（秒）
+    """
+
+    def __init__(
+        self,
+        catalog: SyntheticCatalog,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        rate_limit_probability: float = 0.0,
+        retry_after: int = 1
+    ):
+        self.catalog = catalog
+        self.latency = latency
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._rnd = random.Random(catalog.seed)
+        self.reset()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def prefix(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/v1/'
+
+    def reset(self) -> None:
+        """集計をリセット"""
+        with self._lock:
+            self.requests: Dict[str, int] = defaultdict(int)
+            self.bytes_sent: Dict[str, int] = defaultdict(int)
+            self.rate_limited: Dict[str, int] = defaultdict(int)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requests': dict(self.requests),
+                'bytes_sent': dict(self.bytes_sent),
+                'rate_limited': dict(self.rate_limited),
+                'total_requests': sum(self.requests.values()),
+                'total_bytes_sent': sum(self.bytes_sent.values()),
+            }
+
+    def start(self) -> 'MockSpotifyServer':
+        """バックグラウンドスレッドで起動"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'MockSpotifyServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --- リクエスト処理 ---
+
+    def _inject(self, endpoint: str) -> Optional[int]:
+        """レイテンシを注入し、429エラーにする場合は Retry-After を返す"""
+        with self._lock:
+            delay = self.latency * self._rnd.uniform(0.5, 1.5) if self.latency else 0.0
+            limited = self._rnd.random() < self.rate_limit_probability
+            if limited:
+                self.rate_limited[endpoint] += 1
+        if delay:
+            time.sleep(delay)
+        return self.retry_after if limited else None
+
+    def route(self, path: str, query: Dict[str, str]) -> Tuple[str, int, Any]:
+        """パスからエンドポイント名・ステータス・レスポンスを返す"""
+        catalog = self.catalog
+        parts = [p for p in path.split('/') if p]
+        if not parts or parts[0] != 'v1':
+            return 'unknown', 404, None
+        parts = parts[1:]
+        limit = min(int(query.get('limit', 20)), PAGE_LIMIT)
+        offset = int(query.get('offset', 0))
+        ids = [x for x in query.get('ids', '').split(',') if x]
+
+        if parts == ['artists']:
+            found = [catalog.parse_id(x) for x in ids]
+            return 'artists', 200, {'artists': [catalog.artist(p[0]) if p else None for p in found]}
+        if len(parts) == 2 and parts[0] == 'artists':
+            found = catalog.parse_id(parts[1])
+            artist = catalog.artist(found[0]) if found else None
+            return 'artist', (200 if artist else 404), artist
+        if len(parts) == 3 and parts[0] == 'artists' and parts[2] == 'albums':
+            found = catalog.parse_id(parts[1])
+            if not found or catalog.artist(found[0]) is None:
+                return 'artist_albums', 404, None
+            groups = (query.get('include_groups') or 'album,single,appears_on,compilation').split(',')
+            albums = catalog.artist_albums(found[0], groups)
+            return 'artist_albums', 200, page(albums[offset:offset + limit], len(albums), limit, offset)
+        if parts == ['albums']:
+            return 'albums', 200, {'albums': [catalog.album(x) for x in ids]}
+        if len(parts) == 3 and parts[0] == 'albums' and parts[2] == 'tracks':
+            items = catalog.album_tracks(parts[1])
+            if items is None:
+                return 'album_tracks', 404, None
+            return 'album_tracks', 200, page(items[offset:offset + limit], len(items), limit, offset)
+        if parts == ['tracks']:
+            return 'tracks', 200, {'tracks': [catalog.track(x) for x in ids]}
+        if len(parts) == 2 and parts[0] == 'playlists':
+            return 'playlist', 200, {
+                'id': parts[1],
+                'name': f'Playlist {parts[1]}',
+                'tracks': {'total': PLAYLIST_SIZE},
+            }
+        if len(parts) == 3 and parts[0] == 'playlists' and parts[2] in ('tracks', 'items'):
+            tracks = catalog.playlist_tracks(parts[1])
+            items = [{'track': t} for t in tracks[offset:offset + limit]]
+            return 'playlist_tracks', 200, page(items, len(tracks), limit, offset)
+        if parts == ['browse', 'new-releases']:
+            albums = catalog.new_releases()
+            return 'new_releases', 200, {'albums': page(albums[offset:offset + limit], len(albums), limit, offset)}
+        if parts == ['search']:
+            match = re.search(r'genre:"([^"]*)"', query.get('q', ''))
+            artists = catalog.search_artists(match.group(1)) if match else []
+            return 'search', 200, {'artists': page(artists[offset:offset + limit], len(artists), limit, offset)}
+        return 'unknown', 404, None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # ヘッダーと本文を別々に書き込むため、Nagleアルゴリズムと遅延ACKで
+            # 1リクエストごとに約40ms待たされるのを防ぐ
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> int:
+                if body is None:
+                    body = {'error': {'status': status, 'message': 'mock: not found'}}
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # クライアントがタイムアウトで切断した場合（再試行される）
+                    self.close_connection = True
+                return len(data)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if url.path == '/_mock/stats':
+                    self._send(200, server.stats())
+                    return
+                if url.path == '/_mock/reset':
+                    server.reset()
+                    self._send(200, {'ok': True})
+                    return
+
+                endpoint, status, body = server.route(url.path, query)
+                retry_after = server._inject(endpoint)
+                if retry_after is not None:
+                    status, body = 429, {'error': {'status': 429, 'message': 'API rate limit exceeded'}}
+                    size = self._send(429, body, {'Retry-After': str(retry_after)})
+                else:
+                    size = self._send(status, body)
+                with server._lock:
+                    server.requests[endpoint] += 1
+                    server.bytes_sent[endpoint] += size
+
+        return Handler
+
+
+def _serve_process(config: Dict[str, Any], ready) -> None:
+    catalog = SyntheticCatalog(config['n_artists'], seed=config['seed'], collab_rate=config['collab_rate'])
+    catalog.build_index()
+    server = MockSpotifyServer(
+        catalog,
+        latency=config['latency'],
+        rate_limit_probability=config['rate_limit_probability'],
+        retry_after=config['retry_after']
+    )
+    ready.put(server.prefix)
+    server.serve_forever()
+
+
+class MockSpotifyProcess:
+    """
+    モックサーバーを別プロセスで起動する（計測対象のプロセスのCPU・メモリに影響させない）
+
+    with MockSpotifyProcess(1000) as server:
+        client.prefix = server.prefix
+        ...
+        server.stats()
+    """
+
+    def __init__(
+        self,
+        n_artists: int,
+        seed: int = 0,
+        collab_rate: float = 0.2,
+        latency: float = 0.0,
+        rate_limit_probability: float = 0.0,
+        retry_after: int = 1
+    ):
+        self.config = {
+            'n_artists': n_artists,
+            'seed': seed,
+            'collab_rate': collab_rate,
+            'latency': latency,
+            'rate_limit_probability': rate_limit_probability,
+            'retry_after': retry_after,
+        }
+        self.prefix = ''
+        self._process: Optional[multiprocessing.Process] = None
+
+    def start(self) -> 'MockSpotifyProcess':
+        ready = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_serve_process, args=(self.config, ready), daemon=True)
+        self._process.start()
+        self.prefix = ready.get(timeout=600)
+        return self
+
+    def _control(self, path: str) -> Dict[str, Any]:
+        base = self.prefix[:-len('v1/')]
+        with urllib.request.urlopen(base + path) as response:
+            return json.loads(response.read())
+
+    def stats(self) -> Dict[str, Any]:
+        return self._control('_mock/stats')
+
+    def reset(self) -> None:
+        self._control('_mock/reset')
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self) -> 'MockSpotifyProcess':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Spotify Web APIのモックサーバー')
+    parser.add_argument('--artists', type=int, default=1000, help='アーティスト数')
+    parser.add_argument('--seed', type=int, default=0, help='カタログ生成のシード')
+    parser.add_argument('--collab-rate', type=float, default=0.2, help='楽曲に他のアーティストが参加する確率')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.0, help='平均レイテンシ（秒）')
+    parser.add_argument('--rate-limit-probability', type=float, default=0.0, help='429エラーを返す確率')
+    parser.add_argument('--retry-after', type=int, default=1, help='429エラー時の Retry-After（秒）')
+    args = parser.parse_args()
+
+    catalog = SyntheticCatalog(args.artists, seed=args.seed, collab_rate=args.collab_rate)
+    print(f"カタログを生成中... ({args.artists} アーティスト)")
+    catalog.build_index()
+    server = MockSpotifyServer(
+        catalog,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        rate_limit_probability=args.rate_limit_probability,
+        retry_after=args.retry_after
+    )
+    print(f"モックサーバーを起動しました: {server.prefix}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n停止しました")
+        print(json.dumps(server.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+ネットワークの隣接インデックス（CSR形式）
+
+ノードごとの隣接ノードと接続するエッジを、オフセット配列で区切った
+3つの整数配列にまとめて出力に含める。可視化でノードの接続を調べるときに
+全エッジを走査せず、配列の範囲を参照するだけで済む
+
+    adjacency.offsets    ノード i の範囲は offsets[i] 〜 offsets[i + 1]（ノード数 + 1）
+    adjacency.neighbors  隣接ノードの nodes でのインデックス
+    adjacency.edges      接続するエッジの edges でのインデックス
+
+各ノードの範囲はエッジの並び順（重み順）。ノードにない相手とのエッジと
+自己ループは含めない
+
+使い方（既存のネットワークデータに追加）:
+    python network_adjacency.py ../public/japanese_featuring_network.json
+"""
+
+import argparse
+import json
+from typing import Any, Dict, List
+
+import numpy as np
+
+from network_export import write_network_json
+
+
+def build_adjacency(network_data: Dict[str, Any]) -> Dict[str, List[int]]:
+    """ネットワークデータのノード・エッジの並び順で隣接インデックスを作る"""
+    nodes = network_data.get('nodes', [])
+    edges = network_data.get('edges', [])
+    index = {node['id']: i for i, node in enumerate(nodes)}
+    sources = np.array([index.get(edge['source'], -1) for edge in edges], dtype=np.int64)
+    targets = np.array([index.get(edge['target'], -1) for edge in edges], dtype=np.int64)
+    edge_ids = np.arange(len(edges), dtype=np.int64)
+    valid = (sources >= 0) & (targets >= 0) & (sources != targets)
+
+    # 両方向の (ノード, 隣接ノード, エッジ) をノード順に並べる（同じノードはエッジ順）
+    owners = np.concatenate([sources[valid], targets[valid]])
+    neighbors = np.concatenate([targets[valid], sources[valid]])
+    entries = np.concatenate([edge_ids[valid], edge_ids[valid]])
+    order = np.lexsort((entries, owners))
+    offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners, minlength=len(nodes)), out=offsets[1:])
+    return {
+        'offsets': offsets.tolist(),
+        'neighbors': neighbors[order].tolist(),
+        'edges': entries[order].tolist(),
+    }
+
+
+def add_adjacency(network_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ネットワークデータに隣接インデックス（adjacency）を追加
+
+    ノード・エッジの並び順が変わるとインデックスがずれるため、最後に追加する
+
+    Returns:
+        network_data（同じオブジェクトを更新）
+    """
+    network_data['adjacency'] = build_adjacency(network_data)
+    return network_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ネットワークデータに隣接インデックスを追加')
+    parser.add_argument('input', help='ネットワークデータのJSONファイル')
+    parser.add_argument('--output', help='書き出すJSONファイル（省略時は入力を上書き）')
+    parser.add_argument('--compact', action='store_true', help='空白・改行なしで書き出す')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        network_data = json.load(f)
+    add_adjacency(network_data)
+    output = args.output or args.input
+    write_network_json(output, network_data, compact=args.compact)
+    print(f"✓ {len(network_data['nodes'])} ノードの隣接インデックスを追加しました: {output}")
+
+
+if __name__ == '__main__':
+    main()
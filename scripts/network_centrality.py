@@ -0,0 +1,209 @@
+"""
+ネットワークの中心性指標
+
+コラボレーショングラフの疎な隣接行列（scipy.sparse）を作り、各ノードの
+中心性を行列演算で計算してノードに書き込む。ブラウザで計算し直さずに、
+ランキングやノードの大きさに使える
+
+    weighted_degree  接続するエッジの重みの合計
+    pagerank         重み付きPageRank（減衰率 PAGERANK_DAMPING）
+    eigenvector      固有ベクトル中心性（隣接行列の最大固有値の固有ベクトル、最大値が1）
+    betweenness      媒介中心性の近似値（BETWEENNESS_SAMPLES 個の始点からの最短経路で推定、
+                     重みは使わずホップ数で数える。0〜1に正規化）
+
+媒介中心性は、選んだ始点の列を束ねた行列で幅優先探索を行う（Brandes の
+アルゴリズムを疎行列 × 密行列の積で行う形）。1万ノード・10万エッジ規模で数秒
+
+使い方（既存のネットワークデータに追加）:
+    python network_centrality.py ../public/japanese_featuring_network.json
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.linalg import ArpackNoConvergence, eigsh
+
+from edge_store import EdgeStore
+from network_export import write_network_json
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1e-10
+PAGERANK_MAX_ITERATIONS = 200
+
+BETWEENNESS_SAMPLES = 256  # 媒介中心性の始点の数（ノード数以上なら厳密に計算）
+BETWEENNESS_BATCH = 64  # 一度に探索する始点の数
+DEFAULT_SEED = 42
+
+SIGNIFICANT_DIGITS = 6  # 出力する値の有効数字
+
+CENTRALITY_KEYS = ('weighted_degree', 'pagerank', 'eigenvector', 'betweenness')
+
+
+def adjacency_matrix(store: EdgeStore, n_nodes: int) -> sparse.csr_matrix:
+    """エッジから対称な重み付き隣接行列を作る（同じペアの重みは合計）"""
+    rows = np.concatenate([store.sources, store.targets])
+    cols = np.concatenate([store.targets, store.sources])
+    weights = np.concatenate([store.weights, store.weights]).astype(np.float64)
+    return sparse.csr_matrix((weights, (rows, cols)), shape=(n_nodes, n_nodes))
+
+
+def pagerank(adjacency: sparse.csr_matrix, damping: float = PAGERANK_DAMPING) -> np.ndarray:
+    """重み付きPageRank（べき乗法、エッジのないノードからは全ノードに均等に移る）"""
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    # 列方向に確率を並べた遷移行列の転置（行 i から出る重みを i の次数で割る）
+    transition = sparse.diags(inverse) @ adjacency
+    transition_t = transition.T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        previous = rank
+        rank = damping * (transition_t @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(rank - previous).sum() < PAGERANK_TOLERANCE * n:
+            break
+    return rank / rank.sum()
+
+
+def eigenvector_centrality(adjacency: sparse.csr_matrix) -> np.ndarray:
+    """隣接行列の最大固有値の固有ベクトル（絶対値、最大値が1）"""
+    n = adjacency.shape[0]
+    if n == 0 or adjacency.nnz == 0:
+        return np.zeros(n)
+    if n < 3:
+        # eigsh は k < n が必要なため、小さなグラフは密行列で解く
+        _, vectors = np.linalg.eigh(adjacency.toarray())
+        vector = vectors[:, -1]
+    else:
+        try:
+            _, vectors = eigsh(adjacency, k=1, which='LA', v0=np.ones(n), tol=1e-8)
+            vector = vectors[:, 0]
+        except ArpackNoConvergence as e:
+            vector = e.eigenvectors[:, 0] if e.eigenvectors.size else np.zeros(n)
+    vector = np.abs(vector)
+    peak = vector.max()
+    return vector / peak if peak > 0 else vector
+
+
+def approximate_betweenness(
+    adjacency: sparse.csr_matrix,
+    samples: int = BETWEENNESS_SAMPLES,
+    seed: int = DEFAULT_SEED
+) -> np.ndarray:
+    """
+    始点をサンプリングした媒介中心性（ホップ数の最短経路、0〜1に正規化）
+
+    始点の列を BETWEENNESS_BATCH 個ずつ束ね、距離・最短経路数（sigma）を
+    n × batch の行列で持って幅優先探索し、距離の遠い順に依存度（delta）を集計する
+    """
+    n = adjacency.shape[0]
+    if n < 3:
+        return np.zeros(n)
+    links = adjacency.copy()
+    links.data[:] = 1.0
+    rng = np.random.default_rng(seed)
+    sources = np.arange(n) if samples >= n else np.sort(rng.choice(n, size=samples, replace=False))
+
+    betweenness = np.zeros(n)
+    for start in range(0, len(sources), BETWEENNESS_BATCH):
+        batch = sources[start:start + BETWEENNESS_BATCH]
+        columns = np.arange(len(batch))
+        dist = np.full((n, len(batch)), -1, dtype=np.int32)
+        sigma = np.zeros((n, len(batch)))
+        dist[batch, columns] = 0
+        sigma[batch, columns] = 1.0
+
+        # 幅優先探索: 次の距離のノードの最短経路数は、隣接する現在の距離のノードの和
+        frontier = sigma.copy()
+        depth = 0
+        while True:
+            reached = links @ frontier
+            new = (dist < 0) & (reached > 0)
+            if not new.any():
+                break
+            depth += 1
+            dist[new] = depth
+            sigma[new] = reached[new]
+            frontier = np.where(new, sigma, 0.0)
+
+        # 依存度: delta(v) = Σ_{w: dist(w) = dist(v)+1} sigma(v) / sigma(w) * (1 + delta(w))
+        delta = np.zeros_like(sigma)
+        for level in range(depth - 1, 0, -1):
+            child = np.where(dist == level + 1, (1.0 + delta) / np.maximum(sigma, 1.0), 0.0)
+            at_level = dist == level
+            delta[at_level] = (sigma * (links @ child))[at_level]
+        betweenness += delta.sum(axis=1)
+
+    # 無向グラフでは各経路を両端から2回数えるため半分にし、始点の割合で全体に拡大
+    betweenness *= (n / len(sources)) / 2
+    return betweenness / ((n - 1) * (n - 2) / 2)
+
+
+def _significant(value: float) -> float:
+    return float(f'{value:.{SIGNIFICANT_DIGITS}g}')
+
+
+def add_centrality(
+    network_data: Dict[str, Any],
+    samples: int = BETWEENNESS_SAMPLES,
+    seed: int = DEFAULT_SEED
+) -> Dict[str, Any]:
+    """
+    ネットワークデータの各ノードに中心性（CENTRALITY_KEYS）を書き込む
+
+    計算に使ったパラメータは metadata['centrality'] に記録する
+
+    Returns:
+        network_data（同じオブジェクトを更新）
+    """
+    nodes = network_data.get('nodes', [])
+    adjacency = adjacency_matrix(EdgeStore.from_network_data(network_data), len(nodes))
+    scores = {
+        'weighted_degree': np.asarray(adjacency.sum(axis=1)).ravel(),
+        'pagerank': pagerank(adjacency),
+        'eigenvector': eigenvector_centrality(adjacency),
+        'betweenness': approximate_betweenness(adjacency, samples=samples, seed=seed),
+    }
+    for key, values in scores.items():
+        if key == 'weighted_degree':
+            column = [int(v) for v in values.round().tolist()]
+        else:
+            column = [_significant(v) for v in values.tolist()]
+        for node, value in zip(nodes, column):
+            node[key] = value
+    network_data.setdefault('metadata', {})['centrality'] = {
+        'pagerank_damping': PAGERANK_DAMPING,
+        'betweenness_samples': min(samples, len(nodes)),
+        'seed': seed,
+    }
+    return network_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ネットワークデータに中心性指標を追加')
+    parser.add_argument('input', help='ネットワークデータのJSONファイル')
+    parser.add_argument('--output', help='書き出すJSONファイル（省略時は入力を上書き）')
+    parser.add_argument('--samples', type=int, default=BETWEENNESS_SAMPLES,
+                        help='媒介中心性の始点の数（ノード数以上なら厳密に計算）')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='始点を選ぶ乱数のシード')
+    parser.add_argument('--compact', action='store_true', help='空白・改行なしで書き出す')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        network_data = json.load(f)
+    start = time.perf_counter()
+    add_centrality(network_data, samples=args.samples, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    output = args.output or args.input
+    write_network_json(output, network_data, compact=args.compact)
+    print(f"✓ {len(network_data['nodes'])} ノードの中心性を計算しました（{elapsed:.1f}秒）: {output}")
+
+
+if __name__ == '__main__':
+    main()
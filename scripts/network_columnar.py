@@ -0,0 +1,327 @@
+"""
+ネットワークデータの列指向バイナリ形式
+
+フロントエンド向けに、ネットワークデータ（JSON）と同じ内容を
+列ごとの型付き配列にまとめたバイナリファイルと、小さなマニフェスト（JSON）で書き出す。
+JSONではエッジごとに繰り返される楽曲名・ジャンルなどを1回ずつしか持たず、
+ブラウザでは配列を ArrayBuffer からそのまま TypedArray として参照できる
+
+ファイル:
+    <name>.columnar.json  マニフェスト（形式・バージョン、各列の位置と型、metadata）
+    <name>.columnar.bin   列データ（リトルエンディアン、各列は8バイト境界から開始）
+
+列:
+    strings.offsets / strings.data   文字列表（UTF-8を連結したものと、各文字列の開始バイト位置）
+    nodes.<キー>                      ノードの属性（文字列は文字列表のインデックス）
+    edges.source / edges.target       エッジの両端（ノードのインデックス、ノードにない場合は-1）
+    edges.<キー>                      エッジの属性（weight など）
+    edges.track_offsets               各エッジの楽曲の範囲（edges.tracks の開始位置、エッジ数+1）
+    edges.tracks                      楽曲表のインデックス
+    tracks.<キー>                     楽曲表（同じ内容の楽曲は1行にまとめる）
+    adjacency.offsets / adjacency.neighbors / adjacency.edges
+                                      隣接インデックス（ネットワークデータに adjacency がある場合）
+
+数値の列は値に応じて int32 / float64、文字列の列は uint32（文字列表のインデックス）、
+真偽値は uint8 とする。値がない（キーを持たない）要素は、整数の列では -1、
+文字列の列では 0xFFFFFFFF、真偽値の列では 255、浮動小数点の列では NaN とし、マニフェストに
+"optional": true を付ける。リストや辞書の値は文字列表にJSON文字列として入れる（"json": true）
+"""
+
+import gzip
+import json
+import math
+import os
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from network_export import COMPRESSION_SUFFIXES, COMPRESSIONS, GZIP_LEVEL, BROTLI_QUALITY, brotli
+
+COLUMNAR_FORMAT = 'audiograph-network-columnar'
+COLUMNAR_VERSION = 1
+ALIGNMENT = 8
+MISSING_INDEX = 0xFFFFFFFF
+
+# エッジ・楽曲で列として別に扱うキー
+EDGE_ENDPOINT_KEYS = ('source', 'target')
+EDGE_TRACKS_KEY = 'tracks'
+
+
+def columnar_paths(json_path: str) -> Tuple[str, str]:
+    """ネットワークJSONのパスから (マニフェスト, バイナリ) のパスを作る"""
+    base = json_path[:-len('.json')] if json_path.endswith('.json') else json_path
+    return base + '.columnar.json', base + '.columnar.bin'
+
+
+class _StringTable:
+    """重複しない文字列の表"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def add(self, value: str) -> int:
+        idx = self.index.get(value)
+        if idx is None:
+            idx = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        encoded = [s.encode('utf-8') for s in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+        if encoded:
+            offsets[1:] = np.cumsum([len(b) for b in encoded])
+        return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _column_kind(values: Sequence[Any]) -> str:
+    """列の値から型を決める（'bool' / 'int' / 'float' / 'string' / 'json'）"""
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, bool) for v in present):
+        return 'bool'
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        if all(-2 ** 31 < v < 2 ** 31 for v in present):
+            return 'int'
+        return 'float'
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return 'float'
+    if all(isinstance(v, str) for v in present):
+        return 'string'
+    return 'json'
+
+
+def _encode_column(values: List[Any], strings: _StringTable) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """1列分の値を配列にする（値がない要素は None）"""
+    kind = _column_kind(values)
+    optional = any(v is None for v in values)
+    info: Dict[str, Any] = {}
+    if kind == 'bool':
+        array = np.array([255 if v is None else int(v) for v in values], dtype=np.uint8)
+    elif kind == 'int':
+        array = np.array([-1 if v is None else v for v in values], dtype=np.int32)
+    elif kind == 'float':
+        array = np.array([math.nan if v is None else v for v in values], dtype=np.float64)
+    else:
+        if kind == 'json':
+            values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+            info['json'] = True
+        array = np.array([MISSING_INDEX if v is None else strings.add(v) for v in values], dtype=np.uint32)
+        info['string'] = True
+    if optional:
+        info['optional'] = True
+    return array, info
+
+
+def _collect_columns(rows: List[Dict[str, Any]], skip: Sequence[str] = ()) -> Dict[str, List[Any]]:
+    """行（辞書）のリストをキーごとの値のリストにする（キーの順序は最初に現れた順）"""
+    keys: Dict[str, None] = {}
+    for row in rows:
+        for key in row:
+            if key not in skip:
+                keys.setdefault(key, None)
+    return {key: [row.get(key) for row in rows] for key in keys}
+
+
+def encode_columnar(network_data: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+    """
+    ネットワークデータを列指向形式にする
+
+    Returns:
+        (マニフェスト, バイナリ)。マニフェストの "binary" は呼び出し側で設定する
+    """
+    nodes = network_data.get('nodes', [])
+    edges = network_data.get('edges', [])
+    strings = _StringTable()
+    columns: List[Tuple[str, np.ndarray, Dict[str, Any]]] = []
+
+    # ノード
+    for key, values in _collect_columns(nodes).items():
+        array, info = _encode_column(values, strings)
+        columns.append((f'nodes.{key}', array, info))
+    node_index = {node['id']: i for i, node in enumerate(nodes)}
+
+    # 楽曲表（複数のエッジに含まれる同じ楽曲は1行にまとめる）とエッジからの参照
+    track_rows: List[Dict[str, Any]] = []
+    track_index: Dict[Any, int] = {}
+    edge_tracks: List[int] = []
+    track_offsets = [0]
+    for edge in edges:
+        for track in edge.get(EDGE_TRACKS_KEY, []):
+            key = json.dumps(track, ensure_ascii=False)
+            idx = track_index.get(key)
+            if idx is None:
+                idx = track_index[key] = len(track_rows)
+                track_rows.append(track)
+            edge_tracks.append(idx)
+        track_offsets.append(len(edge_tracks))
+
+    # エッジ
+    for key in EDGE_ENDPOINT_KEYS:
+        array = np.array([node_index.get(edge[key], -1) for edge in edges], dtype=np.int32)
+        columns.append((f'edges.{key}', array, {'node_index': True}))
+    for key, values in _collect_columns(edges, skip=EDGE_ENDPOINT_KEYS + (EDGE_TRACKS_KEY,)).items():
+        array, info = _encode_column(values, strings)
+        columns.append((f'edges.{key}', array, info))
+    columns.append(('edges.track_offsets', np.array(track_offsets, dtype=np.uint32), {}))
+    columns.append(('edges.tracks', np.array(edge_tracks, dtype=np.uint32), {}))
+
+    for key, values in _collect_columns(track_rows).items():
+        array, info = _encode_column(values, strings)
+        columns.append((f'tracks.{key}', array, info))
+
+    adjacency = network_data.get('adjacency')
+    if adjacency is not None:
+        columns.append(('adjacency.offsets', np.array(adjacency['offsets'], dtype=np.uint32), {}))
+        columns.append(('adjacency.neighbors', np.array(adjacency['neighbors'], dtype=np.int32), {'node_index': True}))
+        columns.append(('adjacency.edges', np.array(adjacency['edges'], dtype=np.uint32), {}))
+
+    string_offsets, string_data = strings.arrays()
+    columns = [
+        ('strings.offsets', string_offsets, {}),
+        ('strings.data', string_data, {}),
+    ] + columns
+
+    # 8バイト境界に揃えて連結
+    chunks: List[bytes] = []
+    layout: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, array, info in columns:
+        padding = -offset % ALIGNMENT
+        if padding:
+            chunks.append(b'\0' * padding)
+            offset += padding
+        data = array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes()
+        layout[name] = dict(info, dtype=array.dtype.name, offset=offset, length=len(array))
+        chunks.append(data)
+        offset += len(data)
+
+    manifest = {
+        'format': COLUMNAR_FORMAT,
+        'version': COLUMNAR_VERSION,
+        'byte_order': 'little',
+        'counts': {
+            'nodes': len(nodes),
+            'edges': len(edges),
+            'tracks': len(track_rows),
+            'strings': len(strings.strings),
+        },
+        'columns': layout,
+        'metadata': network_data.get('metadata', {}),
+    }
+    return manifest, b''.join(chunks)
+
+
+def write_columnar(json_path: str, network_data: Dict[str, Any], compress: Sequence[str] = ()) -> List[str]:
+    """
+    ネットワークデータを列指向形式で書き出す（json_path の隣に .columnar.json / .columnar.bin）
+
+    Args:
+        json_path: ネットワークJSONのパス（出力ファイル名の元）
+        compress: バイナリの圧縮ファイルも書き出す形式（'gzip', 'brotli'）
+
+    Returns:
+        書き出したファイルのパス
+    """
+    manifest_path, binary_path = columnar_paths(json_path)
+    manifest, binary = encode_columnar(network_data)
+    manifest['binary'] = os.path.basename(binary_path)
+
+    directory = os.path.dirname(json_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    outputs = [(binary_path, binary)]
+    for name in compress:
+        if name not in COMPRESSIONS:
+            raise ValueError(f"未対応の圧縮形式です: {name}")
+        if name == 'gzip':
+            outputs.append((binary_path + COMPRESSION_SUFFIXES[name], gzip.compress(binary, GZIP_LEVEL, mtime=0)))
+        elif brotli is not None:
+            outputs.append((binary_path + COMPRESSION_SUFFIXES[name], brotli.compress(binary, quality=BROTLI_QUALITY)))
+    # マニフェストは最後に置き換える（読み込み側がバイナリより先に新しいマニフェストを見ないように）
+    outputs.append((manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')))
+
+    for path, data in outputs:
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return [path for path, _ in outputs]
+
+
+def _decode_column(array: np.ndarray, info: Dict[str, Any], strings: List[str]) -> List[Any]:
+    if info.get('string'):
+        values = [None if v == MISSING_INDEX else strings[v] for v in array.tolist()]
+        if info.get('json'):
+            values = [None if v is None else json.loads(v) for v in values]
+        return values
+    values = array.tolist()
+    if not info.get('optional'):
+        return [bool(v) for v in values] if array.dtype == np.uint8 else values
+    if array.dtype == np.uint8:
+        return [None if v == 255 else bool(v) for v in values]
+    if array.dtype == np.int32:
+        return [None if v == -1 else v for v in values]
+    return [None if math.isnan(v) else v for v in values]
+
+
+def read_columnar(manifest_path: str) -> Dict[str, Any]:
+    """
+    列指向形式を読み込み、ネットワークデータ（JSONと同じ形）に戻す
+
+    検証や、JSONを経由しないツールからの読み込み用
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != COLUMNAR_FORMAT or manifest.get('version') != COLUMNAR_VERSION:
+        raise ValueError(f"列指向形式のバージョンが異なります ({manifest_path})")
+    binary_path = os.path.join(os.path.dirname(manifest_path), manifest['binary'])
+    with open(binary_path, 'rb') as f:
+        binary = f.read()
+
+    layout = manifest['columns']
+
+    def column(name: str) -> np.ndarray:
+        info = layout[name]
+        dtype = np.dtype(info['dtype']).newbyteorder('<')
+        return np.frombuffer(binary, dtype=dtype, count=info['length'], offset=info['offset'])
+
+    offsets = column('strings.offsets').tolist()
+    data = column('strings.data').tobytes()
+    strings = [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+    def rows(prefix: str, count: int, skip: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        result: List[Dict[str, Any]] = [{} for _ in range(count)]
+        for name, info in layout.items():
+            section, _, key = name.partition('.')
+            if section != prefix or key in skip:
+                continue
+            for row, value in zip(result, _decode_column(column(name), info, strings)):
+                if value is not None or not info.get('optional'):
+                    row[key] = value
+        return result
+
+    counts = manifest['counts']
+    nodes = rows('nodes', counts['nodes'])
+    tracks = rows('tracks', counts['tracks'])
+    edges = rows('edges', counts['edges'], skip=EDGE_ENDPOINT_KEYS + ('track_offsets', 'tracks'))
+    sources = column('edges.source').tolist()
+    targets = column('edges.target').tolist()
+    track_offsets = column('edges.track_offsets').tolist()
+    edge_tracks = column('edges.tracks').tolist()
+    result_edges = []
+    for i, edge in enumerate(edges):
+        source = nodes[sources[i]]['id'] if sources[i] >= 0 else None
+        target = nodes[targets[i]]['id'] if targets[i] >= 0 else None
+        ordered = {'source': source, 'target': target}
+        ordered.update(edge)
+        ordered[EDGE_TRACKS_KEY] = [dict(tracks[t]) for t in edge_tracks[track_offsets[i]:track_offsets[i + 1]]]
+        result_edges.append(ordered)
+    network_data = {'nodes': nodes, 'edges': result_edges}
+    if 'adjacency.offsets' in layout:
+        network_data['adjacency'] = {
+            key: column(f'adjacency.{key}').tolist() for key in ('offsets', 'neighbors', 'edges')
+        }
+    network_data['metadata'] = manifest.get('metadata', {})
+    return network_data
+
@@ -0,0 +1,248 @@
+"""
+ネットワークデータのストリーミング書き出し
+
+ネットワークデータ全体を json.dump で一度に書き出す代わりに、ノード・エッジを
+1件ずつJSONに変換してファイルに書き込む。書き出し中に文書全体の文字列を
+メモリに持たない
+
+- indent=2（デフォルト）の出力は json.dump(..., ensure_ascii=False, indent=2) と同一
+- compact=True では空白・改行を入れない（ファイルサイズが小さくなる）
+- 隣接インデックス（adjacency）がある場合はエッジと metadata の間に書き込む。
+  整数の配列は要素ごとに改行せず1行にする
+- 静的ホスティング用に、同じ内容の .gz / .br ファイルも同時に書き出せる
+  （brotli はパッケージがインストールされている場合のみ）
+- 書き込みは一時ファイルに行い、完了後に置き換える（中断で壊れたファイルを残さない）
+"""
+
+import gzip
+import io
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import brotli
+except ImportError:  # 任意の依存パッケージ
+    brotli = None
+
+# 書き出せる圧縮形式（拡張子）
+COMPRESSIONS = ('gzip', 'brotli')
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'brotli': '.br'}
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+class _BrotliWriter(io.RawIOBase):
+    """brotli.Compressor で圧縮しながらファイルに書き込む"""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'wb')
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY, mode=brotli.MODE_TEXT)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._file.write(self._compressor.process(bytes(data)))
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.write(self._compressor.finish())
+            self._file.close()
+        super().close()
+
+
+class NetworkJsonWriter:
+    """
+    ネットワークデータ（nodes, edges, metadata）をストリーミングで書き出す
+
+    with NetworkJsonWriter(path) as writer:
+        for node in nodes:
+            writer.add_node(node)
+        for edge in edges:
+            writer.add_edge(edge)
+        writer.set_metadata(metadata)
+
+    ノードはすべてエッジより先に追加する。adjacency・metadata は最後に書き込む
+
+    Args:
+        path: 出力先のJSONファイル
+        compact: 空白・改行を入れずに書き出す
+        compress: 同時に書き出す圧縮形式（'gzip', 'brotli'）
+    """
+
+    def __init__(self, path: str, compact: bool = False, compress: Sequence[str] = ()):
+        for name in compress:
+            if name not in COMPRESSIONS:
+                raise ValueError(f"未対応の圧縮形式です: {name}")
+        self.path = path
+        self.compact = compact
+        self.compress = [name for name in compress if name != 'brotli' or brotli is not None]
+        if 'brotli' in compress and brotli is None:
+            print("  警告: brotli パッケージがないため .br ファイルは書き出しません（pip install brotli）")
+        self.paths: List[str] = []  # 書き出したファイル
+        self.counts = {'nodes': 0, 'edges': 0}
+        self._sinks: List[Any] = []
+        self._section: Optional[str] = None
+        self._metadata: Dict[str, Any] = {}
+        self._adjacency: Optional[Dict[str, List[int]]] = None
+
+    def __enter__(self) -> 'NetworkJsonWriter':
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(commit=exc_type is None)
+
+    def _targets(self) -> List[str]:
+        return [self.path] + [self.path + COMPRESSION_SUFFIXES[name] for name in self.compress]
+
+    def open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for target, name in zip(self._targets(), [None] + self.compress):
+            tmp_path = target + '.tmp'
+            if name is None:
+                raw = open(tmp_path, 'wb')
+            elif name == 'gzip':
+                # mtime=0 で同じ内容なら同じバイト列になるようにする
+                raw = gzip.GzipFile(tmp_path, 'wb', compresslevel=GZIP_LEVEL, mtime=0)
+            else:
+                raw = _BrotliWriter(tmp_path)
+            self._sinks.append(io.TextIOWrapper(io.BufferedWriter(raw) if name == 'brotli' else raw,
+                                                encoding='utf-8', newline='\n'))
+        self._write('{')
+
+    def _write(self, text: str) -> None:
+        for sink in self._sinks:
+            sink.write(text)
+
+    def _dumps(self, value: Any, level: int) -> str:
+        """level 段目の要素として value をJSONにする（インデントは json.dump と同じ）"""
+        if self.compact:
+            return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        text = json.dumps(value, ensure_ascii=False, indent=2)
+        return text.replace('\n', '\n' + '  ' * level)
+
+    def _start_section(self, section: str) -> None:
+        """section（'nodes' または 'edges'）の配列を開始（前の配列は閉じる）"""
+        if self._section == section:
+            return
+        if self._section == 'edges':
+            raise ValueError("ノードはエッジより先に追加してください")
+        while self._section != section:
+            if self._section is None:
+                self._section, separator = 'nodes', ''
+            else:
+                self._end_section()
+                self._section, separator = 'edges', ','
+            if self.compact:
+                self._write(f'{separator}"{self._section}":[')
+            else:
+                self._write(f'{separator}\n  "{self._section}": [')
+
+    def _end_section(self) -> None:
+        if self.compact or self.counts[self._section] == 0:
+            self._write(']')
+        else:
+            self._write('\n  ]')
+
+    def _add(self, section: str, item: Dict[str, Any]) -> None:
+        self._start_section(section)
+        separator = ',' if self.counts[section] else ''
+        self._write(separator + ('' if self.compact else '\n    ') + self._dumps(item, 2))
+        self.counts[section] += 1
+
+    def add_node(self, node: Dict[str, Any]) -> None:
+        self._add('nodes', node)
+
+    def add_edge(self, edge: Dict[str, Any]) -> None:
+        self._add('edges', edge)
+
+    def set_metadata(self, metadata: Dict[str, Any]) -> None:
+        self._metadata = metadata
+
+    def set_adjacency(self, adjacency: Dict[str, List[int]]) -> None:
+        """隣接インデックス（network_adjacency.build_adjacency() の形式）"""
+        self._adjacency = adjacency
+
+    def _write_adjacency(self) -> None:
+        arrays = [
+            (f'"{key}":' if self.compact else f'\n    "{key}": ') + json.dumps(values, separators=(',', ':'))
+            for key, values in self._adjacency.items()
+        ]
+        if self.compact:
+            self._write(',"adjacency":{' + ','.join(arrays) + '}')
+        else:
+            self._write(',\n  "adjacency": {' + ','.join(arrays) + '\n  }')
+
+    def close(self, commit: bool = True) -> None:
+        """閉じて一時ファイルを置き換える（commit=False の場合は一時ファイルを削除）"""
+        if not self._sinks:
+            return
+        if commit:
+            if self._section != 'edges':
+                self._start_section('edges')
+            self._end_section()
+            if self._adjacency is not None:
+                self._write_adjacency()
+            if self.compact:
+                self._write(',"metadata":' + self._dumps(self._metadata, 1) + '}')
+            else:
+                self._write(',\n  "metadata": ' + self._dumps(self._metadata, 1) + '\n}')
+        for sink in self._sinks:
+            sink.close()
+        self._sinks = []
+        for target in self._targets():
+            if commit:
+                os.replace(target + '.tmp', target)
+                self.paths.append(target)
+            elif os.path.exists(target + '.tmp'):
+                os.remove(target + '.tmp')
+
+
+def write_network_json(
+    path: str,
+    network_data: Dict[str, Any],
+    compact: bool = False,
+    compress: Sequence[str] = ()
+) -> List[str]:
+    """
+    ネットワークデータを NetworkJsonWriter で書き出す
+
+    Returns:
+        書き出したファイルのパス（圧縮ファイルを含む）
+    """
+    return write_network_stream(
+        path,
+        network_data.get('nodes', []),
+        network_data.get('edges', []),
+        network_data.get('metadata', {}),
+        compact=compact,
+        compress=compress,
+        adjacency=network_data.get('adjacency')
+    )
+
+
+def write_network_stream(
+    path: str,
+    nodes: Iterable[Dict[str, Any]],
+    edges: Iterable[Dict[str, Any]],
+    metadata: Dict[str, Any],
+    compact: bool = False,
+    compress: Sequence[str] = (),
+    adjacency: Optional[Dict[str, List[int]]] = None
+) -> List[str]:
+    """ノード・エッジのイテラブル（ジェネレータなど）から書き出す"""
+    with NetworkJsonWriter(path, compact=compact, compress=compress) as writer:
+        for node in nodes:
+            writer.add_node(node)
+        for edge in edges:
+            writer.add_edge(edge)
+        if adjacency is not None:
+            writer.set_adjacency(adjacency)
+        writer.set_metadata(metadata)
+    return writer.paths
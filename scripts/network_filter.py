@@ -0,0 +1,188 @@
+"""
+ネットワークのノイズノードの除外と孤立ノードの削除
+
+ゲーム音楽のサウンドチーム・宗教音楽の合唱団など、多数のアーティストと
+機械的に結び付いて可視化を乱すノードを、書き出す前に除外する。
+除外したノードのエッジも削除し、その結果エッジがなくなったノード（孤立ノード）も除く。
+これまで可視化ページが読み込みのたびに行っていた処理をデータ生成時に済ませる
+
+除外ルール（noise_filter.json）:
+    names              完全一致で除外する名前（ノードの id または name）
+    normalized_names   正規化（NFKC・大文字小文字・空白と記号の違いを無視）して比較する名前
+    patterns           名前に一致する正規表現（大文字小文字を区別しない）
+    max_degree         次数（接続するエッジの重みの合計）がこれより大きいノード（null で無効）
+    max_degree_share   次数が全コラボレーション数のこの割合より大きいノード（null で無効）
+
+使い方（既存のネットワークデータに適用）:
+    python network_filter.py ../public/japanese_featuring_network.json
+    python network_filter.py in.json --output out.json --config my_filter.json
+"""
+
+import argparse
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, Optional
+
+from network_export import write_network_json
+
+DEFAULT_FILTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'noise_filter.json')
+
+_SEPARATORS = re.compile(r'[\s\W_]+')
+
+
+def normalize_name(name: str) -> str:
+    """表記の揺れ（全角・半角、大文字小文字、空白・記号、& と and）を無視して比較する形にする"""
+    text = unicodedata.normalize('NFKC', name).casefold()
+    text = re.sub(r'\s*&\s*', ' and ', text)
+    return _SEPARATORS.sub('', text)
+
+
+class NoiseFilter:
+    """
+    ノイズノードの除外ルール
+
+    Args:
+        names: 完全一致で除外する名前
+        normalized_names: normalize_name() した形で比較する名前
+        patterns: 名前に一致する正規表現
+        max_degree: 次数の上限（超えるノードを除外）
+        max_degree_share: 全コラボレーション数に対する次数の割合の上限
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str] = (),
+        normalized_names: Iterable[str] = (),
+        patterns: Iterable[str] = (),
+        max_degree: Optional[int] = None,
+        max_degree_share: Optional[float] = None
+    ):
+        self.names = set(names)
+        self.normalized_names = {normalize_name(name) for name in normalized_names}
+        self.patterns = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self.max_degree = max_degree
+        self.max_degree_share = max_degree_share
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_FILTER_PATH) -> 'NoiseFilter':
+        """JSONファイルからルールを読み込む"""
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(
+            names=config.get('names', []),
+            normalized_names=config.get('normalized_names', []),
+            patterns=config.get('patterns', []),
+            max_degree=config.get('max_degree'),
+            max_degree_share=config.get('max_degree_share'),
+        )
+
+    def match(self, node: Dict[str, Any], total_collaborations: int = 0) -> Optional[str]:
+        """
+        ノードが除外対象なら一致したルール名を返す（対象でなければNone）
+        """
+        labels = [label for label in (node.get('id'), node.get('name')) if label]
+        if any(label in self.names for label in labels):
+            return 'names'
+        if any(normalize_name(label) in self.normalized_names for label in labels):
+            return 'normalized_names'
+        if any(pattern.search(label) for pattern in self.patterns for label in labels):
+            return 'patterns'
+        degree = node.get('degree', 0)
+        if self.max_degree is not None and degree > self.max_degree:
+            return 'max_degree'
+        if (self.max_degree_share is not None and total_collaborations
+                and degree > self.max_degree_share * total_collaborations):
+            return 'max_degree_share'
+        return None
+
+
+def filter_network(network_data: Dict[str, Any], noise_filter: NoiseFilter) -> Dict[str, Any]:
+    """
+    ノイズノードと、そのエッジ・孤立ノードを除いたネットワークデータを返す
+
+    ノードの次数は削除したエッジの重みを差し引き、次数順に並べ直す
+    （同じ次数は元の順）。除外の内訳は metadata['filtered'] に記録する
+    """
+    metadata = network_data.get('metadata', {})
+    nodes = network_data.get('nodes', [])
+    total_collaborations = metadata.get('total_collaborations', 0)
+
+    excluded: Dict[str, int] = {}  # ルール名 -> 除外したノード数
+    remaining = {}
+    for node in nodes:
+        rule = noise_filter.match(node, total_collaborations)
+        if rule is None:
+            remaining[node['id']] = node
+        else:
+            excluded[rule] = excluded.get(rule, 0) + 1
+
+    # 除外したノード（と存在しないノード）へのエッジを削除
+    edges = []
+    removed_weight: Dict[str, int] = {}
+    for edge in network_data.get('edges', []):
+        if edge['source'] in remaining and edge['target'] in remaining:
+            edges.append(edge)
+            continue
+        for label in (edge['source'], edge['target']):
+            removed_weight[label] = removed_weight.get(label, 0) + edge.get('weight', 1)
+
+    # 孤立ノードを削除
+    connected = {label for edge in edges for label in (edge['source'], edge['target'])}
+    isolated = [label for label in remaining if label not in connected]
+
+    kept_nodes = []
+    for label, node in remaining.items():
+        if label not in connected:
+            continue
+        if label in removed_weight:
+            node = dict(node, degree=node.get('degree', 0) - removed_weight[label])
+        kept_nodes.append(node)
+    kept_nodes.sort(key=lambda node: -node.get('degree', 0))
+
+    filtered_metadata = dict(metadata)
+    filtered_metadata.update({
+        'total_nodes': len(kept_nodes),
+        'total_edges': len(edges),
+        'total_collaborations': sum(edge.get('weight', 1) for edge in edges),
+        'filtered': {
+            'excluded': excluded,
+            'isolated': len(isolated),
+            'removed_edges': len(network_data.get('edges', [])) - len(edges),
+        },
+    })
+    return {'nodes': kept_nodes, 'edges': edges, 'metadata': filtered_metadata}
+
+
+def report(network_data: Dict[str, Any]) -> None:
+    """filter_network() の除外の内訳を表示"""
+    filtered = network_data.get('metadata', {}).get('filtered')
+    if not filtered:
+        return
+    print("\nノイズノードの除外:")
+    for rule, count in filtered['excluded'].items():
+        print(f"  {rule}: {count} ノード")
+    print(f"  孤立ノード: {filtered['isolated']} ノード")
+    print(f"  削除したエッジ: {filtered['removed_edges']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ネットワークデータからノイズノードと孤立ノードを除外')
+    parser.add_argument('input', help='ネットワークデータのJSONファイル')
+    parser.add_argument('--output', help='書き出すJSONファイル（省略時は入力を上書き）')
+    parser.add_argument('--config', default=DEFAULT_FILTER_PATH, help='除外ルールのJSONファイル')
+    parser.add_argument('--compact', action='store_true', help='空白・改行なしで書き出す')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        network_data = json.load(f)
+    filtered = filter_network(network_data, NoiseFilter.load(args.config))
+    output = args.output or args.input
+    write_network_json(output, filtered, compact=args.compact)
+    report(filtered)
+    print(f"✓ {len(filtered['nodes'])} ノード・{len(filtered['edges'])} エッジを保存しました: {output}")
+
+
+if __name__ == '__main__':
+    main()
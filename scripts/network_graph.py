@@ -0,0 +1,220 @@
+"""
+アーティストIDをキーにしたコラボレーショングラフ
+
+ノード・エッジを名前ではなくSpotifyのアーティストIDで識別する。
+アーティストIDは登場順に連番のインデックスに変換（インターン）し、
+名前は属性として保持する。エッジのキーは2つのインデックスを
+1つの整数にまとめたもの（pack_pair）。コラボレーションは1曲ごとに
+配列ベースのエッジストア（EdgeStore）にも追加し、出力時の次数・ソートは
+ペアごとにまとめた（coalesce）ストアで行う
+
+- 同名の別アーティストがまとめられない
+- マージ処理のハッシュ・比較が長い文字列のタプルではなく整数で済む
+- 出力（export）ではこれまでどおりノードのIDとエッジの両端に名前を使う
+  （フロントエンドとの互換性のため）。同名のアーティストがいる場合のみ
+  名前にアーティストIDを付けて区別する
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from edge_store import PAIR_SHIFT, EdgeStore
+
+# export() の出力でノードの属性ではないキー（識別子と、出力時に計算する値）
+DERIVED_NODE_KEYS = (
+    'id', 'name', 'spotify_id', 'degree', 'x', 'y',
+    'weighted_degree', 'pagerank', 'eigenvector', 'betweenness', 'community',
+)
+
+
+def pack_pair(a: int, b: int) -> int:
+    """2つのインデックスを順序によらない1つの整数キーにする"""
+    if a > b:
+        a, b = b, a
+    return (a << PAIR_SHIFT) | b
+
+
+class CollaborationGraph:
+    """
+    アーティストIDをインデックスに変換して保持するコラボレーショングラフ
+
+    artist_ids / names はインデックスで引く。ノードに含めるアーティストは
+    nodes（インデックス -> 追加の属性）に、エッジは edges（pack_pair のキー ->
+    {'source', 'target', 'weight', 'tracks'}、source/target はインデックス）に持つ。
+    collaborations はコラボレーション（重み1の楽曲、または復元したエッジ）を
+    追加順に並べたエッジストアで、ペアごとにまとめると edges の並び順・重みと一致する。
+    フィーチャリングアーティストをノードに含めない場合も、エッジの相手として
+    インデックスは割り当てる
+    """
+
+    def __init__(self):
+        self.artist_ids: List[str] = []
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.nodes: Dict[int, Dict[str, Any]] = {}
+        self.edges: Dict[int, Dict[str, Any]] = {}
+        self.collaborations = EdgeStore()
+
+    def intern(self, artist_id: str, name: str) -> int:
+        """アーティストIDのインデックスを返す（初めてのIDには新しいインデックスを割り当てる）"""
+        idx = self.index.get(artist_id)
+        if idx is None:
+            idx = len(self.artist_ids)
+            self.index[artist_id] = idx
+            self.artist_ids.append(artist_id)
+            self.names.append(name)
+        return idx
+
+    def add_node(self, artist_id: str, name: str, **attrs: Any) -> int:
+        """アーティストをノードに追加（既にある場合は属性のみ更新）"""
+        idx = self.intern(artist_id, name)
+        self.nodes.setdefault(idx, {}).update(attrs)
+        return idx
+
+    def add_track(self, source: int, target: int, track_info: Dict[str, Any]) -> int:
+        """
+        source と target のエッジに楽曲を1曲追加して重みを増やす
+
+        Returns:
+            エッジのキー
+        """
+        key = pack_pair(source, target)
+        edge = self.edges.get(key)
+        if edge is None:
+            edge = self.edges[key] = {'source': source, 'target': target, 'weight': 0, 'tracks': []}
+        edge['weight'] += 1
+        edge['tracks'].append(track_info)
+        self.collaborations.append(source, target)
+        return key
+
+    def _restore_edges(self, edges: Iterable[Dict[str, Any]]) -> None:
+        """
+        復元したエッジ（source/target はインデックス）でエッジのない状態から edges と
+        エッジストアを作る（同じペアが複数ある場合は最後のもの）
+        """
+        for edge in edges:
+            self.edges[pack_pair(edge['source'], edge['target'])] = edge
+        restored = list(self.edges.values())
+        self.collaborations = EdgeStore(len(restored))
+        self.collaborations.extend(
+            [edge['source'] for edge in restored],
+            [edge['target'] for edge in restored],
+            [edge['weight'] for edge in restored]
+        )
+
+    def edge_store(self) -> EdgeStore:
+        """エッジを配列ベースのストアにする（ペアごとにまとめたもの。順序は edges と同じ）"""
+        return self.collaborations.coalesce()
+
+    def degrees(self, store: Optional[EdgeStore] = None) -> np.ndarray:
+        """アーティストごとの次数（接続するエッジの重みの合計、インデックス順）"""
+        if store is None:
+            store = self.edge_store()
+        return store.weighted_degree(len(self.artist_ids))
+
+    def labels(self) -> List[str]:
+        """出力に使う名前（同名の別アーティストにはアーティストIDを付ける）"""
+        counts: Dict[str, int] = {}
+        for name in self.names:
+            counts[name] = counts.get(name, 0) + 1
+        return [
+            name if counts[name] == 1 else f"{name} [{artist_id}]"
+            for artist_id, name in zip(self.artist_ids, self.names)
+        ]
+
+    def export(self, description: str) -> Dict[str, Any]:
+        """
+        次数を計算し、ノード・エッジを名前で表したネットワークデータにまとめる
+
+        ノードは次数順、エッジは重み順（同じ値は追加順）
+        """
+        labels = self.labels()
+        store = self.edge_store()
+        degrees = self.degrees(store)
+
+        # ノードは次数順、エッジは重み順（いずれも安定ソートで同じ値は追加順）
+        node_indices = np.fromiter(self.nodes.keys(), dtype=np.int64, count=len(self.nodes))
+        node_order = node_indices[np.argsort(-degrees[node_indices], kind='stable')]
+        nodes = []
+        for idx in node_order.tolist():
+            node = {'id': labels[idx], 'name': self.names[idx], 'spotify_id': self.artist_ids[idx]}
+            node.update(self.nodes[idx])
+            node['degree'] = int(degrees[idx])
+            nodes.append(node)
+
+        edge_list = list(self.edges.values())
+        edges = []
+        for i in store.order_by_weight().tolist():
+            edge = edge_list[i]
+            edges.append(dict(edge, source=labels[edge['source']], target=labels[edge['target']]))
+
+        return {
+            'nodes': nodes,
+            'edges': edges,
+            'metadata': {
+                'total_nodes': len(nodes),
+                'total_edges': len(edges),
+                'total_collaborations': int(store.weights.sum()),
+                'description': description
+            }
+        }
+
+    def iter_edges(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """(source のアーティストID, target のアーティストID, エッジ) を返す"""
+        for edge in self.edges.values():
+            yield self.artist_ids[edge['source']], self.artist_ids[edge['target']], edge
+
+    def to_state(self) -> Dict[str, Any]:
+        """チェックポイントに保存する形式（アーティストIDで表す）"""
+        return {
+            'artists': [[artist_id, name] for artist_id, name in zip(self.artist_ids, self.names)],
+            'nodes': {self.artist_ids[idx]: attrs for idx, attrs in self.nodes.items()},
+            'edges': [
+                dict(edge, source=source, target=target)
+                for source, target, edge in self.iter_edges()
+            ],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'CollaborationGraph':
+        """to_state() の形式から復元"""
+        graph = cls()
+        for artist_id, name in state.get('artists', []):
+            graph.intern(artist_id, name)
+        for artist_id, attrs in state.get('nodes', {}).items():
+            graph.nodes[graph.index[artist_id]] = dict(attrs)
+        graph._restore_edges([
+            dict(edge, source=graph.index[edge['source']], target=graph.index[edge['target']])
+            for edge in state.get('edges', [])
+        ])
+        return graph
+
+    @classmethod
+    def from_network_data(cls, data: Dict[str, Any]) -> Optional['CollaborationGraph']:
+        """
+        export() で出力したネットワークデータから復元
+
+        ノードの spotify_id でアーティストを識別する。名前だけで出力された
+        以前の形式（spotify_id がない）の場合はNone。
+        ノードに含まれないアーティストとのエッジは復元できないため除く。
+        出力時に計算する値（次数・中心性・コミュニティ・レイアウトの座標）はノードの属性に含めない
+        """
+        nodes = data.get('nodes', [])
+        if any('spotify_id' not in node for node in nodes):
+            return None
+        graph = cls()
+        label_index: Dict[str, int] = {}
+        for node in nodes:
+            attrs = {k: v for k, v in node.items() if k not in DERIVED_NODE_KEYS}
+            idx = graph.add_node(node['spotify_id'], node['name'], **attrs)
+            label_index[node['id']] = idx
+        edges = []
+        for edge in data.get('edges', []):
+            source = label_index.get(edge['source'])
+            target = label_index.get(edge['target'])
+            if source is None or target is None:
+                continue
+            edges.append(dict(edge, source=source, target=target, tracks=list(edge.get('tracks', []))))
+        graph._restore_edges(edges)
+        return graph
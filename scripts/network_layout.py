@@ -0,0 +1,212 @@
+"""
+ネットワークのレイアウト（ノードの座標）を事前に計算する
+
+ブラウザで d3-force のシミュレーションを最初から実行する代わりに、
+データ生成時に力学モデルのレイアウトを numpy で計算し、各ノードに x / y を
+書き込む。フロントエンドはこの座標から描画を始め、短いシミュレーションで
+画面に合わせて整えるだけで済む
+
+- 力学モデルは Fruchterman-Reingold（引力 d²/k をエッジの重みで強め、斥力 k²/d）
+- 斥力は Barnes-Hut と同様に四分木（2^L × 2^L のグリッドを階層化したもの）で
+  近似する。各ノードは遠いセルとは重心だけで相互作用するため、1反復が O(N log N)
+- 乱数のシードを固定すれば同じ入力から同じ座標になる（差分の確認がしやすい）
+- 座標は原点中心、絶対値が LAYOUT_EXTENT 以下になるように縮尺を揃える
+
+使い方（既存のネットワークデータに座標を追加）:
+    python network_layout.py ../public/japanese_featuring_network.json
+    python network_layout.py in.json --output out.json --seed 7 --iterations 500
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from edge_store import EdgeStore
+from network_export import write_network_json
+
+DEFAULT_SEED = 42
+DEFAULT_ITERATIONS = 300
+LAYOUT_EXTENT = 1000.0  # 出力する座標の範囲（-LAYOUT_EXTENT 〜 LAYOUT_EXTENT）
+COORDINATE_DECIMALS = 1
+
+MAX_TREE_LEVEL = 8  # 最も細かいグリッドは 256 × 256
+GRAVITY = 1.0  # 孤立ノード・小さな連結成分が離れすぎないように中心へ引く強さ
+
+
+def _cell_sums(cells: np.ndarray, positions: np.ndarray, n_cells: int):
+    """セルごとのノード数と座標の合計"""
+    mass = np.bincount(cells, minlength=n_cells).astype(np.float64)
+    sum_x = np.bincount(cells, weights=positions[:, 0], minlength=n_cells)
+    sum_y = np.bincount(cells, weights=positions[:, 1], minlength=n_cells)
+    return mass, sum_x, sum_y
+
+
+def _repulsion(positions: np.ndarray, k: float) -> np.ndarray:
+    """
+    斥力（k² / d）を四分木で近似して計算
+
+    レベル L のグリッドで、ノードのセルの親に隣接するセルの子のうち、
+    ノードのセル自身に隣接しないもの（interaction list）とは重心で相互作用する。
+    最も細かいレベルでは隣接セル・同じセルとも重心で近似する（同じセルは自分を除く）
+    """
+    n = len(positions)
+    forces = np.zeros_like(positions)
+    lower = positions.min(axis=0)
+    size = max(float((positions.max(axis=0) - lower).max()), 1e-9) * (1 + 1e-9)
+    relative = (positions - lower) / size  # 0 〜 1 未満
+    k2 = k * k
+
+    def add_force(centers_x, centers_y, mass, mask):
+        dx = positions[:, 0] - centers_x
+        dy = positions[:, 1] - centers_y
+        dist2 = dx * dx + dy * dy
+        # 同じ位置の場合は力を加えない（初期配置はランダムなので実際にはほぼ起きない）
+        scale = np.where(mask & (dist2 > 0), mass * k2 / np.maximum(dist2, 1e-12), 0.0)
+        forces[:, 0] += dx * scale
+        forces[:, 1] += dy * scale
+
+    levels = min(MAX_TREE_LEVEL, max(2, int(np.ceil(np.log(max(n, 4)) / np.log(4))) + 1))
+    for level in range(2, levels + 1):
+        side = 1 << level
+        coords = np.minimum((relative * side).astype(np.int64), side - 1)
+        cx, cy = coords[:, 0], coords[:, 1]
+        mass, sum_x, sum_y = _cell_sums(cx * side + cy, positions, side * side)
+        parent_x, parent_y = cx >> 1, cy >> 1
+        for dx in range(-3, 4):
+            for dy in range(-3, 4):
+                tx, ty = cx + dx, cy + dy
+                valid = (tx >= 0) & (tx < side) & (ty >= 0) & (ty < side)
+                valid &= (np.abs((tx >> 1) - parent_x) <= 1) & (np.abs((ty >> 1) - parent_y) <= 1)
+                if max(abs(dx), abs(dy)) <= 1:
+                    if level < levels:
+                        continue  # 隣接セルは1つ細かいレベルで扱う
+                cell = np.where(valid, tx * side + ty, 0)
+                m = np.where(valid, mass[cell], 0.0)
+                sx, sy = sum_x[cell], sum_y[cell]
+                if dx == 0 and dy == 0:
+                    # 同じセルは自分を除いた重心
+                    m = m - 1
+                    sx = sx - positions[:, 0]
+                    sy = sy - positions[:, 1]
+                has_mass = valid & (m > 0)
+                safe = np.maximum(m, 1)
+                add_force(sx / safe, sy / safe, m, has_mass)
+    return forces
+
+
+def compute_layout(
+    n_nodes: int,
+    store: EdgeStore,
+    seed: int = DEFAULT_SEED,
+    iterations: int = DEFAULT_ITERATIONS,
+    initial: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    エッジストアのインデックス（0 〜 n_nodes-1）のノードの座標を計算
+
+    Args:
+        n_nodes: ノード数
+        store: エッジ（source / target はノードのインデックス、重みで引力を強める）
+        seed: 初期配置の乱数のシード
+        iterations: 反復回数
+        initial: 初期座標（n_nodes × 2）。省略時はシードから乱数で配置
+
+    Returns:
+        n_nodes × 2 の座標（原点中心、絶対値が LAYOUT_EXTENT 以下）
+    """
+    if n_nodes == 0:
+        return np.zeros((0, 2))
+    rng = np.random.default_rng(seed)
+    if initial is None:
+        positions = rng.uniform(-1.0, 1.0, size=(n_nodes, 2))
+    else:
+        # 同じ座標のノードがあると斥力が働かないため、わずかにずらす
+        positions = np.asarray(initial, dtype=np.float64) + rng.normal(scale=1e-6, size=(n_nodes, 2))
+    k = 1.0 / np.sqrt(n_nodes)  # 理想的なエッジの長さ（面積1あたり）
+    sources = store.sources.astype(np.int64)
+    targets = store.targets.astype(np.int64)
+    # 重みは対数で効かせる（コラボ数の多い一部のペアに引っ張られすぎないように）
+    weights = np.log1p(store.weights.astype(np.float64))
+
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    for _ in range(iterations):
+        forces = _repulsion(positions, k)
+
+        # 引力: d² / k（エッジの向きに沿って両端を近づける）
+        delta = positions[sources] - positions[targets]
+        dist = np.sqrt((delta * delta).sum(axis=1))
+        pull = delta * (weights * dist / k)[:, None]
+        for axis in (0, 1):
+            forces[:, axis] -= np.bincount(sources, weights=pull[:, axis], minlength=n_nodes)
+            forces[:, axis] += np.bincount(targets, weights=pull[:, axis], minlength=n_nodes)
+
+        # 中心への引力
+        forces -= positions * GRAVITY
+
+        # 温度で移動量を制限して更新
+        length = np.sqrt((forces * forces).sum(axis=1))
+        step = np.minimum(length, temperature) / np.maximum(length, 1e-12)
+        positions += forces * step[:, None]
+        temperature -= cooling
+
+    positions -= positions.mean(axis=0)
+    radius = np.abs(positions).max()
+    if radius > 0:
+        positions *= LAYOUT_EXTENT / radius
+    return positions
+
+
+def add_layout(
+    network_data: Dict[str, Any],
+    seed: int = DEFAULT_SEED,
+    iterations: int = DEFAULT_ITERATIONS
+) -> Dict[str, Any]:
+    """
+    ネットワークデータの各ノードに座標（x, y）を書き込む
+
+    ノードの id とエッジの source / target で対応をとる。
+    レイアウトのパラメータは metadata['layout'] に記録する
+
+    Returns:
+        network_data（同じオブジェクトを更新）
+    """
+    nodes = network_data.get('nodes', [])
+    store = EdgeStore.from_network_data(network_data)
+    positions = compute_layout(len(nodes), store, seed=seed, iterations=iterations)
+    for node, (x, y) in zip(nodes, positions.round(COORDINATE_DECIMALS).tolist()):
+        node['x'] = x
+        node['y'] = y
+    network_data.setdefault('metadata', {})['layout'] = {
+        'algorithm': 'fruchterman-reingold (barnes-hut)',
+        'seed': seed,
+        'iterations': iterations,
+        'extent': LAYOUT_EXTENT,
+    }
+    return network_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ネットワークデータにレイアウトの座標を追加')
+    parser.add_argument('input', help='ネットワークデータのJSONファイル')
+    parser.add_argument('--output', help='書き出すJSONファイル（省略時は入力を上書き）')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='乱数のシード')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='反復回数')
+    parser.add_argument('--compact', action='store_true', help='空白・改行なしで書き出す')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        network_data = json.load(f)
+    start = time.perf_counter()
+    add_layout(network_data, seed=args.seed, iterations=args.iterations)
+    elapsed = time.perf_counter() - start
+    output = args.output or args.input
+    write_network_json(output, network_data, compact=args.compact)
+    print(f"✓ {len(network_data['nodes'])} ノードのレイアウトを計算しました（{elapsed:.1f}秒）: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+ネットワークデータの後処理と書き出し
+
+取得（fetch_japanese_artists_from_charts.py）とシャードのマージ（crawl_shards.py）で
+同じ後処理を同じ順序・同じオプションで行う:
+
+1. ノイズノード・孤立ノードの除外（network_filter.py）
+2. 中心性（network_centrality.py）
+3. コミュニティ（network_community.py）
+4. レイアウトの座標（network_layout.py）
+5. 隣接インデックス（network_adjacency.py、ノード・エッジの並び順が確定してから）
+6. 書き出し（JSON、--columnar で列指向形式、段階的な詳細度のファイル）
+"""
+
+import argparse
+import time
+from typing import Any, Dict, List, Tuple
+
+from network_adjacency import add_adjacency
+from network_centrality import add_centrality
+from network_columnar import write_columnar
+from network_community import add_communities
+from network_export import COMPRESSIONS, write_network_json
+from network_filter import DEFAULT_FILTER_PATH, NoiseFilter, filter_network, report as report_noise_filter
+from network_layout import DEFAULT_SEED as LAYOUT_SEED, add_layout
+from network_tiers import DEFAULT_TIER_SIZES, write_tiers
+
+
+def add_pipeline_arguments(parser: argparse.ArgumentParser) -> None:
+    """後処理と書き出しのオプションを追加"""
+    parser.add_argument('--compact', action='store_true',
+                        help='ネットワークデータを空白・改行なしで書き出す（ファイルサイズを削減）')
+    parser.add_argument('--compress', action='append', choices=COMPRESSIONS,
+                        help='同じ内容の圧縮ファイル（.gz / .br）も書き出す（複数指定可）')
+    parser.add_argument('--columnar', action='store_true',
+                        help='フロントエンド向けの列指向バイナリ形式（.columnar.json / .columnar.bin）も書き出す')
+    parser.add_argument('--noise-filter', metavar='PATH', default=DEFAULT_FILTER_PATH,
+                        help='ノイズノードの除外ルールのJSONファイル（デフォルト: scripts/noise_filter.json）')
+    parser.add_argument('--no-noise-filter', action='store_true',
+                        help='ノイズノード・孤立ノードを除外せずに書き出す')
+    parser.add_argument('--no-centrality', action='store_true',
+                        help='中心性（PageRank・固有ベクトル・媒介中心性）を計算しない')
+    parser.add_argument('--no-communities', action='store_true',
+                        help='コミュニティ検出（Louvain法）を行わない')
+    parser.add_argument('--no-layout', action='store_true',
+                        help='ノードの座標（x, y）を事前に計算しない')
+    parser.add_argument('--layout-seed', type=int, default=LAYOUT_SEED,
+                        help=f'レイアウトの初期配置の乱数のシード（デフォルト: {LAYOUT_SEED}）')
+    parser.add_argument('--no-adjacency', action='store_true',
+                        help='ノードごとの隣接インデックス（adjacency）を出力に含めない')
+    parser.add_argument('--no-tiers', action='store_true',
+                        help=f'次数の上位ノードだけの段階的なファイル（{"/".join(map(str, DEFAULT_TIER_SIZES))}ノード）を書き出さない')
+
+
+def process_network(
+    network_data: Dict[str, Any],
+    output_file: str,
+    args: argparse.Namespace
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    add_pipeline_arguments() のオプションに従って後処理し、output_file に書き出す
+
+    Returns:
+        (書き出したネットワークデータ, 書き出したファイルのパス（先頭が output_file）)
+    """
+    # ノイズノードと、除外によって孤立したノードを除く（座標の計算・書き出しの前に）
+    if not args.no_noise_filter:
+        network_data = filter_network(network_data, NoiseFilter.load(args.noise_filter))
+        report_noise_filter(network_data)
+
+    # 中心性をノードに書き込む
+    if not args.no_centrality:
+        centrality_start = time.time()
+        add_centrality(network_data)
+        print(f"\n中心性を計算しました（{time.time() - centrality_start:.1f}秒）")
+
+    # コミュニティ番号をノードに、各コミュニティの概要を metadata に書き込む
+    if not args.no_communities:
+        community_start = time.time()
+        add_communities(network_data)
+        detection = network_data['metadata']['community_detection']
+        print(f"\n{len(network_data['metadata']['communities'])} コミュニティに分けました"
+              f"（モジュラリティ {detection['modularity']:.3f}、{time.time() - community_start:.1f}秒）")
+
+    # ノードの座標を事前に計算（ブラウザでは短いシミュレーションで整えるだけにする）
+    if not args.no_layout:
+        layout_start = time.time()
+        add_layout(network_data, seed=args.layout_seed)
+        print(f"\nレイアウトを計算しました（{time.time() - layout_start:.1f}秒、シード {args.layout_seed}）")
+
+    # 隣接インデックス（ノード・エッジの並び順が確定してから作る）
+    if not args.no_adjacency:
+        add_adjacency(network_data)
+
+    # 結果を保存（ノード・エッジを1件ずつ書き出す）
+    written_files = write_network_json(output_file, network_data, compact=args.compact, compress=args.compress or ())
+    if args.columnar:
+        written_files += write_columnar(output_file, network_data, compress=args.compress or ())
+    if not args.no_tiers:
+        written_files += write_tiers(output_file, network_data, compact=args.compact, compress=args.compress or ())
+    return network_data, written_files
@@ -0,0 +1,233 @@
+"""
+ネットワークの段階的な詳細度（LOD）のファイル
+
+フロントエンドが最初に小さなネットワークを読み込んで描画し、大きなものを
+順に取得できるように、次数（接続するエッジの重みの合計）の大きいノードから
+選んだネットワークを段階ごとに別ファイルで書き出し、マニフェストにまとめる。
+最後の段階（all）は全体のネットワークJSONそのもの
+
+ファイル:
+    <name>.tiers.json       マニフェスト（各段階のファイル・ノード数・エッジ数）
+    <name>.tier100.json     100ノード
+    <name>.tier500.json     500ノード
+    <name>.json             全体（all）
+
+各段階のノードは次数の大きい順に選ぶが、既に選んだノードとつながらないノードは
+最も強いエッジの相手と一緒に加える（次数だけで選ぶと相手が段階に入らず、
+最初の描画で孤立したノードが並ぶため）。
+
+各段階のエッジは、含まれるノード同士のエッジのうち重み（同じ重みは両端の次数の
+合計）の大きい順に「ノード数 × TIER_EDGES_PER_NODE」本まで。ただし、各ノードの
+最も強いエッジは必ず残す。ファイルを小さくするため、エッジの楽曲（tracks）と
+全体の metadata の集計以外の項目（コミュニティ・中心性の設定など）は含めない。
+ノードの属性（次数・座標など）は全体のネットワークと同じ値のまま
+
+使い方（既存のネットワークデータから書き出す）:
+    python network_tiers.py ../public/japanese_featuring_network.json
+    python network_tiers.py ../public/japanese_featuring_network.json --sizes 200 1000
+"""
+
+import argparse
+import json
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from network_adjacency import add_adjacency
+from network_export import write_network_json
+
+TIERS_FORMAT = 'audiograph-network-tiers'
+TIERS_VERSION = 1
+DEFAULT_TIER_SIZES = (100, 500)
+TIER_EDGES_PER_NODE = 5
+# 段階のファイルに残す metadata の項目（集計値は段階ごとに数え直す）
+TIER_METADATA_KEYS = ('description',)
+
+
+def _base_path(json_path: str) -> str:
+    return json_path[:-len('.json')] if json_path.endswith('.json') else json_path
+
+
+def tiers_manifest_path(json_path: str) -> str:
+    """ネットワークJSONのパスから段階のマニフェストのパスを作る"""
+    return _base_path(json_path) + '.tiers.json'
+
+
+def tier_path(json_path: str, size: int) -> str:
+    """上位 size ノードの段階のファイルのパス"""
+    return _base_path(json_path) + f'.tier{size}.json'
+
+
+def select_tier_nodes(network_data: Dict[str, Any], size: int) -> np.ndarray:
+    """
+    段階に含めるノードのインデックス（元の並び順）
+
+    次数の大きい順（同じ次数は元の順）にノードを見て、既に選んだノードと
+    エッジでつながっていればそのまま加え、つながっていなければ最も強いエッジの
+    相手と一緒に加える。エッジのないノードと、残り1ノードでつながらないノードは
+    加えない（段階の中で孤立するノードを作らない）
+    """
+    nodes = network_data.get('nodes', [])
+    index = {node['id']: i for i, node in enumerate(nodes)}
+    # ノードごとの (重み, 相手の次数, 相手) の最大（最も強いエッジの相手）と隣接ノード
+    degrees = [node.get('degree', 0) for node in nodes]
+    neighbors: List[List[int]] = [[] for _ in nodes]
+    strongest: List[Any] = [None] * len(nodes)
+    for edge in network_data.get('edges', []):
+        source, target = index.get(edge['source']), index.get(edge['target'])
+        if source is None or target is None or source == target:
+            continue
+        weight = edge.get('weight', 1)
+        for node, other in ((source, target), (target, source)):
+            neighbors[node].append(other)
+            key = (weight, degrees[other], -other)
+            if strongest[node] is None or key > strongest[node]:
+                strongest[node] = key
+
+    selected = np.zeros(len(nodes), dtype=bool)
+    count = 0
+    for node in sorted(range(len(nodes)), key=lambda i: (-degrees[i], i)):
+        if count >= size:
+            break
+        if selected[node] or strongest[node] is None:
+            continue
+        if any(selected[neighbor] for neighbor in neighbors[node]):
+            selected[node] = True
+            count += 1
+            continue
+        partner = -strongest[node][2]
+        if size - count < 2:
+            continue
+        selected[node] = selected[partner] = True
+        count += 2
+    return np.flatnonzero(selected)
+
+
+def build_tier(network_data: Dict[str, Any], size: int, edges_per_node: int = TIER_EDGES_PER_NODE) -> Dict[str, Any]:
+    """
+    size ノードのネットワークデータを作る（ノードの選び方は select_tier_nodes）
+
+    ノード・エッジの並び順（次数順・重み順）は元のネットワークのまま。
+    エッジの楽曲（tracks）は含めない
+    """
+    nodes = network_data.get('nodes', [])
+    edges = network_data.get('edges', [])
+    degrees = np.array([node.get('degree', 0) for node in nodes], dtype=np.int64)
+    kept = select_tier_nodes(network_data, size)
+    rank = {nodes[i]['id']: pos for pos, i in enumerate(kept.tolist())}
+
+    # 含まれるノード同士のエッジ
+    candidates = [i for i, edge in enumerate(edges) if edge['source'] in rank and edge['target'] in rank]
+    sources = np.array([rank[edges[i]['source']] for i in candidates], dtype=np.int64)
+    targets = np.array([rank[edges[i]['target']] for i in candidates], dtype=np.int64)
+    weights = np.array([edges[i].get('weight', 1) for i in candidates], dtype=np.int64)
+    kept_degrees = degrees[kept]
+    # 重みの大きい順、同じ重みは両端の次数の合計の大きい順
+    strength = kept_degrees[sources] + kept_degrees[targets]
+    order = np.lexsort((-strength, -weights))
+
+    selected = np.zeros(len(candidates), dtype=bool)
+    # 各ノードの最も強いエッジ
+    endpoints = np.concatenate([sources[order], targets[order]])
+    positions = np.concatenate([order, order])
+    _, first = np.unique(endpoints, return_index=True)
+    selected[positions[first]] = True
+    # 残りは強い順に上限まで
+    remaining = max(len(kept) * edges_per_node - int(selected.sum()), 0)
+    selected[order[~selected[order]][:remaining]] = True
+
+    tier_edges = [
+        {key: value for key, value in edges[candidates[i]].items() if key != 'tracks'}
+        for i in np.flatnonzero(selected).tolist()
+    ]
+    tier_nodes = [nodes[i] for i in kept.tolist()]
+    metadata = {
+        'total_nodes': len(tier_nodes),
+        'total_edges': len(tier_edges),
+        'total_collaborations': int(sum(edge.get('weight', 1) for edge in tier_edges)),
+    }
+    source_metadata = network_data.get('metadata', {})
+    metadata.update({key: source_metadata[key] for key in TIER_METADATA_KEYS if key in source_metadata})
+    tier = {'nodes': tier_nodes, 'edges': tier_edges, 'metadata': metadata}
+    if 'adjacency' in network_data:
+        # インデックスは段階のノード・エッジの並び順で作り直す
+        add_adjacency(tier)
+    return tier
+
+
+def _tier_entry(name: str, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    nodes, edges = data.get('nodes', []), data.get('edges', [])
+    return {
+        'name': name,
+        'path': os.path.basename(path),
+        'nodes': len(nodes),
+        'edges': len(edges),
+        'min_degree': min((node.get('degree', 0) for node in nodes), default=0),
+        'min_weight': min((edge.get('weight', 1) for edge in edges), default=0),
+    }
+
+
+def write_tiers(
+    json_path: str,
+    network_data: Dict[str, Any],
+    sizes: Sequence[int] = DEFAULT_TIER_SIZES,
+    compact: bool = False,
+    compress: Sequence[str] = ()
+) -> List[str]:
+    """
+    上位ノードの段階のファイルとマニフェストを書き出す
+
+    全体のネットワークJSON（json_path）は別に書き出しておく。ノード数が
+    全体以上になる段階は書き出さない（all と同じになるため）
+
+    Returns:
+        書き出したファイルのパス（圧縮ファイルを含む、マニフェストは最後）
+    """
+    total = len(network_data.get('nodes', []))
+    written: List[str] = []
+    tiers = []
+    for size in sorted(set(sizes)):
+        if size <= 0 or size >= total:
+            continue
+        path = tier_path(json_path, size)
+        data = build_tier(network_data, size)
+        written += write_network_json(path, data, compact=compact, compress=compress)
+        tiers.append(_tier_entry(f'top-{size}', path, data))
+    tiers.append(_tier_entry('all', json_path, network_data))
+
+    manifest = {
+        'format': TIERS_FORMAT,
+        'version': TIERS_VERSION,
+        'tiers': tiers,
+        'metadata': {
+            key: value for key, value in network_data.get('metadata', {}).items()
+            if key in ('total_nodes', 'total_edges', 'total_collaborations') + TIER_METADATA_KEYS
+        },
+    }
+    # マニフェストは最後に置き換える（読み込み側が古い段階のファイルを参照しないように）
+    manifest_path = tiers_manifest_path(json_path)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+    written.append(manifest_path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ネットワークデータから段階的な詳細度のファイルを書き出す')
+    parser.add_argument('input', help='ネットワークデータのJSONファイル')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_TIER_SIZES),
+                        help=f'各段階のノード数（デフォルト: {" ".join(map(str, DEFAULT_TIER_SIZES))}）')
+    parser.add_argument('--compact', action='store_true', help='空白・改行なしで書き出す')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        network_data = json.load(f)
+    for path in write_tiers(args.input, network_data, sizes=args.sizes, compact=args.compact):
+        print(f"  {path} ({os.path.getsize(path) / 1024:.0f}KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+記録したリクエストからネットワーク構築を再実行する
+
+fetch_japanese_artists_from_charts.py --record で保存したアーカイブだけを使い、
+ネットワークにアクセスせずにシードアーティストの収集と build_network_data を
+再実行する。パラメータを変えた結果の比較や、グラフ構築のCPU処理の
+プロファイルに使う
+
+使い方:
+    python fetch_japanese_artists_from_charts.py --record crawl.jsonl.gz   # 記録
+    python replay_network_build.py crawl.jsonl.gz --max-artists 300
+    python replay_network_build.py crawl.jsonl.gz --no-featured-artists --output out.json
+    python replay_network_build.py crawl.jsonl.gz --profile
+
+シードアーティスト数・処理するアーティスト数・楽曲数・同時取得数は、指定しなければ
+アーカイブのヘッダーに保存された記録時の値を使う（古いアーカイブでは下の RECORDING_DEFAULTS）。
+並列取得では取得済みデータを再利用できるかがタイミングで変わり、記録されるリクエストも
+変わるため、同時取得数を記録時と変えると一部のリクエストが「記録なし」になる
+
+記録時より多くの楽曲・アルバムが必要になるパラメータ（min_tracks_per_artist を
+増やすなど）では、記録されていないリクエストが「記録なし」として集計され、
+そのアーティストの結果は欠ける
+"""
+
+import argparse
+import cProfile
+import contextlib
+import io
+import os
+import pstats
+import tempfile
+import time
+
+# 再生ではAPIにアクセスしないため、未設定ならダミーの認証情報で読み込む
+os.environ.setdefault('SPOTIFY_CLIENT_ID', 'replay')
+os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'replay')
+os.environ.setdefault('SPOTIFY_CACHE_PATH', os.path.join(tempfile.mkdtemp(prefix='spotify_replay_'), 'cache.sqlite3'))
+
+import fetch_japanese_artists_from_charts as crawler  # noqa: E402
+from network_export import write_network_json  # noqa: E402
+from spotify_fixtures import FixtureArchive, ReplaySpotify  # noqa: E402
+
+# ヘッダーに記録時のパラメータがないアーカイブで使う値
+RECORDING_DEFAULTS = {
+    'target_artist_count': 700,
+    'max_artists': 700,
+    'min_tracks_per_artist': 100,
+    'concurrency': 1,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='記録したリクエストからネットワーク構築を再実行')
+    parser.add_argument('archive', help='--record で保存したアーカイブ（.jsonl.gz）')
+    parser.add_argument('--target-artists', type=int,
+                        help='シードアーティストの目標数（デフォルト: 記録時の値。記録時と同じ値にする）')
+    parser.add_argument('--max-artists', type=int, help='処理する最大アーティスト数（デフォルト: 記録時の値）')
+    parser.add_argument('--min-tracks', type=int, help='各アーティストから取得する楽曲数（デフォルト: 記録時の値）')
+    parser.add_argument('--no-featured-artists', action='store_true',
+                        help='フィーチャリングアーティストをノードに追加しない')
+    parser.add_argument('--concurrency', type=int,
+                        help='同時に楽曲を取得するアーティスト数（デフォルト: 記録時の値）')
+    parser.add_argument('--profile', action='store_true', help='build_network_data をcProfileで計測')
+    parser.add_argument('--verbose', action='store_true', help='取得処理の出力を表示')
+    parser.add_argument('--output', help='ネットワークデータを書き出すJSONファイル')
+    parser.add_argument('--compact', action='store_true', help='空白・改行なしで書き出す')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    archive = FixtureArchive(args.archive).load()
+    replay = ReplaySpotify(archive)
+    crawler.sp = replay
+    print(f"アーカイブを読み込みました: {args.archive} ({time.perf_counter() - start:.2f}秒)")
+
+    # 指定されなかったパラメータは記録時の値にする
+    recorded = dict(RECORDING_DEFAULTS, **archive.params)
+    for option, key in (('target_artists', 'target_artist_count'), ('max_artists', 'max_artists'),
+                        ('min_tracks', 'min_tracks_per_artist'), ('concurrency', 'concurrency')):
+        if getattr(args, option) is None:
+            setattr(args, option, recorded[key])
+    print(f"  シードアーティスト目標: {args.target_artists}, 最大アーティスト数: {args.max_artists}, "
+          f"楽曲数: {args.min_tracks}, 同時取得数: {args.concurrency}")
+
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output:
+        artists = crawler.collect_seed_artists(args.target_artists)
+    print(f"シードアーティスト: {len(artists)} ({time.perf_counter() - start:.2f}秒)")
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    with output:
+        if profiler is not None:
+            profiler.enable()
+        network_data = crawler.build_network_data(
+            artists,
+            max_artists=args.max_artists,
+            include_featured_artists=not args.no_featured_artists,
+            min_tracks_per_artist=args.min_tracks,
+            concurrency=args.concurrency
+        )
+        if profiler is not None:
+            profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    metadata = network_data['metadata']
+    print(f"build_network_data: {elapsed:.2f}秒 "
+          f"(ノード: {metadata['total_nodes']}, エッジ: {metadata['total_edges']})")
+    replay.fixture_report()
+
+    if profiler is not None:
+        print()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+
+    if args.output:
+        write_network_json(args.output, network_data, compact=args.compact)
+        print(f"\nネットワークデータを保存しました: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Spotify APIレスポンスのディスクキャッシュ
+
+モジュールレベルの sp クライアントを CachedSpotify でラップすると、
+エンドポイント名とパラメータのハッシュをキーとしてレスポンスを
+SQLiteに保存し、次回以降の実行ではネットワークにアクセスせずに返す。
+
+- エンドポイントごとのTTL（チャートや新譜は短く、アルバム収録曲は長く）
+- 合計サイズの上限を超えると最終アクセスが古い順に削除（LRU）
+- ヒット/ミス数をエンドポイントごとに集計
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+# デフォルトのキャッシュファイル（プロジェクトルートからの相対パス）
+DEFAULT_CACHE_PATH = '.spotify_cache/responses.sqlite3'
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# エンドポイントごとのTTL（秒）
+# ここに含まれないメソッドはキャッシュせずにそのまま呼び出す
+DEFAULT_TTLS: Dict[str, float] = {
+    'artist': 7 * DAY,
+    'artists': 7 * DAY,
+    'artist_albums': 1 * DAY,  # 新譜で変わる
+    'album_tracks': 30 * DAY,  # 収録曲はほぼ変わらない
+    'albums': 30 * DAY,
+    'tracks': 7 * DAY,  # popularityは変動する
+    'search': 1 * DAY,
+    'new_releases': 6 * HOUR,
+    'playlist': 6 * HOUR,
+    'playlist_tracks': 6 * HOUR,
+}
+
+
+class ResponseCache:
+    """
+    SQLiteベースのレスポンスキャッシュ
+
+    レスポンスはzlib圧縮したJSONとして保存する。
+    合計サイズが max_bytes を超えた場合、最終アクセスが古いものから
+    max_bytes の90%以下になるまで削除する
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' endpoint TEXT NOT NULL,'
+            ' created REAL NOT NULL,'
+            ' accessed REAL NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' body BLOB NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        row = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()
+        self.total_bytes = row[0]
+
+    @staticmethod
+    def make_key(endpoint: str, args: tuple, kwargs: dict) -> str:
+        """エンドポイント名とパラメータからキャッシュキーを作成"""
+        payload = json.dumps([endpoint, list(args), kwargs], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, ttl: float) -> Optional[Any]:
+        """TTL内のレスポンスを返す（なければNone）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT created, body FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[0] > ttl:
+                return None
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+        return json.loads(zlib.decompress(row[1]))
+
+    def put(self, key: str, endpoint: str, value: Any) -> None:
+        """レスポンスを保存し、必要に応じて古いエントリを削除"""
+        body = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.total_bytes -= row[0]
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, created, accessed, size, body) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, now, now, len(body), body)
+            )
+            self.total_bytes += len(body)
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target_bytes: int) -> None:
+        """最終アクセスが古い順に target_bytes 以下になるまで削除（ロック取得済みで呼ぶ）"""
+        rows = self._conn.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        evicted = []
+        for key, size in rows:
+            if self.total_bytes <= target_bytes:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedSpotify:
+    """
+    spotipy.Spotify をラップし、TTL対象のメソッド呼び出しをキャッシュする
+
+    TTLが設定されていない属性はそのまま元のクライアントに委譲する
+    """
+
+    def __init__(self, client, cache: Optional[ResponseCache] = None, ttls: Optional[Dict[str, float]] = None):
+        self._client = client
+        self._cache = cache if cache is not None else ResponseCache()
+        self._ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self._counter_lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name not in self._ttls or not callable(attr):
+            return attr
+
+        ttl = self._ttls[name]
+
+        def cached_call(*args, **kwargs):
+            key = ResponseCache.make_key(name, args, kwargs)
+            value = self._cache.get(key, ttl)
+            if value is not None:
+                with self._counter_lock:
+                    self.hits[name] += 1
+                return value
+            with self._counter_lock:
+                self.misses[name] += 1
+            value = attr(*args, **kwargs)
+            if value is not None:
+                self._cache.put(key, name, value)
+            return value
+
+        return cached_call
+
+    def cache_report(self) -> None:
+        """エンドポイントごとのヒット/ミス数を表示"""
+        total_hits = sum(self.hits.values())
+        total_misses = sum(self.misses.values())
+        total = total_hits + total_misses
+        hit_rate = (total_hits / total * 100) if total else 0.0
+        print(f"\n  APIキャッシュ ({self._cache.path}):")
+        print(f"    ヒット: {total_hits} / ミス: {total_misses} (ヒット率 {hit_rate:.1f}%)")
+        for endpoint in sorted(set(self.hits) | set(self.misses)):
+            print(f"    {endpoint}: ヒット {self.hits[endpoint]} / ミス {self.misses[endpoint]}")
+        print(f"    キャッシュサイズ: {self._cache.total_bytes / (1024 * 1024):.1f}MB "
+              f"(上限 {self._cache.max_bytes / (1024 * 1024):.0f}MB)")
@@ -0,0 +1,252 @@
+"""
+Spotify APIリクエストの記録と再生
+
+記録モードでは、取得スクリプトが呼び出したAPIのリクエストとレスポンスを
+（キャッシュから返したものも含めて）gzip圧縮したJSON Linesのアーカイブに保存する。
+再生モードではアーカイブだけからレスポンスを返し、ネットワークには一切アクセスしない。
+
+同じ取得結果に対して build_network_data のパラメータ（max_artists など）を
+変えて数秒で再実行したり、ネットワークの待ち時間を除いてグラフ構築の
+CPU処理だけをプロファイルしたりするためのもの
+
+- キーはエンドポイント名とパラメータのハッシュ（ResponseCache と同じ）
+- 複数IDをまとめて取得するエンドポイント（tracks, albums, artists）はID単位で記録し、
+  再生時は要求されたIDから組み立てる（並列取得や取得済みデータの再利用で
+  バッチの組み合わせが実行ごとに変わっても再生できる）
+- 記録時に発生した SpotifyException（404など）も記録し、再生時に同じ例外を送出
+- 再生時にアーカイブにないリクエストは SpotifyException(404) としてミスを集計
+- ヘッダーに記録時のパラメータ（同時取得数など）を保存する。並列取得では
+  取得済みデータを再利用できるかがタイミングで変わり、記録されるリクエストも
+  変わるため、再生は記録時と同じパラメータで行う（replay_network_build.py のデフォルト）
+"""
+
+import gzip
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from spotipy.exceptions import SpotifyException
+
+from spotify_cache import ResponseCache
+
+ARCHIVE_VERSION = 1
+
+# 記録・再生するAPIメソッド
+SPOTIFY_ENDPOINTS = (
+    'artist',
+    'artists',
+    'artist_albums',
+    'album_tracks',
+    'albums',
+    'tracks',
+    'search',
+    'new_releases',
+    'playlist',
+    'playlist_tracks',
+)
+
+# ID単位で記録するエンドポイント（レスポンスの要素のキーはエンドポイント名と同じ）
+BATCH_ENDPOINTS = ('tracks', 'albums', 'artists')
+
+
+def _item_key(endpoint: str, item_id: str, kwargs: dict) -> str:
+    """バッチエンドポイントの1要素分のキー"""
+    return ResponseCache.make_key(endpoint + ':item', (item_id,), kwargs)
+
+
+def _is_batch_call(endpoint: str, args: tuple) -> bool:
+    return endpoint in BATCH_ENDPOINTS and bool(args) and isinstance(args[0], (list, tuple))
+
+
+class FixtureArchive:
+    """
+    リクエストとレスポンスを保存するアーカイブ（gzip圧縮のJSON Lines）
+
+    1行目はヘッダー（"version", "created", 記録時のパラメータ "params"）、
+    2行目以降が1リクエスト分の記録:
+        {"k": キー, "e": エンドポイント, "a": 引数, "kw": キーワード引数, "r": レスポンス}
+    例外の場合は "r" の代わりに "x": {"status", "code", "msg"} を持つ。
+    同じキーは最初の1回だけ保存する
+
+    Args:
+        path: アーカイブファイルのパス（.jsonl.gz）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header: Dict[str, Any] = {}
+        self.records: Dict[str, str] = {}  # 読み込んだ記録（キー -> JSON行）
+        self._written: Set[str] = set()  # 記録済みのキー
+        self._lock = threading.Lock()
+        self._file = None
+
+    def open_for_write(self, params: Optional[Dict[str, Any]] = None) -> 'FixtureArchive':
+        """
+        記録を開始（既存のファイルは上書き）
+
+        Args:
+            params: ヘッダーに保存する記録時のパラメータ（再生時のデフォルトに使う）
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self.header = {'version': ARCHIVE_VERSION, 'created': datetime.now().isoformat(), 'params': params or {}}
+        self._file.write(json.dumps(self.header) + '\n')
+        return self
+
+    def load(self) -> 'FixtureArchive':
+        """
+        アーカイブを読み込む
+
+        記録中に中断されたファイル（末尾が欠けたgzip）は読めたところまで使う
+        """
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            try:
+                self.header = header = json.loads(f.readline())
+                if header.get('version') != ARCHIVE_VERSION:
+                    raise ValueError(f"アーカイブの形式が異なります ({self.path})")
+                for line in f:
+                    if not line.endswith('\n'):
+                        break
+                    key = json.loads(line)['k']
+                    self.records.setdefault(key, line)
+            except (EOFError, gzip.BadGzipFile):
+                print(f"  警告: アーカイブの末尾が壊れています。読み込めた {len(self.records)} 件を使います")
+        return self
+
+    def add(self, key: str, endpoint: str, args: tuple, kwargs: dict, **result: Any) -> None:
+        """1リクエスト分を記録（result は r=レスポンス または x=例外）"""
+        record = dict({'k': key, 'e': endpoint, 'a': list(args), 'kw': kwargs}, **result)
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+        with self._lock:
+            if key in self._written:
+                return
+            self._written.add(key)
+            if self._file is not None:
+                self._file.write(line)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        """記録時のパラメータ（パラメータを保存していない古いアーカイブでは空）"""
+        return self.header.get('params') or {}
+
+    def get(self, key: str) -> Optional[Dict]:
+        """記録を返す（呼び出しごとに新しいオブジェクト）"""
+        line = self.records.get(key)
+        return json.loads(line) if line else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self) -> int:
+        return len(self.records) + len(self._written)
+
+
+class RecordingSpotify:
+    """
+    クライアントをラップし、SPOTIFY_ENDPOINTS の呼び出しをアーカイブに記録する
+
+    キャッシュ（CachedSpotify）の外側に置くと、キャッシュから返した
+    レスポンスも記録されるため、再生時に取得処理全体を再現できる
+    """
+
+    def __init__(self, client, archive: FixtureArchive):
+        self._client = client
+        self._archive = archive
+        self.recorded: Dict[str, int] = defaultdict(int)
+        self._counter_lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name not in SPOTIFY_ENDPOINTS or not callable(attr):
+            return attr
+
+        def recording_call(*args, **kwargs):
+            key = ResponseCache.make_key(name, args, kwargs)
+            try:
+                value = attr(*args, **kwargs)
+            except SpotifyException as e:
+                self._archive.add(key, name, args, kwargs, x={'status': e.http_status, 'code': e.code, 'msg': e.msg})
+                raise
+            if _is_batch_call(name, args) and isinstance(value, dict):
+                for item_id, item in zip(args[0], value.get(name) or []):
+                    self._archive.add(_item_key(name, item_id, kwargs), name, (item_id,), kwargs, r=item)
+            else:
+                self._archive.add(key, name, args, kwargs, r=value)
+            with self._counter_lock:
+                self.recorded[name] += 1
+            return value
+
+        return recording_call
+
+    def fixture_report(self) -> None:
+        print(f"\n  リクエストの記録 ({self._archive.path}):")
+        print(f"    記録したリクエスト: {len(self._archive)} 件")
+        for endpoint in sorted(self.recorded):
+            print(f"    {endpoint}: {self.recorded[endpoint]}")
+
+
+class ReplaySpotify:
+    """
+    アーカイブだけからレスポンスを返す spotipy.Spotify の代替
+
+    ネットワークにはアクセスしない。記録されていないリクエストは
+    SpotifyException(404) を送出し、ミスとして集計する
+    """
+
+    def __init__(self, archive: FixtureArchive):
+        self._archive = archive
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self._counter_lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        if name not in SPOTIFY_ENDPOINTS:
+            raise AttributeError(name)
+
+        def replay_call(*args, **kwargs):
+            record = self._archive.get(ResponseCache.make_key(name, args, kwargs))
+            if record is None and _is_batch_call(name, args):
+                return replay_batch(args[0], kwargs)
+            with self._counter_lock:
+                if record is None:
+                    self.misses[name] += 1
+                else:
+                    self.hits[name] += 1
+            if record is None:
+                raise SpotifyException(404, -1, f"replay: {name} は記録されていません")
+            if 'x' in record:
+                error = record['x']
+                raise SpotifyException(error['status'], error['code'], error['msg'])
+            return record['r']
+
+        def replay_batch(item_ids, kwargs):
+            # 記録されていないIDは、存在しないIDと同様に None を返す
+            items = []
+            for item_id in item_ids:
+                record = self._archive.get(_item_key(name, item_id, kwargs))
+                with self._counter_lock:
+                    if record is None:
+                        self.misses[name] += 1
+                    else:
+                        self.hits[name] += 1
+                items.append(record['r'] if record is not None else None)
+            return {name: items}
+
+        return replay_call
+
+    def fixture_report(self) -> None:
+        total_hits = sum(self.hits.values())
+        total_misses = sum(self.misses.values())
+        print(f"\n  記録からの再生 ({self._archive.path}):")
+        print(f"    再生: {total_hits} / 記録なし: {total_misses} "
+              f"({', '.join(BATCH_ENDPOINTS)} はID単位)")
+        for endpoint in sorted(set(self.hits) | set(self.misses)):
+            print(f"    {endpoint}: 再生 {self.hits[endpoint]} / 記録なし {self.misses[endpoint]}")
@@ -0,0 +1,422 @@
+"""
+アーティストの楽曲をまとめて取得するためのヘルパー
+
+get_artist_tracks から利用される共通処理:
+- ディスコグラフィー（artist_albums）をページングし、アーティストごとの
+  リクエスト予算の範囲でコラボが含まれやすいアルバムから取得
+- アルバムは Get Several Albums エンドポイントで20件ずつまとめて展開
+- sp.tracks による詳細取得（popularity）はコラボ曲のみに限定
+- 従来方式（アルバムごとに album_tracks + 全曲 sp.tracks）と比較した
+  削減リクエスト数を集計
+- 展開済みのアルバムの収録曲と取得済みの楽曲詳細を実行全体で共有し、
+  別のアーティスト経由で同じアルバム・楽曲を再取得しない（HarvestRegistry）
+- 楽曲IDをキーに反映済みのアーティストペアを記録し、同じ楽曲を同じペアに
+  二重に数えない（index_edge_tracks）
+- 複数アーティストの楽曲を並列に取得し、入力順に結果を返すスレッドプール
+"""
+
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from spotipy.exceptions import SpotifyException
+
+# Spotify APIのバッチ上限
+ALBUMS_BATCH_SIZE = 20  # GET /albums の最大ID数
+TRACKS_BATCH_SIZE = 50  # GET /tracks の最大ID数
+ARTIST_ALBUMS_PAGE_SIZE = 50  # GET /artists/{id}/albums の最大件数
+
+# ディスコグラフィーを取得する順序（コラボが含まれやすい順）
+# シングルはフィーチャリングが多く、appears_on は他のアーティストの作品への参加
+DISCOGRAPHY_GROUPS = ('single', 'appears_on', 'album')
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class HarvestStats:
+    """
+    楽曲取得のリクエスト数を集計する
+
+    legacy_requests は従来方式で同じ楽曲を取得した場合に必要だった
+    リクエスト数の見積もり
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.artists = 0
+        self.album_requests = 0
+        self.track_requests = 0
+        self.legacy_requests = 0
+        self.tracks_harvested = 0
+        self.tracks_detailed = 0
+        self.tracks_reused = 0
+        self.albums_reused = 0
+        self.album_requests_avoided = 0
+        self.discography_requests = 0
+        self.albums_listed = 0
+        self.albums_over_budget = 0
+
+    @property
+    def requests(self) -> int:
+        return self.album_requests + self.track_requests
+
+    @property
+    def crawl_requests(self) -> int:
+        """ディスコグラフィー取得を含む楽曲取得の全リクエスト数（取得全体の予算に使う）"""
+        return self.discography_requests + self.album_requests + self.track_requests
+
+    @property
+    def requests_saved(self) -> int:
+        return max(self.legacy_requests - self.requests, 0)
+
+    def record(self, **counts: int) -> None:
+        """カウンタを加算（並列取得時も安全）"""
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def report(self) -> None:
+        """集計結果を表示"""
+        print(f"\n  楽曲取得リクエスト:")
+        print(f"    対象アーティスト: {self.artists}")
+        print(f"    ディスコグラフィー取得: {self.discography_requests} リクエスト "
+              f"({self.albums_listed} アルバム)")
+        print(f"    アルバム取得 (20件/バッチ): {self.album_requests} リクエスト")
+        print(f"    展開済みのアルバムを再利用: {self.albums_reused} 件 "
+              f"(省略したアルバム取得: {self.album_requests_avoided} リクエスト)")
+        print(f"    リクエスト予算の上限で展開しなかったアルバム: {self.albums_over_budget} 件")
+        print(f"    楽曲詳細取得 (コラボ曲のみ): {self.track_requests} リクエスト "
+              f"({self.tracks_detailed}/{self.tracks_harvested} 曲)")
+        print(f"    取得済みの楽曲詳細を再利用: {self.tracks_reused} 曲")
+        print(f"    従来方式の見積もり: {self.legacy_requests} リクエスト")
+        print(f"    削減リクエスト数: {self.requests_saved}")
+
+
+class HarvestRegistry:
+    """
+    実行全体で共有する取得済みデータの索引
+
+    コンピレーションやスプリットシングル、コラボ曲は参加アーティストそれぞれの
+    ディスコグラフィーに現れるため、アルバムIDをキーに収録曲を、楽曲IDをキーに
+    詳細情報を保持し、2回目以降は sp.albums / sp.tracks を呼ばずに再利用する
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.albums: Dict[str, List[Dict]] = {}
+        self.tracks: Dict[str, Dict] = {}
+
+    def get_album(self, album_id: str) -> Optional[List[Dict]]:
+        """展開済みのアルバムの収録曲を返す（未展開ならNone）"""
+        with self._lock:
+            return self.albums.get(album_id)
+
+    def add_album(self, album_id: str, tracks: List[Dict]) -> None:
+        """アルバムの収録曲を登録"""
+        with self._lock:
+            self.albums[album_id] = tracks
+
+    def get_tracks(self, track_ids: List[str]) -> Dict[str, Dict]:
+        """取得済みの楽曲詳細を返す"""
+        with self._lock:
+            return {track_id: self.tracks[track_id] for track_id in track_ids if track_id in self.tracks}
+
+    def add_tracks(self, tracks: Dict[str, Dict]) -> None:
+        """楽曲詳細を登録"""
+        with self._lock:
+            self.tracks.update(tracks)
+
+
+def index_edge_tracks(edges_dict: Dict[Hashable, Dict]) -> Dict[str, Set[Hashable]]:
+    """
+    エッジに反映済みの楽曲を 楽曲ID -> エッジキーの集合 の索引にする
+
+    コラボ曲は参加アーティストの数だけ取得されるため、マージ時にこの索引で
+    各楽曲が各ペアに1回だけ反映されるようにする
+    """
+    index: Dict[str, Set[Hashable]] = {}
+    for edge_key, edge in edges_dict.items():
+        for track in edge.get('tracks', []):
+            index.setdefault(track['track_id'], set()).add(edge_key)
+    return index
+
+
+def _slim_track(track: Dict) -> Dict:
+    """アルバムから得た楽曲オブジェクトをエッジ構築に使うフィールドだけにする"""
+    return {
+        'id': track['id'],
+        'name': track.get('name'),
+        'artists': [{'id': a.get('id'), 'name': a.get('name')} for a in track.get('artists') or []],
+    }
+
+
+def fetch_discography(
+    sp,
+    artist_id: str,
+    groups: Sequence[str] = DISCOGRAPHY_GROUPS,
+    max_requests: Optional[int] = None,
+    newest_first: bool = True,
+    stats: Optional[HarvestStats] = None
+) -> Tuple[List[Dict], int, int]:
+    """
+    アーティストのディスコグラフィーをページングして取得
+
+    groups の順にアルバム種別ごとに取得し、各種別の中では発売日が新しい順に並べる。
+    max_requests はこのアーティストに使うリクエスト数の上限（ディスコグラフィー取得と
+    アルバム展開の合計）。まだ取得していない種別の最初のページと展開用に最低1リクエストを
+    残し、残りの予算で展開できるアルバム数（20件/リクエスト）のうち、その種別までの
+    取り分（i 番目の種別は (i + 1) / len(groups)）が集まった時点でページングを打ち切る。
+    作品数の多い種別が予算を使い切らず、後の種別も一覧・展開される
+
+    Args:
+        sp: spotipy.Spotify クライアント
+        artist_id: 対象アーティストのSpotify ID
+        groups: 取得するアルバム種別（優先順）
+        max_requests: アーティストあたりのリクエスト予算（Noneなら全ページ取得）
+        newest_first: 各種別の中で発売日が新しい順に並べるか
+        stats: リクエスト数の集計先
+
+    Returns:
+        (アルバムのリスト（優先順）, APIが返したアルバム総数, 使用したリクエスト数)
+    """
+    albums: List[Dict] = []
+    seen: Set[str] = set()
+    total = 0
+    requests = 0
+
+    def has_budget(index: int, pending: int = 0) -> bool:
+        # pending: ページング中の種別で集めたアルバム数（albums にはまだ入っていない）
+        if max_requests is None:
+            return True
+        remaining = max_requests - requests - (len(groups) - index - 1)
+        capacity = remaining * ALBUMS_BATCH_SIZE * (index + 1) // len(groups)
+        return remaining > 1 and len(albums) + pending < capacity
+
+    for index, group in enumerate(groups):
+        group_albums: List[Dict] = []
+        offset = 0
+        while has_budget(index, len(group_albums)):
+            try:
+                page = sp.artist_albums(
+                    artist_id,
+                    include_groups=group,
+                    limit=ARTIST_ALBUMS_PAGE_SIZE,
+                    offset=offset
+                )
+            except SpotifyException:
+                break
+            finally:
+                requests += 1
+            if offset == 0:
+                total += page.get('total') or 0
+            items = page.get('items') or []
+            for album in items:
+                if album and album.get('id') and album['id'] not in seen:
+                    seen.add(album['id'])
+                    group_albums.append(dict(album, album_group=album.get('album_group') or group))
+            if not page.get('next') or not items:
+                break
+            offset += len(items)
+        if newest_first:
+            group_albums.sort(key=lambda a: a.get('release_date') or '', reverse=True)
+        albums.extend(group_albums)
+
+    stats = stats if stats is not None else HarvestStats()
+    stats.record(discography_requests=requests, albums_listed=len(albums))
+    return albums, total, requests
+
+
+def _has_other_artists(track: Dict, artist_id: str) -> bool:
+    """楽曲に対象アーティスト以外の参加アーティストがいるか"""
+    return any(a.get('id') != artist_id for a in track.get('artists') or [])
+
+
+def harvest_album_tracks(
+    sp,
+    artist_id: str,
+    album_ids: List[str],
+    limit: int = 50,
+    stats: Optional[HarvestStats] = None,
+    registry: Optional[HarvestRegistry] = None,
+    max_album_requests: Optional[int] = None,
+    featured_album_ids: Optional[Set[str]] = None,
+    harvested_album_ids: Optional[List[str]] = None
+) -> List[Dict]:
+    """
+    アルバムIDのリストから楽曲をまとめて取得
+
+    アルバムの並び順・各アルバムの楽曲順を保ったまま最大 limit 曲を返す。
+    コラボ曲（対象アーティスト以外が参加している曲）のみ sp.tracks で
+    popularity を含む詳細情報に置き換え、ソロ曲はアルバムから得た
+    簡易オブジェクトのまま返す
+
+    Args:
+        sp: spotipy.Spotify クライアント
+        artist_id: 対象アーティストのSpotify ID
+        album_ids: 展開するアルバムIDのリスト（優先順）
+        limit: 取得する楽曲数
+        stats: リクエスト数の集計先
+        registry: 展開済みのアルバム・取得済みの楽曲詳細の共有先
+            （登録済みのアルバム・楽曲は再取得しない）
+        max_album_requests: sp.albums の呼び出し回数の上限。先頭から
+            max_album_requests × 20 件のアルバムだけを対象にする（展開済みの
+            アルバムも枠を使うため、並列取得時も結果は取得順に左右されない）
+        featured_album_ids: 参加作品（appears_on）のアルバムID。他のアーティストの
+            作品のため、対象アーティストが参加している楽曲のみを使う
+        harvested_album_ids: 収録曲をすべて返したアルバムのIDを追加するリスト
+            （limit で途中までしか使わなかったアルバム・取得できなかったアルバムは含めない。
+            差分更新のマニフェストに取得済みとして記録するため、最後にまとめて追加する）
+
+    Returns:
+        楽曲情報のリスト
+    """
+    if stats is None:
+        stats = HarvestStats()
+
+    simple_tracks: List[Dict] = []
+    harvested: List[str] = []
+    albums_expanded = 0
+    albums_reused = 0
+    albums_over_budget = 0
+    album_requests = 0
+    track_requests = 0
+    featured_album_ids = featured_album_ids or set()
+
+    def album_items(album_id: str, items: List[Dict]) -> List[Dict]:
+        if album_id in featured_album_ids:
+            return [t for t in items if any(a.get('id') == artist_id for a in t['artists'])]
+        return items
+
+    over_budget: List[str] = []
+    if max_album_requests is not None:
+        max_albums = max(max_album_requests, 0) * ALBUMS_BATCH_SIZE
+        album_ids, over_budget = album_ids[:max_albums], album_ids[max_albums:]
+
+    position = 0
+    while position < len(album_ids) and len(simple_tracks) < limit:
+        # 未展開のアルバムが最大20件になるまで先読みする。
+        # 展開済みのアルバムだけで limit に届く場合はそこで打ち切る
+        window: List[str] = []
+        missing: List[str] = []
+        known = len(simple_tracks)
+        while position < len(album_ids) and len(missing) < ALBUMS_BATCH_SIZE and known < limit:
+            album_id = album_ids[position]
+            position += 1
+            cached = registry.get_album(album_id) if registry is not None else None
+            if cached is None:
+                missing.append(album_id)
+            else:
+                known += len(album_items(album_id, cached))
+            window.append(album_id)
+
+        fetched: Dict[str, List[Dict]] = {}
+        if missing:
+            try:
+                results = sp.albums(missing)
+                album_requests += 1
+            except SpotifyException:
+                results = {}
+            for album in results.get('albums') or []:
+                if not album or not album.get('id'):
+                    continue
+                items = (album.get('tracks') or {}).get('items') or []
+                fetched[album['id']] = [_slim_track(t) for t in items if t and t.get('id')]
+                if registry is not None:
+                    registry.add_album(album['id'], fetched[album['id']])
+
+        for album_id in window:
+            if album_id in fetched:
+                items = fetched[album_id]
+            else:
+                items = registry.get_album(album_id) if registry is not None else None
+                if items is None:
+                    continue
+                albums_reused += 1
+            albums_expanded += 1
+            items = album_items(album_id, items)
+            if len(items) <= limit - len(simple_tracks):
+                harvested.append(album_id)
+            simple_tracks.extend(items[:limit - len(simple_tracks)])
+            if len(simple_tracks) >= limit:
+                break
+
+    if len(simple_tracks) < limit:
+        albums_over_budget = len(over_budget)
+
+    # popularityが必要なのはエッジになるコラボ曲のみ
+    detail_ids = [t['id'] for t in simple_tracks if _has_other_artists(t, artist_id)]
+    details: Dict[str, Dict] = {}
+    reused = 0
+    if registry is not None:
+        details = registry.get_tracks(detail_ids)
+        reused = len(details)
+        detail_ids = [track_id for track_id in detail_ids if track_id not in details]
+    fetched: Dict[str, Dict] = {}
+    for i in range(0, len(detail_ids), TRACKS_BATCH_SIZE):
+        batch = detail_ids[i:i + TRACKS_BATCH_SIZE]
+        try:
+            results = sp.tracks(batch)
+            track_requests += 1
+        except SpotifyException:
+            continue
+        for track in results.get('tracks') or []:
+            if track and track.get('id'):
+                fetched[track['id']] = track
+
+    if registry is not None:
+        registry.add_tracks(fetched)
+    details.update(fetched)
+
+    stats.record(
+        artists=1,
+        album_requests=album_requests,
+        track_requests=track_requests,
+        # 従来方式: アルバムごとに1リクエスト + 全曲を50曲ずつ sp.tracks
+        legacy_requests=albums_expanded + math.ceil(len(simple_tracks) / TRACKS_BATCH_SIZE),
+        tracks_harvested=len(simple_tracks),
+        tracks_detailed=len(fetched),
+        tracks_reused=reused,
+        albums_reused=albums_reused,
+        album_requests_avoided=max(math.ceil(albums_expanded / ALBUMS_BATCH_SIZE) - album_requests, 0),
+        albums_over_budget=albums_over_budget
+    )
+    if harvested_album_ids is not None:
+        harvested_album_ids.extend(harvested)
+    return [details.get(t['id'], t) for t in simple_tracks]
+
+
+def harvest_in_order(
+    fetch: Callable[[T], R],
+    items: Iterable[T],
+    concurrency: int = 1
+) -> Iterator[Tuple[T, R]]:
+    """
+    items の各要素に fetch を適用し、(要素, 結果) を入力順に返す
+
+    concurrency > 1 の場合はスレッドプールで最大 concurrency 件を並列に取得する。
+    結果は完了順ではなく入力順に返すため、呼び出し側のマージ結果は
+    逐次処理と同一になる。先読みは concurrency の2倍までに制限する
+
+    Args:
+        fetch: 1件分の取得処理（例外は呼び出し側で処理しておくこと）
+        items: 処理対象
+        concurrency: 同時に実行する取得処理の数
+    """
+    if concurrency <= 1:
+        for item in items:
+            yield item, fetch(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = deque()
+        for item in items:
+            in_flight.append((item, executor.submit(fetch, item)))
+            if len(in_flight) >= concurrency * 2:
+                done_item, future = in_flight.popleft()
+                yield done_item, future.result()
+        while in_flight:
+            done_item, future = in_flight.popleft()
+            yield done_item, future.result()
@@ -0,0 +1,254 @@
+"""
+Spotify APIリクエストの計測
+
+クライアントを InstrumentedSpotify でラップし、APIを実際に呼び出した回数と
+レイテンシをエンドポイントごとに ApiMetrics に集計する。
+レートリミッタ（RateLimitedSpotify）の内側に置くことで、待機時間を含まない
+ネットワーク上のレイテンシを計測する
+
+- エンドポイントごとのリクエスト数、エラー数、429エラー数
+- レイテンシのヒストグラムとパーセンタイル（p50/p95/p99）
+- 受信バイト数（attach_session() でHTTPセッションに登録したフックで集計）
+- レートリミッタで待機した時間（RateLimitedSpotify に metrics を渡した場合）
+- 実行終了時のJSONレポートと、実行中の定期的なサマリー表示
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+from spotipy.exceptions import SpotifyException
+
+# デフォルトのレポートファイル（プロジェクトルートからの相対パス）
+DEFAULT_METRICS_PATH = '.spotify_cache/api_metrics.json'
+
+# レイテンシのヒストグラムの境界（ミリ秒、最後のバケットはそれ以上）
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """ソート済みの値のパーセンタイル（最近傍順位法）"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))  # ceil(n * p / 100)
+    return sorted_values[int(rank) - 1]
+
+
+class EndpointMetrics:
+    """1エンドポイント分の集計"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.bytes_received = 0
+        self.sleep_seconds = 0.0
+        self.latencies: List[float] = []  # 秒
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        bucket = 0
+        for latency in latencies:
+            while bucket < len(LATENCY_BUCKETS_MS) and latency * 1000 > LATENCY_BUCKETS_MS[bucket]:
+                bucket += 1
+            histogram[bucket] += 1
+        labels = [f'<={b}ms' for b in LATENCY_BUCKETS_MS] + [f'>{LATENCY_BUCKETS_MS[-1]}ms']
+        result = {
+            'requests': self.requests,
+            'errors': self.errors,
+            'rate_limited': self.rate_limited,
+            'bytes_received': self.bytes_received,
+            'sleep_seconds': round(self.sleep_seconds, 3),
+            'latency_ms': {
+                f'p{p}': round(percentile(latencies, p) * 1000, 2) if latencies else None
+                for p in PERCENTILES
+            },
+            'latency_histogram_ms': dict(zip(labels, histogram)),
+        }
+        result['latency_ms']['mean'] = (
+            round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None
+        )
+        return result
+
+
+class ApiMetrics:
+    """
+    エンドポイントごとのAPIリクエストの集計（スレッドセーフ）
+
+    InstrumentedSpotify がリクエストごとに record_request() を、
+    RateLimitedSpotify が待機ごとに record_sleep() を呼び出す
+    """
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointMetrics] = defaultdict(EndpointMetrics)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._current = threading.local()  # 呼び出し中のエンドポイント（受信バイト数の集計用）
+        self._live_thread: Optional[threading.Thread] = None
+        self._live_stop = threading.Event()
+
+    def record_request(self, endpoint: str, seconds: float, status: Optional[int] = None) -> None:
+        """1リクエスト分を記録（status は失敗時のHTTPステータス、接続エラーなどは0）"""
+        with self._lock:
+            metrics = self.endpoints[endpoint]
+            metrics.requests += 1
+            metrics.latencies.append(seconds)
+            if status is not None:
+                metrics.errors += 1
+                if status == 429:
+                    metrics.rate_limited += 1
+
+    def record_sleep(self, endpoint: str, seconds: float) -> None:
+        """レートリミッタで待機した時間を記録"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self.endpoints[endpoint].sleep_seconds += seconds
+
+    def attach_session(self, session: requests.Session) -> requests.Session:
+        """HTTPセッションにレスポンスのフックを登録し、受信バイト数を集計する"""
+        session.hooks['response'].append(self._on_response)
+        return session
+
+    def _on_response(self, response: requests.Response, *args, **kwargs) -> None:
+        endpoint = getattr(self._current, 'endpoint', None)
+        if endpoint is None:
+            return
+        with self._lock:
+            self.endpoints[endpoint].bytes_received += len(response.content or b'')
+
+    def snapshot(self) -> Dict[str, Any]:
+        """現時点の集計結果（JSONレポートの内容）"""
+        with self._lock:
+            endpoints = {name: m.summary() for name, m in sorted(self.endpoints.items())}
+            latencies = sorted(l for m in self.endpoints.values() for l in m.latencies)
+        elapsed = time.time() - self.started_at
+        total_requests = sum(e['requests'] for e in endpoints.values())
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'elapsed_seconds': round(elapsed, 3),
+            'total': {
+                'requests': total_requests,
+                'requests_per_second': round(total_requests / elapsed, 2) if elapsed else None,
+                'errors': sum(e['errors'] for e in endpoints.values()),
+                'rate_limited': sum(e['rate_limited'] for e in endpoints.values()),
+                'bytes_received': sum(e['bytes_received'] for e in endpoints.values()),
+                'sleep_seconds': round(sum(e['sleep_seconds'] for e in endpoints.values()), 3),
+                'latency_ms': {
+                    f'p{p}': round(percentile(latencies, p) * 1000, 2) if latencies else None
+                    for p in PERCENTILES
+                },
+            },
+            'endpoints': endpoints,
+        }
+
+    def write_json(self, path: str = DEFAULT_METRICS_PATH) -> Dict[str, Any]:
+        """集計結果をJSONファイルに書き出す"""
+        report = self.snapshot()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
+
+    def report(self) -> None:
+        """エンドポイントごとの集計結果を表示"""
+        report = self.snapshot()
+        total = report['total']
+        print(f"\n  APIリクエストの計測:")
+        print(f"    リクエスト数: {total['requests']} ({total['requests_per_second'] or 0:.1f}/秒) "
+              f"/ エラー: {total['errors']} (うち429: {total['rate_limited']})")
+        print(f"    受信: {total['bytes_received'] / (1024 * 1024):.1f}MB / "
+              f"待機時間: {total['sleep_seconds']:.1f}秒")
+        for name, e in report['endpoints'].items():
+            latency = e['latency_ms']
+            if latency['p50'] is None:
+                continue
+            print(f"    {name}: {e['requests']} 件 "
+                  f"p50 {latency['p50']:.0f}ms / p95 {latency['p95']:.0f}ms / p99 {latency['p99']:.0f}ms "
+                  f"429: {e['rate_limited']} 待機 {e['sleep_seconds']:.1f}秒 "
+                  f"受信 {e['bytes_received'] / 1024:.0f}KB")
+
+    def start_live(self, interval: float) -> None:
+        """interval 秒ごとに直近の集計を1行で表示（デーモンスレッド）"""
+        if self._live_thread is not None:
+            return
+        self._live_stop.clear()
+        self._live_thread = threading.Thread(target=self._live_loop, args=(interval,), daemon=True)
+        self._live_thread.start()
+
+    def stop_live(self) -> None:
+        if self._live_thread is None:
+            return
+        self._live_stop.set()
+        self._live_thread.join()
+        self._live_thread = None
+
+    def _live_loop(self, interval: float) -> None:
+        previous: Dict[str, int] = defaultdict(int)  # エンドポイントごとの前回表示時のリクエスト数
+        previous_rate_limited = 0
+        previous_sleep = 0.0
+        while not self._live_stop.wait(interval):
+            with self._lock:
+                # 直近の区間のレイテンシは、前回表示以降に追加された分
+                recent = []
+                for name, m in self.endpoints.items():
+                    recent.extend(m.latencies[previous[name]:])
+                    previous[name] = m.requests
+                rate_limited = sum(m.rate_limited for m in self.endpoints.values())
+                sleep = sum(m.sleep_seconds for m in self.endpoints.values())
+                total = sum(previous.values())
+            recent.sort()
+            p95 = percentile(recent, 95)
+            print(f"    [API] 直近{interval:g}秒: {len(recent)} リクエスト ({len(recent) / interval:.1f}/秒) "
+                  f"p95 {p95 * 1000 if p95 is not None else 0:.0f}ms "
+                  f"429: {rate_limited - previous_rate_limited} 待機 {sleep - previous_sleep:.1f}秒 "
+                  f"(累計 {total} リクエスト)")
+            previous_rate_limited = rate_limited
+            previous_sleep = sleep
+
+
+class InstrumentedSpotify:
+    """
+    spotipy.Spotify をラップし、API呼び出しごとのレイテンシとエラーを ApiMetrics に記録する
+
+    RateLimitedSpotify の内側（spotipy.Spotify の直接のラッパー）に置くと、
+    429エラー後の再試行も1リクエストとして記録される
+    """
+
+    def __init__(self, client, metrics: ApiMetrics):
+        self._client = client
+        self._metrics = metrics
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def instrumented_call(*args, **kwargs):
+            current = self._metrics._current
+            current.endpoint = name
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except SpotifyException as e:
+                self._metrics.record_request(name, time.perf_counter() - start, e.http_status)
+                raise
+            except Exception:
+                self._metrics.record_request(name, time.perf_counter() - start, 0)
+                raise
+            finally:
+                current.endpoint = None
+            self._metrics.record_request(name, time.perf_counter() - start)
+            return result
+
+        return instrumented_call
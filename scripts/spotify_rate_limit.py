@@ -0,0 +1,185 @@
+"""
+Spotify APIリクエストのレート制御
+
+クライアントを RateLimitedSpotify でラップし、すべてのAPI呼び出しを
+共有の RateLimiter（トークンバケット）で制御する。
+キャッシュ（CachedSpotify）の内側に置くことで、キャッシュヒット時は待機しない
+
+- 429エラーが発生しない間はリクエストレートを少しずつ上げる（加算的増加）
+- 429エラー時はレートを半分に下げ（乗算的減少）、Retry-Afterの間は
+  呼び出し元やスレッドに関係なくすべてのリクエストを停止する
+- 現在のレートと待機した合計時間を集計（エンドポイントごとの待機時間は spotify_metrics で集計）
+"""
+
+import threading
+import time
+from typing import Iterable
+
+import requests
+from requests.adapters import HTTPAdapter
+from spotipy.exceptions import SpotifyException
+from urllib3.util.retry import Retry
+
+
+class RateLimiter:
+    """
+    AIMD（加算的増加・乗算的減少）で調整するトークンバケット
+
+    Args:
+        rate: 初期レート（リクエスト/秒）
+        min_rate: 429エラー時に下げる下限
+        max_rate: 増加させる上限
+        burst: バケットの容量（連続して送信できるリクエスト数）
+        increase: 成功1回あたりのレート増加量（リクエスト/秒）
+        decrease: 429エラー時にレートに掛ける係数
+    """
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        min_rate: float = 0.5,
+        max_rate: float = 20.0,
+        burst: float = 2.0,
+        increase: float = 0.05,
+        decrease: float = 0.5
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+
+        self.requests = 0
+        self.rate_limited_count = 0
+        self.throttled_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+
+    def acquire(self) -> float:
+        """トークンを1つ取得できるまで待機し、待機した秒数を返す"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+                    self._last_refill = now
+                    if self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        self.requests += 1
+                        self.throttled_seconds += waited
+                        return waited
+                    wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def on_success(self) -> None:
+        """リクエスト成功時: レートを少し上げる"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        """
+        429エラー時: レートを下げ、retry_after 秒間すべてのリクエストを停止
+
+        既に停止中の場合（他のスレッドが先に429を受けた場合）はレートを
+        重ねて下げず、停止期間のみ延長する
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.rate_limited_count += 1
+            if now >= self._paused_until:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._paused_until = max(self._paused_until, now + retry_after)
+            self._tokens = 0.0
+            self._last_refill = self._paused_until
+
+    def report(self) -> None:
+        """レート制御の集計結果を表示"""
+        print(f"\n  レート制御:")
+        print(f"    リクエスト数: {self.requests}")
+        print(f"    現在のレート: {self.rate:.1f} リクエスト/秒 "
+              f"(範囲 {self.min_rate:.1f}〜{self.max_rate:.1f})")
+        print(f"    429エラー: {self.rate_limited_count} 回")
+        print(f"    待機時間の合計: {self.throttled_seconds:.1f}秒")
+
+
+def make_session(
+    status_forcelist: Iterable[int] = (500, 502, 503, 504),
+    retries: int = 3,
+    backoff_factor: float = 0.3
+) -> requests.Session:
+    """
+    spotipy.Spotify に渡すHTTPセッション
+
+    spotipy標準のセッションは 429 を status_forcelist から外しても、urllib3が
+    Retry-After ヘッダー付きの429を呼び出しごとに待機して再試行してしまい、
+    RateLimiter に429が届かない。Retry-After を無視する設定にして、
+    429はそのまま RateLimitedSpotify に返す
+    """
+    retry = Retry(
+        total=retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=tuple(status_forcelist),
+        respect_retry_after_header=False
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RateLimitedSpotify:
+    """
+    spotipy.Spotify をラップし、すべてのAPI呼び出しを RateLimiter で制御する
+
+    429エラーは呼び出し元に返さず、Retry-Afterの間すべてのリクエストを
+    停止したうえで最大 max_retries 回まで再試行する。
+    spotipy自身の429リトライ（呼び出しごとの待機）は無効にしておくこと
+    （make_session() のセッションを渡す）。
+    metrics（spotify_metrics.ApiMetrics）を渡すと、待機した時間をエンドポイントごとに記録する
+    """
+
+    def __init__(self, client, limiter: RateLimiter, max_retries: int = 5, metrics=None):
+        self._client = client
+        self._limiter = limiter
+        self._max_retries = max_retries
+        self._metrics = metrics
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        def limited_call(*args, **kwargs):
+            attempt = 0
+            while True:
+                waited = self._limiter.acquire()
+                if self._metrics is not None:
+                    self._metrics.record_sleep(name, waited)
+                try:
+                    result = attr(*args, **kwargs)
+                except SpotifyException as e:
+                    if e.http_status != 429 or attempt >= self._max_retries:
+                        raise
+                    attempt += 1
+                    retry_after = int((e.headers or {}).get('Retry-After', 60))
+                    self._limiter.on_rate_limited(retry_after)
+                    print(f"    レート制限: {retry_after}秒待機... "
+                          f"(全リクエストを停止、レート {self._limiter.rate:.1f}/秒に低下)")
+                    continue
+                self._limiter.on_success()
+                return result
+
+        return limited_call
@@ -0,0 +1,57 @@
+"""
+spotify_harvest.fetch_discography のリクエスト予算のテスト
+
+使い方:
+    cd scripts && python -m pytest test_spotify_harvest.py
+"""
+
+from spotify_harvest import ALBUMS_BATCH_SIZE, fetch_discography
+
+
+class StubSpotify:
+    """種別ごとのアルバム数だけを持つ artist_albums のスタブ"""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.calls = []
+
+    def artist_albums(self, artist_id, include_groups, limit, offset):
+        self.calls.append((include_groups, offset))
+        count = self.counts.get(include_groups, 0)
+        items = [
+            {'id': f'{include_groups}-{i}', 'release_date': f'2020-01-{i % 28 + 1:02d}'}
+            for i in range(offset, min(offset + limit, count))
+        ]
+        return {'items': items, 'total': count, 'next': 'next' if offset + limit < count else None}
+
+
+def test_paging_stops_when_listed_albums_fill_the_expansion_budget():
+    sp = StubSpotify({'single': 400})
+    albums, total, used = fetch_discography(sp, 'artist', groups=('single',), max_requests=8)
+
+    assert total == 400
+    # 50件ずつ3ページで、残りの予算（5リクエスト）で展開できる100件を超えた
+    assert used == 3
+    assert len(albums) == 150
+    assert len(albums) >= (8 - used) * ALBUMS_BATCH_SIZE
+    assert len(albums) - 50 < (8 - used + 1) * ALBUMS_BATCH_SIZE
+
+
+def test_large_first_group_leaves_budget_for_later_groups():
+    sp = StubSpotify({'single': 400, 'appears_on': 30, 'album': 30})
+    albums, total, used = fetch_discography(sp, 'artist', max_requests=8)
+
+    assert [group for group, _ in sp.calls] == ['single', 'appears_on', 'album']
+    assert total == 460
+    assert used == 3
+    # 展開の予算（5リクエスト = 100件）に各種別のアルバムが入る
+    expanded = albums[:(8 - used) * ALBUMS_BATCH_SIZE]
+    assert {album['album_group'] for album in expanded} == {'single', 'appears_on', 'album'}
+
+
+def test_without_budget_all_pages_are_listed():
+    sp = StubSpotify({'single': 120, 'appears_on': 60, 'album': 0})
+    albums, total, used = fetch_discography(sp, 'artist', max_requests=None)
+
+    assert len(albums) == total == 180
+    assert used == 3 + 2 + 1